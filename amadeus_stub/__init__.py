@@ -0,0 +1,11 @@
+"""
+Локальный сервер, заменяющий Amadeus: отвечает записанными ответами
+(fixtures) с настраиваемой задержкой и ошибками. Используется для
+бенчмарков и проверки бота без обращения к Amadeus.
+
+Запуск: python -m amadeus_stub --help
+"""
+from amadeus_stub.server import (FixtureStore, StubServer, StubSettings,
+                                 Upstream)
+
+__all__ = ['FixtureStore', 'StubServer', 'StubSettings', 'Upstream']
@@ -0,0 +1,89 @@
+import argparse
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from amadeus_stub.server import (FixtureStore, StubServer, StubSettings,
+                                 Upstream)
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'sample')
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m amadeus_stub',
+        description='Локальный сервер, заменяющий Amadeus. Для работы бота '
+                    'с сервером: AMADEUS_HOST=localhost, AMADEUS_PORT=<port>, '
+                    'AMADEUS_SSL=false.'
+    )
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='адрес сервера (по умолчанию 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8088,
+                        help='порт сервера (по умолчанию 8088)')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES,
+                        help='каталог с записанными ответами')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='задержка ответа, мс')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='случайное отклонение задержки, мс')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='доля ответов 500 (от 0 до 1)')
+    parser.add_argument('--throttle-rate', type=float, default=0,
+                        help='доля ответов 429 (от 0 до 1)')
+    parser.add_argument('--retry-after', type=int, default=1,
+                        help='заголовок Retry-After ответов 429, с')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='начальное значение генератора случайных чисел')
+    parser.add_argument('--record', action='store_true',
+                        help='передавать запросы в Amadeus и записывать ответы')
+    parser.add_argument('--upstream', default='https://test.api.amadeus.com',
+                        help='адрес Amadeus для режима записи')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='выводить каждый запрос')
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s %(levelname)s %(message)s'
+    )
+
+    upstream = None
+    if args.record:
+        load_dotenv()
+        api_key = os.getenv('AMADEUS_API_KEY')
+        api_secret = os.getenv('AMADEUS_API_SECRET')
+        if not api_key or not api_secret:
+            exit('Для записи нужны AMADEUS_API_KEY и AMADEUS_API_SECRET')
+        upstream = Upstream(args.upstream, api_key, api_secret)
+
+    server = StubServer(
+        (args.host, args.port),
+        FixtureStore(args.fixtures),
+        StubSettings(
+            latency=args.latency / 1000,
+            jitter=args.jitter / 1000,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            retry_after=args.retry_after,
+            seed=args.seed
+        ),
+        upstream
+    )
+    logging.info(
+        'Сервер Amadeus запущен на %s:%s (%s)', *server.server_address[:2],
+        f'запись из {args.upstream}' if args.record else args.fixtures
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
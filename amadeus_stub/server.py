@@ -0,0 +1,381 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATH = '/v1/security/oauth2/token'
+CITIES_PATH = '/v1/reference-data/locations/cities'
+HOTELS_BY_CITY_PATH = '/v1/reference-data/locations/hotels/by-city'
+HOTELS_BY_HOTELS_PATH = '/v1/reference-data/locations/hotels/by-hotels'
+HOTEL_OFFERS_PATH = '/v3/shopping/hotel-offers'
+HOTEL_SENTIMENTS_PATH = '/v2/e-reputation/hotel-sentiments'
+
+# Методы со списком отелей (hotelIds): ответы хранятся по каждому отелю
+# отдельно и собираются для любого набора отелей, поэтому записанные
+# ответы подходят при любом разбиении списка на части.
+HOTEL_ITEM_PATHS = {
+    HOTELS_BY_HOTELS_PATH: 'hotels',
+    HOTEL_OFFERS_PATH: 'offers',
+    HOTEL_SENTIMENTS_PATH: 'sentiments',
+}
+# Параметр, по которому ищется ответ, если нет ответа с точно такими же
+# параметрами.
+FALLBACK_PARAMS = {
+    CITIES_PATH: 'keyword',
+    HOTELS_BY_CITY_PATH: 'cityCode',
+}
+
+NO_ROOMS_DETAIL = 'NO ROOMS AVAILABLE AT REQUESTED PROPERTY'
+
+
+def amadeus_error(status: int, code: int, title: str,
+                  detail: str | None = None) -> dict:
+    """Возвращает тело ответа с ошибкой в формате Amadeus."""
+    error = {'status': status, 'code': code, 'title': title}
+    if detail is not None:
+        error['detail'] = detail
+    return {'errors': [error]}
+
+
+def hotel_id_of(path: str, item: dict) -> str | None:
+    """Возвращает код отеля элемента 'data' ответа метода path."""
+    if path == HOTEL_OFFERS_PATH:
+        return item.get('hotel', {}).get('hotelId')
+    return item.get('hotelId')
+
+
+class FixtureStore:
+    """
+    Записанные ответы Amadeus (каталог с JSON-файлами):
+    * responses.json - ответы по методу, пути и параметрам запроса;
+    * hotels.json, offers.json, sentiments.json - элементы 'data' ответов
+      методов со списком отелей (HOTEL_ITEM_PATHS) по кодам отелей.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Каталог с файлами. Создаётся при первой записи.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.responses = self._load('responses')
+        self.items = {
+            name: self._load(name) for name in HOTEL_ITEM_PATHS.values()
+        }
+
+    def _load(self, name: str) -> dict:
+        try:
+            with open(os.path.join(self.path, f'{name}.json'),
+                      encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def _dump(self, name: str, data: dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, f'{name}.json'), 'w',
+                  encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=1)
+
+    @staticmethod
+    def response_key(method: str, path: str, params: dict) -> str:
+        query = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+        return f'{method} {path}?{query}'
+
+    def find_response(self, method: str, path: str,
+                      params: dict) -> dict | None:
+        """
+        Возвращает записанный ответ {'status': ..., 'body': ...}: с точно
+        такими же параметрами или, если его нет, с тем же значением
+        параметра FALLBACK_PARAMS[path].
+        """
+        with self._lock:
+            response = self.responses.get(
+                self.response_key(method, path, params)
+            )
+            if response is not None or path not in FALLBACK_PARAMS:
+                return response
+            param = FALLBACK_PARAMS[path]
+            value = str(params.get(param, '')).upper()
+            for key, response in self.responses.items():
+                key_method, _, key_url = key.partition(' ')
+                key_path, _, key_query = key_url.partition('?')
+                if key_method != method or key_path != path:
+                    continue
+                if str(dict(parse_qsl(key_query)).get(param, '')).upper() \
+                        == value:
+                    return response
+        return None
+
+    def find_items(self, path: str, hotel_ids: list[str]) -> list[dict]:
+        """Возвращает записанные элементы 'data' по кодам отелей."""
+        items = self.items[HOTEL_ITEM_PATHS[path]]
+        with self._lock:
+            return [items[hotel_id] for hotel_id in hotel_ids
+                    if hotel_id in items]
+
+    def find_offer(self, offer_id: str) -> dict | None:
+        """Возвращает записанное предложение отеля по его коду."""
+        with self._lock:
+            for item in self.items['offers'].values():
+                for offer in item.get('offers', []):
+                    if offer.get('id') == offer_id:
+                        return {**item, 'offers': [offer]}
+        return None
+
+    def record(self, method: str, path: str, params: dict,
+               status: int, body: dict) -> None:
+        """Сохраняет ответ Amadeus и записывает файлы."""
+        with self._lock:
+            if path in HOTEL_ITEM_PATHS and status == 200:
+                name = HOTEL_ITEM_PATHS[path]
+                for item in body.get('data') or []:
+                    hotel_id = hotel_id_of(path, item)
+                    if hotel_id is not None:
+                        self.items[name][hotel_id] = item
+                self._dump(name, self.items[name])
+                return
+            key = self.response_key(method, path, params)
+            self.responses[key] = {'status': status, 'body': body}
+            self._dump('responses', self.responses)
+
+
+class Upstream:
+    """Настоящий Amadeus, ответы которого записываются (режим записи)."""
+
+    def __init__(self, base_url: str, api_key: str, api_secret: str):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.session = requests.Session()
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _bearer(self) -> str:
+        with self._lock:
+            if self._token is None or time.time() + 10 >= self._expires_at:
+                response = self.session.post(
+                    self.base_url + TOKEN_PATH,
+                    data={
+                        'grant_type': 'client_credentials',
+                        'client_id': self.api_key,
+                        'client_secret': self.api_secret,
+                    },
+                    timeout=30
+                )
+                response.raise_for_status()
+                data = response.json()
+                self._token = data['access_token']
+                self._expires_at = time.time() + data.get('expires_in', 0)
+            return self._token
+
+    def get(self, path: str, query: str) -> tuple[int, dict]:
+        url = f'{self.base_url}{path}' + (f'?{query}' if query else '')
+        response = self.session.get(
+            url,
+            headers={'Authorization': f'Bearer {self._bearer()}'},
+            timeout=60
+        )
+        try:
+            body = response.json()
+        except ValueError:
+            body = amadeus_error(response.status_code, 0, response.text[:200])
+        return response.status_code, body
+
+
+class StubSettings:
+    """Параметры поведения сервера."""
+
+    def __init__(
+            self,
+            latency: float = 0,
+            jitter: float = 0,
+            error_rate: float = 0,
+            throttle_rate: float = 0,
+            retry_after: int = 1,
+            seed: int | None = None
+    ):
+        """
+        :param latency: Задержка ответа (в секундах).
+        :param jitter: Случайное отклонение задержки (в секундах).
+        :param error_rate: Доля ответов с ошибкой 500.
+        :param throttle_rate: Доля ответов 429 (Too Many Requests).
+        :param retry_after: Значение заголовка Retry-After ответа 429.
+        :param seed: Начальное значение генератора случайных чисел.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов клиента Amadeus."""
+    protocol_version = 'HTTP/1.1'
+    server: 'StubServer'
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format, *args)
+
+    def _send(self, status: int, body: dict,
+              headers: dict[str, str] | None = None) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/vnd.amadeus+json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        if urlsplit(self.path).path != TOKEN_PATH:
+            self._send(404, amadeus_error(404, 38196, 'Resource not found'))
+            return
+        token = hashlib.sha1(os.urandom(16)).hexdigest()
+        self._send(200, {
+            'type': 'amadeusOAuth2Token',
+            'access_token': token,
+            'token_type': 'Bearer',
+            'expires_in': self.server.token_lifetime,
+            'state': 'approved',
+        })
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        settings = self.server.settings
+
+        delay = settings.latency + settings.random.uniform(
+            -settings.jitter, settings.jitter
+        )
+        if delay > 0:
+            time.sleep(delay)
+
+        chance = settings.random.random()
+        if chance < settings.throttle_rate:
+            self._send(
+                429,
+                amadeus_error(429, 38194, 'Too many requests',
+                              'The network rate limit is exceeded, '
+                              'please try again later'),
+                {'Retry-After': str(settings.retry_after)}
+            )
+            return
+        if chance < settings.throttle_rate + settings.error_rate:
+            self._send(500, amadeus_error(500, 141, 'SYSTEM ERROR HAS OCCURRED'))
+            return
+
+        if self.server.upstream is not None:
+            status, body = self.server.upstream.get(url.path, url.query)
+            self.server.store.record('GET', url.path, params, status, body)
+            self._send(status, body)
+            return
+        self._send(*self.replay(url.path, params))
+
+    def replay(self, path: str, params: dict) -> tuple[int, dict]:
+        """Возвращает записанный ответ (код ответа и тело)."""
+        store = self.server.store
+
+        if path in HOTEL_ITEM_PATHS:
+            hotel_ids = [
+                hotel_id for hotel_id in params.get('hotelIds', '').split(',')
+                if hotel_id
+            ]
+            items = store.find_items(path, hotel_ids)
+            if path == HOTEL_OFFERS_PATH:
+                if not items:
+                    return 400, amadeus_error(
+                        400, 3664, NO_ROOMS_DETAIL, NO_ROOMS_DETAIL
+                    )
+                items = [self.with_dates(item, params) for item in items]
+            return 200, {'data': items, 'meta': {'count': len(items)}}
+
+        if path.startswith(HOTEL_OFFERS_PATH + '/'):
+            offer = store.find_offer(path.rsplit('/', 1)[-1])
+            if offer is None:
+                return 404, amadeus_error(404, 38196, 'Resource not found')
+            return 200, {'data': offer}
+
+        response = store.find_response('GET', path, params)
+        if response is None:
+            return 200, {'data': [], 'meta': {'count': 0}}
+        status, body = response['status'], response['body']
+        if path == HOTELS_BY_CITY_PATH and status == 200 and 'radius' in params:
+            radius = float(params['radius'])
+            data = [
+                hotel for hotel in body.get('data') or []
+                if hotel.get('distance', {}).get('value', 0) <= radius
+            ]
+            body = {**body, 'data': data}
+        return status, body
+
+    @staticmethod
+    def with_dates(item: dict, params: dict) -> dict:
+        """Подставляет в предложения отеля даты из запроса."""
+        dates = {
+            key: params[key] for key in ('checkInDate', 'checkOutDate')
+            if key in params
+        }
+        if not dates:
+            return item
+        return {
+            **item,
+            'offers': [{**offer, **dates} for offer in item.get('offers', [])]
+        }
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Локальный сервер, заменяющий Amadeus для методов, которые использует
+    бот: получение токена, города, отели (by_city, by_hotels), предложения
+    отелей и предложение по коду, отзывы об отелях.
+
+    Отвечает записанными ответами (FixtureStore) с задержкой и случайными
+    ошибками 500 и 429 (StubSettings). В режиме записи (upstream) передаёт
+    запросы в Amadeus и записывает ответы.
+    """
+    daemon_threads = True
+
+    def __init__(
+            self,
+            address: tuple[str, int],
+            store: FixtureStore,
+            settings: StubSettings | None = None,
+            upstream: Upstream | None = None,
+            token_lifetime: int = 1799
+    ):
+        """
+        :param address: Адрес и порт сервера (порт 0 - любой свободный).
+        :param store: Записанные ответы.
+        :param settings: Задержка и ошибки.
+        :param upstream: Amadeus для режима записи.
+        :param token_lifetime: Срок действия выдаваемых токенов (в секундах).
+        """
+        super().__init__(address, StubHandler)
+        self.store = store
+        self.settings = settings or StubSettings()
+        self.upstream = upstream
+        self.token_lifetime = token_lifetime
+
+    def start(self) -> threading.Thread:
+        """Запускает сервер в фоновом потоке (например, в бенчмарках)."""
+        thread = threading.Thread(
+            target=self.serve_forever, name='amadeus-stub', daemon=True
+        )
+        thread.start()
+        return thread
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+
+from amadeus import Client
+
+logger = logging.getLogger(__name__)
+
+
+class ManagedAccessToken:
+    """
+    Токен доступа Amadeus, который обновляется заранее в фоновом потоке.
+
+    Заменяет ленивый amadeus.client.access_token.AccessToken: вместо того
+    чтобы получать новый токен внутри первого запроса после истечения срока
+    действия, фоновый поток обновляет его за refresh_margin секунд до
+    истечения. Если обновление не удалось, продолжает использоваться текущий
+    токен (пока он действителен), а обновление повторяется каждые
+    retry_interval секунд. Токен одновременно обновляет только один поток.
+    """
+    # Токен считается недействительным за столько секунд до истечения срока,
+    # как и в amadeus.client.access_token.AccessToken.
+    TOKEN_BUFFER = 10
+
+    def __init__(
+            self,
+            client: Client,
+            refresh_margin: float = 120,
+            retry_interval: float = 10
+    ):
+        """
+        :param client: Клиент Amadeus.
+        :param refresh_margin: За сколько секунд до истечения срока действия
+            токен обновляется в фоне.
+        :param retry_interval: Пауза (в секундах) между повторными
+            попытками фонового обновления после ошибки.
+        """
+        self.client = client
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.access_token = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def install(self) -> 'ManagedAccessToken':
+        """Подключает токен к клиенту вместо стандартного AccessToken."""
+        self.client.access_token = self
+        return self
+
+    def _bearer_token(self) -> str:
+        """Заголовок Authorization; вызывается клиентом Amadeus."""
+        return f'Bearer {self.token()}'
+
+    def _current(self) -> str | None:
+        with self._lock:
+            if (self.access_token is not None
+                    and time.time() + self.TOKEN_BUFFER < self.expires_at):
+                return self.access_token
+        return None
+
+    def token(self) -> str:
+        """
+        Возвращает действительный токен. Блокирует поток только если
+        действительного токена нет (первый запрос или фоновое обновление
+        не удавалось до самого истечения срока).
+        """
+        token = self._current()
+        if token is not None:
+            return token
+        with self._refresh_lock:
+            # Пока поток ждал блокировку, токен мог обновить другой поток.
+            token = self._current()
+            if token is None:
+                self._refresh()
+                token = self.access_token
+        self._start_background()
+        return token
+
+    def _refresh(self) -> None:
+        response = self.client._unauthenticated_request(
+            'POST',
+            '/v1/security/oauth2/token',
+            {
+                'grant_type': 'client_credentials',
+                'client_id': self.client.client_id,
+                'client_secret': self.client.client_secret
+            }
+        )
+        data = response.result
+        expires_in = data.get('expires_in', 0)
+        now = time.time()
+        with self._lock:
+            self.access_token = data.get('access_token')
+            self.expires_at = now + expires_in
+            # Токен с коротким сроком действия обновляется на половине срока.
+            self.refresh_at = self.expires_at - min(
+                self.refresh_margin, expires_in / 2
+            )
+        logger.info('Токен доступа Amadeus обновлён.')
+
+    def _start_background(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._refresh_loop,
+                name='amadeus-token-refresh',
+                daemon=True
+            )
+        self._thread.start()
+
+    def _refresh_loop(self) -> None:
+        delay = self._seconds_until_refresh()
+        while not self._stop.wait(delay):
+            try:
+                with self._refresh_lock:
+                    if self._seconds_until_refresh() <= 0:
+                        self._refresh()
+                delay = self._seconds_until_refresh()
+            except Exception as error:
+                logger.warning(f'Не удалось обновить токен доступа Amadeus: '
+                               f'{error}. Повтор через '
+                               f'{self.retry_interval} сек.')
+                delay = self.retry_interval
+
+    def _seconds_until_refresh(self) -> float:
+        with self._lock:
+            return max(0.0, self.refresh_at - time.time())
+
+    def stop(self) -> None:
+        """Останавливает фоновое обновление."""
+        self._stop.set()
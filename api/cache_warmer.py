@@ -0,0 +1,194 @@
+import logging
+import threading
+from datetime import date, datetime, timedelta
+
+from pycountry import countries
+
+from api.request_amadeus import (get_hotel_offers_search,
+                                 get_hotel_sentiments, get_hotels_by_city,
+                                 load_city_index, rate_limiter)
+from config_data.config import (AMADEUS_RATE_LIMIT, CACHE_WARMER_DATE_WINDOWS,
+                                CACHE_WARMER_HISTORY_DAYS, CACHE_WARMER_HOURS,
+                                CACHE_WARMER_INTERVAL_MINUTES,
+                                CACHE_WARMER_MAX_HOTELS,
+                                CACHE_WARMER_OFFER_DAYS,
+                                CACHE_WARMER_QUOTA_PERCENT,
+                                CACHE_WARMER_TOP_CITIES)
+from database.data_storage import get_popular_searches
+from utils.rate_limiter import rate_limit_session
+
+logger = logging.getLogger(__name__)
+
+# Сессия ограничителя частоты запросов, от имени которой выполняется
+# прогрев (см. RateLimiter.set_session_limit).
+CACHE_WARMER_SESSION = 'cache_warmer'
+
+
+def parse_hours(hours: str) -> tuple[int, int]:
+    """
+    Разбирает интервал часов вида '1-7' (с 1:00 до 7:00) или '22-6'
+    (с 22:00 до 6:00).
+
+    :return: Кортеж (начальный час, конечный час).
+    """
+    start, end = (int(hour) for hour in hours.split('-'))
+    return start, end
+
+
+def in_hours(hour: int, start: int, end: int) -> bool:
+    """Проверяет, что час hour входит в интервал [start, end)."""
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def resolve_city_code(city_name: str, country_name: str) -> str | None:
+    """
+    Возвращает код IATA города из истории запросов по локальному
+    справочнику городов (Amadeus не запрашивается).
+
+    :param city_name: Название города (Request.city).
+    :param country_name: Название страны (Request.country).
+    :return: Код IATA или None, если город не найден в справочнике.
+    """
+    cities = load_city_index().find_exact(city_name)
+    if not cities:
+        return None
+    try:
+        country_code = countries.lookup(country_name).alpha_2
+    except LookupError:
+        country_code = None
+    for city in cities:
+        if city.get('address', {}).get('countryCode') == country_code:
+            return city['iataCode']
+    return cities[0]['iataCode']
+
+
+class CacheWarmer:
+    """
+    Фоновый прогрев кэша ответов Amadeus для популярных поисков.
+
+    В часы с небольшой нагрузкой периодически выбирает из истории запросов
+    самые популярные города и ближайшие даты заезда и запрашивает через
+    обычные кэширующие функции отели города, отзывы о ближайших к центру
+    отелях и их предложения. Записи, которые ещё есть в кэше, повторно
+    не запрашиваются, поэтому повторные прогревы в пределах срока жизни
+    кэша почти не расходуют квоту. Запросы выполняются от имени отдельной
+    сессии ограничителя частоты с долей quota_percent от общей квоты.
+    """
+
+    def __init__(
+            self,
+            hours: str = CACHE_WARMER_HOURS,
+            interval_minutes: float = CACHE_WARMER_INTERVAL_MINUTES,
+            top_cities: int = CACHE_WARMER_TOP_CITIES,
+            history_days: int = CACHE_WARMER_HISTORY_DAYS,
+            max_hotels: int = CACHE_WARMER_MAX_HOTELS,
+            date_windows: int = CACHE_WARMER_DATE_WINDOWS,
+            offer_days: int = CACHE_WARMER_OFFER_DAYS,
+            quota_percent: float = CACHE_WARMER_QUOTA_PERCENT
+    ):
+        """
+        Параметры описаны в config_data.config (CACHE_WARMER_*).
+        """
+        self.hours = parse_hours(hours)
+        self.interval = interval_minutes * 60
+        self.top_cities = top_cities
+        self.history_days = history_days
+        self.max_hotels = max_hotels
+        self.date_windows = date_windows
+        self.offer_days = offer_days
+        rate_limiter.set_session_limit(
+            CACHE_WARMER_SESSION,
+            max(AMADEUS_RATE_LIMIT * quota_percent / 100, 0.01)
+        )
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'CacheWarmer':
+        """Запускает прогрев в фоновом потоке."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._loop, name='cache-warmer', daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает прогрев (после завершения текущего запроса)."""
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if in_hours(datetime.now().hour, *self.hours):
+                try:
+                    self.warm()
+                except Exception as error:
+                    logger.exception(f'Ошибка прогрева кэша: {error}')
+            self._stop.wait(self.interval)
+
+    def warm(self, today: date | None = None) -> dict[str, int]:
+        """
+        Прогревает кэш для популярных поисков.
+
+        :param today: Текущая дата (для выбора ближайших дат заезда).
+        :return: Количество прогретых городов, вариантов дат и пропущенных
+            (не найденных в справочнике или с ошибкой) городов.
+        """
+        today = today or date.today()
+        popular = get_popular_searches(
+            since=datetime.now() - timedelta(days=self.history_days),
+            top_cities=self.top_cities,
+            check_in_from=today,
+            check_in_to=today + timedelta(days=self.offer_days),
+            windows_per_city=self.date_windows
+        )
+        stats = {'cities': 0, 'windows': 0, 'skipped': 0}
+        with rate_limit_session(CACHE_WARMER_SESSION):
+            for search in popular:
+                if self._stop.is_set():
+                    break
+                try:
+                    stats['windows'] += self.warm_city(search)
+                    stats['cities'] += 1
+                except Exception as error:
+                    stats['skipped'] += 1
+                    logger.warning(f'Кэш для города {search["city"]} '
+                                   f'не прогрет: {error}')
+        logger.info(f'Прогрев кэша: {stats}')
+        return stats
+
+    def warm_city(self, search: dict) -> int:
+        """
+        Прогревает кэш одного города (см. get_popular_searches).
+
+        :return: Количество прогретых вариантов дат.
+        :raises LookupError: Если города нет в справочнике.
+        """
+        city_code = resolve_city_code(search['city'], search['country'])
+        if city_code is None:
+            raise LookupError('город не найден в справочнике городов')
+        hotels = get_hotels_by_city(
+            city_code=city_code, radius=search['radius']
+        )
+        hotel_ids = list(dict.fromkeys(
+            hotel['hotelId'] for hotel in hotels.get('data') or []
+        ))[:self.max_hotels]
+        if not hotel_ids:
+            return 0
+        get_hotel_sentiments(hotel_ids)
+        warmed = 0
+        for window in search['windows']:
+            if self._stop.is_set():
+                break
+            # Параметры - как в handlers.custom.hotel.get_offer_params,
+            # чтобы ключи кэша совпадали с ключами поиска пользователя.
+            get_hotel_offers_search(
+                hotel_ids,
+                check_in_date=str(window['check_in']),
+                check_out_date=str(window['check_out']),
+                price_range=window['price_range'],
+                currency=window['currency_code']
+            )
+            warmed += 1
+        return warmed
@@ -1,19 +1,74 @@
 import logging
 import random
+import threading
 import time
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from contextvars import copy_context
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import partial, wraps
 from http.client import RemoteDisconnected
 
-from amadeus import Client, ResponseError, Response
+from amadeus import Client, ClientError, ResponseError, Response
+from peewee import PeeweeException
 from requests.exceptions import ReadTimeout, HTTPError, ConnectionError
 
-from config_data.config import AMADEUS_API_KEY, AMADEUS_API_SECRET
-from utils.cache_response import api_cache
-
+from api.access_token import ManagedAccessToken
+from api.transport import PooledTransport
+from config_data.config import (AMADEUS_API_KEY, AMADEUS_API_SECRET,
+                                AMADEUS_BREAKER_FAILURE_THRESHOLD,
+                                AMADEUS_BREAKER_RECOVERY_TIMEOUT,
+                                AMADEUS_CONNECT_TIMEOUT,
+                                AMADEUS_END_POINT_RATE_LIMITS,
+                                AMADEUS_ERROR_TTL_MINUTES,
+                                AMADEUS_HEDGE_BUDGET_PERCENT,
+                                AMADEUS_HEDGE_MIN_SAMPLES,
+                                AMADEUS_HEDGE_PERCENTILE, AMADEUS_HOST,
+                                AMADEUS_HTTP_POOL_SIZE,
+                                AMADEUS_MAX_PARALLEL_BATCHES, AMADEUS_PORT,
+                                AMADEUS_RATE_BURST, AMADEUS_RATE_LIMIT,
+                                AMADEUS_READ_TIMEOUT, AMADEUS_SSL,
+                                AMADEUS_SENTIMENTS_TIMEOUT,
+                                AMADEUS_UNAVAILABLE_TTL_MINUTES,
+                                CACHE_STALE_TTL_HOURS, CITY_INDEX_FUZZY_CUTOFF, CITY_INDEX_PATH,
+                                HOTELS_INDEX_MAX_CITIES)
+from utils.cache_response import (api_cache, call_single_flight,
+                                  get_cache_expires_at, get_cached_responses,
+                                  iter_cached_responses, make_item_hashes,
+                                  make_request_hash, save_cache_responses)
+from utils.circuit_breaker import CircuitBreakerRegistry
+from utils.city_index import CityIndex, normalize_city_name
+from utils.cancellation import (cancellable_sleep, check_cancelled,
+                                current_token)
+from utils.exceptions import (ExternalServiceUnavailable, SearchCancelled,
+                              SearchInterrupted, SearchTimeout)
+from utils.hedging import HedgePolicy
+from utils.hotel_index import HotelDistanceIndex, HotelIndexRegistry
+from utils.rate_limiter import RateLimiter
+
+amadeus_transport = PooledTransport(
+    pool_size=AMADEUS_HTTP_POOL_SIZE,
+    connect_timeout=AMADEUS_CONNECT_TIMEOUT,
+    read_timeout=AMADEUS_READ_TIMEOUT
+)
 amadeus = Client(
     client_id=AMADEUS_API_KEY,
-    client_secret=AMADEUS_API_SECRET
+    client_secret=AMADEUS_API_SECRET,
+    host=AMADEUS_HOST,
+    port=AMADEUS_PORT,
+    ssl=AMADEUS_SSL,
+    http=amadeus_transport
+)
+amadeus_token = ManagedAccessToken(amadeus).install()
+
+rate_limiter = RateLimiter(
+    AMADEUS_RATE_LIMIT,
+    AMADEUS_RATE_BURST,
+    AMADEUS_END_POINT_RATE_LIMITS
+)
+circuit_breakers = CircuitBreakerRegistry(
+    AMADEUS_BREAKER_FAILURE_THRESHOLD,
+    AMADEUS_BREAKER_RECOVERY_TIMEOUT
 )
 
 logger = logging.getLogger(__name__)
@@ -35,6 +90,264 @@ def is_no_rooms_error(error: HTTPError | ResponseError) -> bool:
     except Exception:
         return False
 
+
+def split_batches(items: list[str], batch_size: int) -> list[list[str]]:
+    """Разбивает список на последовательные части длиной не более batch_size."""
+    return [
+        items[index:index + batch_size]
+        for index in range(0, len(items), batch_size)
+    ]
+
+
+class BatchSplitStats:
+    """
+    Счётчики восстановления частей списка отелей, отклонённых Amadeus
+    целиком из-за одного отеля без номеров (см. iter_batches, split_on).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._splits = 0
+        self._extra_calls = 0
+        self._isolated_ids = 0
+        self._recovered_hotels = 0
+
+    def record_split(self) -> None:
+        """Часть разбита на две половины (два дополнительных запроса)."""
+        with self._lock:
+            self._splits += 1
+            self._extra_calls += 2
+
+    def record_isolated(self) -> None:
+        """Найден отель, из-за которого отклонялась часть."""
+        with self._lock:
+            self._isolated_ids += 1
+
+    def record_recovered(self, count: int) -> None:
+        """Получены предложения отелей из разбитых частей."""
+        with self._lock:
+            self._recovered_hotels += count
+
+    def stats(self) -> dict[str, int]:
+        """
+        Возвращает счётчики:
+        * splits - разбито частей;
+        * extra_calls - дополнительных запросов из-за разбиения;
+        * isolated_ids - найдено отелей без номеров;
+        * recovered_hotels - получено предложений из разбитых частей.
+        """
+        with self._lock:
+            return {
+                'splits': self._splits,
+                'extra_calls': self._extra_calls,
+                'isolated_ids': self._isolated_ids,
+                'recovered_hotels': self._recovered_hotels,
+            }
+
+
+# Период (в секундах) проверки отмены поиска при ожидании частей.
+CANCEL_POLL_INTERVAL = 0.2
+
+
+class _BatchCall:
+    """Запрос одной части списка и, возможно, его повторная отправка."""
+
+    def __init__(self, index: int, batch: list[str]):
+        self.index = index
+        self.batch = batch
+        self.started = None
+        self.hedged = False
+        self.hedge_future = None
+        self.done = False
+        self.futures = set()
+
+
+def iter_batches(
+        fetch,
+        batches: list[list[str]],
+        timeout: float | None = None,
+        split_on: tuple[type[Exception], ...] = (),
+        split_stats: BatchSplitStats | None = None,
+        hedge: HedgePolicy | None = None,
+        hedge_fetch=None
+):
+    """
+    Выполняет fetch для каждой части списка параллельно, но не более
+    AMADEUS_MAX_PARALLEL_BATCHES запросов одновременно, и отдаёт результаты
+    по мере готовности.
+
+    :param fetch: Функция, принимающая одну часть списка.
+    :param batches: Список частей (см. split_batches).
+    :param timeout: Общее время ожидания (в секундах). Части, не успевшие
+        выполниться за это время, пропускаются, а ещё не начатые отменяются.
+    :param split_on: Исключения, при которых часть делится пополам и обе
+        половины выполняются заново (рекурсивно, пока не останется один
+        элемент). Для части из одного элемента отдаётся результат None.
+        Половины отправляет сам генератор, а не поток пула, поэтому
+        ограничение на число одновременных запросов сохраняется.
+    :param split_stats: Счётчики разбиения частей.
+    :param hedge: Политика повторной отправки медленных запросов. Если
+        часть выполняется дольше hedge.threshold(), а бюджет повторных
+        запросов не исчерпан, её запрос отправляется ещё раз (в отдельном
+        небольшом пуле потоков). Используется ответ, полученный первым;
+        второй запрос отменяется, если ещё не начат, иначе его результат
+        игнорируется. Время успешных запросов записывает в hedge сама
+        fetch (см. safe_request, on_latency), поэтому ожидание
+        ограничителя частоты и чужого запроса (call_single_flight)
+        на порог не влияет.
+    :param hedge_fetch: Функция для повторного запроса (по умолчанию fetch).
+    :return: Генератор троек (индекс исходной части, часть или её половина,
+        результат fetch) в порядке завершения. Если истекло время,
+        отведённое на текущий поиск (utils.cancellation), генератор
+        завершается, как и по timeout.
+    :raises SearchCancelled: Если текущий поиск отменён.
+    """
+    if not batches:
+        return
+    max_workers = max(1, min(AMADEUS_MAX_PARALLEL_BATCHES, len(batches)))
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix='amadeus-batch'
+    )
+    hedge_executor = None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    token = current_token.get()
+    if token is not None and token.deadline is not None:
+        deadline = min(deadline or token.deadline, token.deadline)
+    hedging = hedge is not None and hedge.enabled
+
+    def run(call: _BatchCall, func):
+        if call.started is None:
+            call.started = time.monotonic()
+        return func(call.batch)
+
+    def submit(call: _BatchCall, func, pool: ThreadPoolExecutor) -> Future:
+        # Каждая часть выполняется в копии текущего контекста, чтобы запросы
+        # оставались привязаны к сессии пользователя (см. rate_limit_session).
+        future = pool.submit(copy_context().run, run, call, func)
+        call.futures.add(future)
+        pending[future] = call
+        return future
+
+    def start(index: int, batch: list[str]) -> None:
+        if hedging:
+            hedge.record_call()
+        submit(_BatchCall(index, batch), fetch, executor)
+
+    def finish(call: _BatchCall) -> None:
+        call.done = True
+        for other in call.futures:
+            other.cancel()
+            pending.pop(other, None)
+
+    pending: dict[Future, _BatchCall] = {}
+    try:
+        for index, batch in enumerate(batches):
+            start(index, batch)
+        while pending:
+            now = time.monotonic()
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - now)
+            if token is not None or hedging:
+                # Ожидание периодически прерывается для проверки отмены
+                # и медленных запросов.
+                remaining = CANCEL_POLL_INTERVAL if remaining is None \
+                    else min(remaining, CANCEL_POLL_INTERVAL)
+            if token is not None and token.cancelled:
+                raise SearchCancelled()
+            threshold = hedge.threshold() if hedging else None
+            if threshold is not None:
+                for call in set(pending.values()):
+                    if call.hedged or call.started is None:
+                        continue
+                    hedge_at = call.started + threshold
+                    if hedge_at > now:
+                        remaining = min(remaining, hedge_at - now)
+                        continue
+                    call.hedged = True
+                    if not hedge.try_acquire():
+                        continue
+                    if hedge_executor is None:
+                        hedge_executor = ThreadPoolExecutor(
+                            max_workers=max(1, max_workers // 2),
+                            thread_name_prefix='amadeus-hedge'
+                        )
+                    logger.info(f'[iter_batches] Часть {call.batch} '
+                                f'выполняется дольше {threshold:.2f} сек., '
+                                f'запрос отправлен повторно.')
+                    call.hedge_future = submit(
+                        call, hedge_fetch or fetch, hedge_executor
+                    )
+            done, _ = wait(
+                pending, timeout=remaining, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                if deadline is None or time.monotonic() < deadline:
+                    continue
+                logger.warning(f'[iter_batches] Время ожидания истекло, '
+                               f'не выполнено частей: {len(pending)}')
+                return
+            for future in done:
+                call = pending.pop(future, None)
+                if call is None or call.done:
+                    continue
+                call.futures.discard(future)
+                index, batch = call.index, call.batch
+                try:
+                    result = future.result()
+                except SearchTimeout:
+                    logger.warning(f'[iter_batches] Время поиска истекло, '
+                                   f'не выполнено частей: {len(pending) + 1}')
+                    return
+                except split_on as error:
+                    finish(call)
+                    if len(batch) > 1:
+                        middle = len(batch) // 2
+                        start(index, batch[:middle])
+                        start(index, batch[middle:])
+                        if split_stats is not None:
+                            split_stats.record_split()
+                        continue
+                    logger.info(f'[iter_batches] Часть {batch}: {error!r}')
+                    if split_stats is not None:
+                        split_stats.record_isolated()
+                    result = None
+                except Exception:
+                    if call.futures:
+                        # Второй запрос этой части ещё выполняется.
+                        continue
+                    raise
+                else:
+                    finish(call)
+                    if future is call.hedge_future:
+                        hedge.record_hedge_win()
+                yield index, batch, result
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if hedge_executor is not None:
+            hedge_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def map_batches(
+        fetch, batches: list[list[str]], timeout: float | None = None
+) -> list:
+    """
+    Выполняет fetch для каждой части списка параллельно (см. iter_batches).
+
+    :param fetch: Функция, принимающая одну часть списка.
+    :param batches: Список частей (см. split_batches).
+    :param timeout: Общее время ожидания (в секундах). Части, не успевшие
+        выполниться за это время, в результат не попадают (None), а ещё
+        не начатые отменяются.
+    :return: Результаты fetch в исходном порядке частей.
+    """
+    results = [None] * len(batches)
+    for index, _, result in iter_batches(fetch, batches, timeout=timeout):
+        results[index] = result
+    return results
+
+
 def get_delay(
         attempt: int, retry_delay: int, retry_after: int | None = None
 ) -> float:
@@ -44,65 +357,117 @@ def get_delay(
     return retry_delay * (2 ** attempt - 1) + random.random()
 
 
+def get_retry_after(error: HTTPError | ResponseError) -> int | None:
+    """Возвращает значение заголовка Retry-After ответа с ошибкой."""
+    headers = getattr(error.response, 'headers', None) or {}
+    retry_after = headers.get('Retry-After')
+    try:
+        return int(retry_after) if retry_after else None
+    except (ValueError, TypeError):
+        return None
+
+
 def safe_request(
-        max_retries: int = 3, retry_delay: int = 1, reraise: bool = True
+        max_retries: int = 3,
+        retry_delay: int = 1,
+        reraise: bool = True,
+        end_point: str | None = None,
+        on_latency=None
 ):
     """
     Декоратор для безопасного выполнения запросов к API.
     Повторяет запрос при временных ошибках (429, timeouts, disconnect).
+    Перед каждой попыткой получает разрешение общего ограничителя частоты
+    запросов rate_limiter и проверяет предохранитель end point
+    (circuit_breakers): если сервис недавно был недоступен, запрос
+    сразу завершается исключением ExternalServiceUnavailable.
+    Если текущий поиск отменён или истекло отведённое на него время
+    (utils.cancellation), новые попытки и паузы между ними прерываются
+    исключением SearchCancelled или SearchTimeout.
 
     :param max_retries: Максимальное количество попыток (включая первую).
     :param retry_delay: Базовая задержка в секундах.
     :param reraise: Если True - выбрасывает последнее исключение после всех
         попыток.
+    :param end_point: Метка вызываемого метода API для ограничителя частоты
+        запросов и предохранителя. По умолчанию - имя функции.
+    :param on_latency: Функция, которой передаётся время (в секундах)
+        успешной попытки запроса к API. Ожидание ограничителя частоты,
+        паузы между попытками и неудачные попытки не учитываются.
     """
 
     def decorator(func):
+        request_end_point = end_point or func.__name__
+
+        def service_unavailable() -> ExternalServiceUnavailable:
+            breaker = circuit_breakers.get(request_end_point)
+            logger.warning(f'[{func.__name__}] Предохранитель '
+                           f'{request_end_point} разомкнут, запрос '
+                           f'не выполняется.')
+            return ExternalServiceUnavailable(
+                request_end_point, retry_after=breaker.retry_after()
+            )
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             last_error = None
             retryable_codes = {429, 500, 502, 503, 504}
+            breaker = circuit_breakers.get(request_end_point)
             for attempt in range(1, max_retries + 1):
+                # Отменённый или просроченный поиск запросов не выполняет.
+                check_cancelled()
+                if not breaker.allow_request():
+                    raise service_unavailable() from last_error
+                rate_limiter.acquire(request_end_point)
+                check_cancelled()
                 try:
-                    return func(*args, **kwargs)
+                    started = time.monotonic()
+                    response = func(*args, **kwargs)
+                    if on_latency is not None:
+                        on_latency(time.monotonic() - started)
+                    breaker.record_success()
+                    return response
                 except (HTTPError, ResponseError) as error:
                     last_error = error
                     status_code = getattr(error.response, 'status_code', None)
 
                     if is_no_rooms_error(error):
+                        breaker.record_success()
                         logger.info(
                             f'[{func.__name__}] Нет доступных номеров.'
                         )
                         raise NoRoomsAvailable()
 
                     if status_code not in retryable_codes:
+                            breaker.record_success()
                             logger.error(f'[{func.__name__}] HTTPError '
                                          f'{status_code}: {error}')
                             raise
-                    retry_after = None
-                    headers = getattr(error.response, 'headers', {})
-                    retry_after = headers.get('Retry-After')
-                    try:
-                        retry_after = int(retry_after) if retry_after else None
-                    except (ValueError, TypeError):
-                        retry_after = None
-                    delay = get_delay(attempt, retry_delay, retry_after)
+                    breaker.record_failure()
+                    if breaker.state == breaker.OPEN:
+                        raise service_unavailable() from error
+                    delay = get_delay(
+                        attempt, retry_delay, get_retry_after(error)
+                    )
                     logger.warning(f'[{func.__name__}] Ошибка {status_code} '
                                    f'({type(error).__name__}), '
                                    f'попытка {attempt}/{max_retries}. '
                                    f'Повтор через {delay:.1f} сек...')
                     if attempt < max_retries:
-                        time.sleep(delay)
+                        cancellable_sleep(delay)
 
                 except (ReadTimeout, RemoteDisconnected, ConnectionError) as error:
                     last_error = error
+                    breaker.record_failure()
+                    if breaker.state == breaker.OPEN:
+                        raise service_unavailable() from error
                     delay = get_delay(attempt, retry_delay)
                     logger.warning(f'[{func.__name__}] Сетевая ошибка '
                                    f'({type(error).__name__}),'
                                    f'попытка {attempt}/{max_retries}. '
                                    f'Повтор через {delay:.1f} сек...')
                     if attempt < max_retries:
-                        time.sleep(delay)
+                        cancellable_sleep(delay)
 
                 except Exception as error:
                     logger.exception(f'[{func.__name__}] Неожиданная ошибка: {error}')
@@ -119,11 +484,37 @@ def safe_request(
     return decorator
 
 
-@api_cache(
-    'amadeus.reference_data.locations.cities.get',
-    ttl_hours=720
-)
-@safe_request()
+def build_cities_params(
+        keyword: str,
+        country_code: str = None,
+        max_cities: int = None,
+        include: str = None
+) -> dict:
+    """
+    Возвращает параметры запроса amadeus.reference_data.locations.cities.
+    Параметры описаны в get_cities.
+    """
+    params = {'keyword': keyword}
+    if country_code is not None:
+        params['countryCode'] = country_code
+    if max_cities is not None:
+        params['max'] = max_cities
+    if include is not None:
+        params['include'] = include
+    return params
+
+
+CITIES_END_POINT = 'amadeus.reference_data.locations.cities.get'
+
+# Локальный справочник городов (см. find_cities).
+city_index = CityIndex(fuzzy_cutoff=CITY_INDEX_FUZZY_CUTOFF)
+_city_index_loaded = False
+_city_index_lock = threading.Lock()
+
+
+@api_cache(CITIES_END_POINT, ttl_hours=720,
+           stale_ttl_hours=CACHE_STALE_TTL_HOURS)
+@safe_request(end_point=CITIES_END_POINT)
 def get_cities(
         keyword: str,
         country_code: str = None,
@@ -141,18 +532,129 @@ def get_cities(
         включаются аэропорты.
     :return: Ответ Amadeus в виде Response.result.
     """
-    params = {'keyword': keyword}
-    if country_code is not None:
-        params['countryCode'] = country_code
-    if max_cities is not None:
-        params['max'] = max_cities
-    if include is not None:
-        params['include'] = include
+    params = build_cities_params(keyword, country_code, max_cities, include)
     response = amadeus.reference_data.locations.cities.get(**params)
     return response.result
 
 
-@safe_request()
+def load_city_index() -> CityIndex:
+    """
+    Возвращает справочник городов city_index. При первом вызове загружает
+    в него города из CITY_INDEX_PATH и из кэшированных ответов get_cities.
+    """
+    global _city_index_loaded
+    with _city_index_lock:
+        if _city_index_loaded:
+            return city_index
+        try:
+            city_index.load_csv(CITY_INDEX_PATH)
+        except (OSError, KeyError, ValueError) as error:
+            logger.warning(f'Справочник городов {CITY_INDEX_PATH} '
+                           f'не загружен: {error}')
+        try:
+            for response in iter_cached_responses(CITIES_END_POINT):
+                city_index.add_cities(response.get('data') or [])
+        except PeeweeException as error:
+            logger.warning(f'Города из кэша не загружены: {error}')
+        _city_index_loaded = True
+        logger.info(f'Справочник городов: {len(city_index)} городов')
+    return city_index
+
+
+def find_cities(
+        keyword: str,
+        country_code: str = None,
+        max_cities: int = 50
+) -> dict:
+    """
+    Возвращает список городов по названию, введённому пользователем.
+
+    Города ищутся в Amadeus (get_cities, ответ кэшируется) и добавляются
+    в локальный справочник (см. load_city_index); к ним добавляются города
+    справочника с точно таким названием, которых нет в ответе. Справочник
+    содержит не все города-тёзки (например, Paris в США, London в Канаде),
+    поэтому без обращения к Amadeus города возвращаются, только если
+    указана страна и в справочнике есть город с таким названием в ней.
+    Если Amadeus ничего не нашёл (или недоступен), возвращаются города
+    справочника с таким названием, а если их нет - города, название
+    которых начинается с keyword или похоже на него (возможная опечатка).
+
+    :param keyword: Название города (или его начало), введённое
+        пользователем, в любом регистре.
+    :param country_code: Код страны согласно ISO 3166 Alpha-2.
+    :param max_cities: Максимальное количество городов.
+    :return: Ответ в формате get_cities; 'meta.source' - 'index', если
+        города найдены только в справочнике, 'suggestions' - если это лишь
+        похожие города из справочника.
+    :raises ExternalServiceUnavailable: Если Amadeus недоступен, а похожих
+        городов в справочнике нет.
+    """
+    index = load_city_index()
+    exact = index.find_exact(keyword, country_code, max_cities)
+    if exact and country_code is not None:
+        return {
+            'data': exact,
+            'meta': {'count': len(exact), 'source': 'index'},
+        }
+    try:
+        # Одинаковый запрос для 'london', 'London ' и 'LONDON' - общий кэш.
+        response = get_cities(
+            ' '.join(keyword.split()).upper(), country_code=country_code
+        )
+    except ExternalServiceUnavailable:
+        if exact:
+            return {
+                'data': exact,
+                'meta': {'count': len(exact), 'source': 'index'},
+            }
+        cities = index.search(keyword, country_code, max_cities)
+        if not cities:
+            raise
+    else:
+        if response.get('data'):
+            index.add_cities(response['data'])
+            return merge_cities(response, exact, max_cities)
+        if exact:
+            return {
+                'data': exact,
+                'meta': {'count': len(exact), 'source': 'index'},
+            }
+        cities = index.search(keyword, country_code, max_cities)
+        if not cities:
+            return response
+    return {
+        'data': cities,
+        'meta': {'count': len(cities), 'source': 'suggestions'},
+    }
+
+
+def merge_cities(response: dict, cities: list[dict], max_cities: int) -> dict:
+    """
+    Добавляет к ответу get_cities города справочника, которых в нём нет
+    (тот же код IATA и название, см. normalize_city_name).
+
+    :param response: Ответ get_cities (не изменяется).
+    :param cities: Города справочника.
+    :param max_cities: Максимальное количество городов.
+    :return: Ответ в формате get_cities.
+    """
+    found = {
+        (city.get('iataCode'), normalize_city_name(city.get('name') or ''))
+        for city in response['data']
+    }
+    missing = [
+        city for city in cities
+        if (city.get('iataCode'), normalize_city_name(city.get('name') or ''))
+        not in found
+    ]
+    if not missing:
+        return response
+    data = (response['data'] + missing)[:max_cities]
+    return {**response, 'data': data,
+            'meta': {**response.get('meta', {}), 'count': len(data)}}
+
+
+@safe_request(end_point='amadeus.reference_data.locations.get')
 def get_locations(
         keyword: str,
         subtype: list[str] | str = 'CITY',
@@ -187,11 +689,114 @@ def get_locations(
     return amadeus.reference_data.locations.get(**params)
 
 
-@api_cache(
-    'amadeus.reference_data.locations.hotels.by_city.get',
-    ttl_hours=720
-)
-@safe_request()
+def build_hotels_by_city_params(
+        city_code: str,
+        radius: int = 5,
+        radius_unit: str = 'KM',
+        chain_codes: list[str] = None,
+        amenities: list[str] = None,
+        ratings: list[int] = None,
+        hotel_source: str = 'ALL'
+) -> dict:
+    """
+    Возвращает параметры запроса
+    amadeus.reference_data.locations.hotels.by_city.
+    Параметры описаны в get_hotels_by_city.
+    """
+    params = {
+        'cityCode': city_code,
+        'radius': radius,
+        'radiusUnit': radius_unit,
+        'hotelSource': hotel_source
+    }
+    if chain_codes is not None:
+        params['chainCodes'] = ','.join(chain_codes)
+    if amenities is not None:
+        params['amenities'] = ','.join(amenities)
+    if ratings is not None:
+        params['ratings'] = ','.join(str(item) for item in ratings)
+    else:
+        params['ratings'] = '1,3,4,5' # Будет поиск отелей с любым рейтингом
+    return params
+
+
+HOTELS_BY_CITY_END_POINT = 'amadeus.reference_data.locations.hotels.by_city.get'
+HOTELS_BY_CITY_TTL_HOURS = 720
+# Максимальный радиус поиска отелей, допустимый в Amadeus.
+HOTELS_BY_CITY_MAX_RADIUS = 300
+# Фильтры поиска отелей, порядок значений в которых не важен (ключ кэша
+# не зависит от порядка, см. make_call_hash).
+HOTELS_BY_CITY_UNORDERED_PARAMS = ('chain_codes', 'amenities', 'ratings')
+
+# Отели городов, полученные с максимальным радиусом (см. get_hotels_by_city).
+hotels_by_city_index = HotelIndexRegistry(max_size=HOTELS_INDEX_MAX_CITIES)
+
+
+def hotels_by_city_index_key(
+        city_code: str,
+        radius_unit: str = 'KM',
+        chain_codes: list[str] = None,
+        amenities: list[str] = None,
+        ratings: list[int] = None,
+        hotel_source: str = 'ALL'
+) -> tuple:
+    """
+    Возвращает ключ индекса hotels_by_city_index. Параметры описаны
+    в get_hotels_by_city. Как и в ключе кэша
+    (HOTELS_BY_CITY_UNORDERED_PARAMS), порядок значений фильтров не важен. None (фильтр не задан) и пустой
+    список различаются: в запрос они передаются по-разному
+    (см. build_hotels_by_city_params).
+    """
+    def filter_key(values: list | None) -> tuple | None:
+        return None if values is None else tuple(sorted(set(values)))
+
+    return (
+        city_code, radius_unit, filter_key(chain_codes),
+        filter_key(amenities), filter_key(ratings), hotel_source
+    )
+
+
+def hotels_within_radius(index: HotelDistanceIndex, radius: int) -> dict:
+    """
+    Возвращает отели индекса города в пределах радиуса в виде ответа
+    amadeus.reference_data.locations.hotels.by_city.
+
+    :param index: Индекс отелей города.
+    :param radius: Радиус поиска от центра.
+    :return: Словарь {'data': отели в порядке удаления от центра,
+        'meta': {'count': количество отелей}}.
+    """
+    hotels = index.within(min(radius, HOTELS_BY_CITY_MAX_RADIUS))
+    return {'data': hotels, 'meta': {'count': len(hotels)}}
+
+
+@api_cache(HOTELS_BY_CITY_END_POINT, ttl_hours=HOTELS_BY_CITY_TTL_HOURS,
+           stale_ttl_hours=CACHE_STALE_TTL_HOURS,
+           unordered_params=HOTELS_BY_CITY_UNORDERED_PARAMS)
+@safe_request(end_point=HOTELS_BY_CITY_END_POINT)
+def get_hotels_by_city_max_radius(
+        city_code: str,
+        radius_unit: str = 'KM',
+        chain_codes: list[str] = None,
+        amenities: list[str] = None,
+        ratings: list[int] = None,
+        hotel_source: str = 'ALL'
+) -> dict:
+    """
+    Возвращает информацию об отелях в указанном городе в пределах
+    максимального радиуса HOTELS_BY_CITY_MAX_RADIUS.
+    Параметры описаны в get_hotels_by_city.
+
+    :return: Ответ Amadeus в виде Response.result.
+    """
+    params = build_hotels_by_city_params(
+        city_code, HOTELS_BY_CITY_MAX_RADIUS, radius_unit, chain_codes,
+        amenities, ratings, hotel_source
+    )
+    response = amadeus.reference_data.locations.hotels.by_city.get(**params)
+    return response.result
+
+
 def get_hotels_by_city(
         city_code: str,
         radius: int = 5,
@@ -206,6 +811,14 @@ def get_hotels_by_city(
     """
     Возвращает информацию об отелях в указанном городе.
 
+    Отели города запрашиваются в Amadeus один раз с максимальным радиусом
+    (get_hotels_by_city_max_radius) и хранятся в памяти упорядоченными
+    по расстоянию от центра, поэтому при изменении радиуса повторный запрос
+    не выполняется, а отели отбираются по 'distance.value'. Индекс
+    используется, пока не изменилась запись кэша, по которой он построен;
+    когда она устаревает, ответ снова берётся из api_cache (с обновлением
+    в фоне, см. CACHE_STALE_TTL_HOURS), и индекс строится заново.
+
     :param city_code: Код города назначения или аэропорта. Если указан код
         города, поиск будет производиться по центру города. Доступные коды
         можно найти в таблице кодов IATA (3 буквы кода IATA).
@@ -218,31 +831,117 @@ def get_hotels_by_city(
     :param ratings: Звезды отеля. В строке можно указать до четырех значений.
     :param hotel_source: Источник отелей со значениями 'BEDBANK'
         для агрегаторов, 'DIRECT CHAIN' для GDS / дистрибуции и 'ALL' для обоих.
-    :return: Ответ Amadeus в виде Response.result.
+    :return: Ответ Amadeus в виде Response.result (отели в порядке удаления
+        от центра, 'meta' содержит только количество отелей).
     """
-    params = {
-        'cityCode': city_code,
-        'radius': radius,
-        'radiusUnit': radius_unit,
-        'hotelSource': hotel_source
+    city_params = {
+        'city_code': city_code,
+        'radius_unit': radius_unit,
+        'chain_codes': chain_codes,
+        'amenities': amenities,
+        'ratings': ratings,
+        'hotel_source': hotel_source,
     }
-    if chain_codes is not None:
-        params['chainCodes'] = ','.join(chain_codes)
-    if amenities is not None:
-        params['amenities'] = ','.join(amenities)
-    if ratings is not None:
-        params['ratings'] = ','.join(str(item) for item in ratings)
-    else:
-        params['ratings'] = '1,3,4,5' # Будет поиск отелей с любым рейтингом
-    response = amadeus.reference_data.locations.hotels.by_city.get(**params)
-    return response.result
+    key = hotels_by_city_index_key(**city_params)
+    # Срок жизни записи кэша читается до запроса: ответ не старше этой
+    # версии, поэтому индекс не помечается версией более нового ответа.
+    version = get_cache_expires_at(
+        HOTELS_BY_CITY_END_POINT,
+        get_hotels_by_city_max_radius.cache_key(**city_params)
+    )
+    index = None
+    if version is not None and version >= datetime.now():
+        index = hotels_by_city_index.get(key, version)
+    if index is None:
+        response = get_hotels_by_city_max_radius(**city_params)
+        index = hotels_by_city_index.put(
+            key, response.get('data') or [], version
+        )
+    return hotels_within_radius(index, radius)
 
 
-@api_cache(
-    'amadeus.reference_data.locations.hotels.by_hotels.get',
-    ttl_hours=720
+def get_hotel_records(
+        end_point: str,
+        hotel_ids: list[str],
+        fetch_batch,
+        batch_size: int,
+        ttl_hours: float,
+        timeout: float | None = None
+) -> tuple[list[dict], list[dict]]:
+    """
+    Возвращает записи об отелях (элементы 'data' ответа Amadeus), используя
+    кэш, в котором каждая запись хранится отдельно по идентификатору отеля.
+    В Amadeus запрашиваются только отсутствующие в кэше отели, частями
+    не более batch_size идентификаторов, параллельно (см. map_batches).
+    Полученные записи сохраняются в кэш по одной на отель, в том числе
+    отметка об отсутствии данных. Часть, завершившаяся ошибкой, пропускается.
+
+    :param end_point: Метка (namespace) кэша.
+    :param hotel_ids: Список идентификаторов отелей.
+    :param fetch_batch: Функция запроса части списка, возвращающая
+        Response.result.
+    :param batch_size: Максимальное количество идентификаторов в запросе.
+    :param ttl_hours: Время жизни записей кэша (в часах).
+    :param timeout: Общее время ожидания ответов (в секундах). Ответы,
+        пришедшие позже, в результат не попадают, но сохраняются в кэш.
+    :return: Кортеж из списка найденных записей в порядке hotel_ids и списка
+        ответов Amadeus на выполненные запросы.
+    """
+    hotel_ids = list(dict.fromkeys(hotel_ids))
+    cache_keys = make_item_hashes(hotel_ids)
+    records = get_cached_responses(end_point, list(cache_keys.values()))
+    missing_ids = [
+        hotel_id for hotel_id in hotel_ids if cache_keys[hotel_id] not in records
+    ]
+
+    def fetch_and_store(batch: list[str]) -> tuple[dict, dict] | None:
+        try:
+            batch_result = fetch_batch(batch)
+        except SearchInterrupted:
+            raise
+        except Exception as error:
+            logger.error(f'[{end_point}] Batch {batch} не удалось '
+                         f'получить {error}')
+            return None
+        batch_records = {
+            record['hotelId']: record
+            for record in batch_result.get('data') or []
+        }
+        fetched = {
+            cache_keys[hotel_id]: {'data': batch_records.get(hotel_id)}
+            for hotel_id in batch
+        }
+        save_cache_responses(end_point, fetched, ttl_hours=ttl_hours)
+        return batch_result, fetched
+
+    responses = []
+    for batch_result in map_batches(
+            fetch_and_store,
+            split_batches(missing_ids, batch_size),
+            timeout=timeout
+    ):
+        if batch_result is None:
+            continue
+        response, fetched = batch_result
+        responses.append(response)
+        records.update(fetched)
+
+    data = [
+        records[cache_keys[hotel_id]]['data'] for hotel_id in hotel_ids
+        if records.get(cache_keys[hotel_id], {}).get('data') is not None
+    ]
+    return data, responses
+
+
+@safe_request(
+    end_point='amadeus.reference_data.locations.hotels.by_hotels.get'
 )
-@safe_request()
+def _hotels_by_hotels_request(hotel_ids: list[str]) -> dict:
+    return amadeus.reference_data.locations.hotels.by_hotels.get(
+        hotelIds=','.join(hotel_ids)
+    ).result
+
+
 def get_hotels_by_hotels(hotel_ids: list[str]) -> dict:
     """
     Возвращает список отелей по их идентификатору.
@@ -251,37 +950,267 @@ def get_hotels_by_hotels(hotel_ids: list[str]) -> dict:
     :return: Ответ Amadeus в виде Response.result.
     """
     HOTEL_IDS_MAX = 99
-    pointer_left = 0
-    hotel_ids_len = len(hotel_ids)
-    pointer_right = HOTEL_IDS_MAX if HOTEL_IDS_MAX < hotel_ids_len \
-        else hotel_ids_len
-    result = {
-        'data': [],
-        'meta': []
+    data, responses = get_hotel_records(
+        'amadeus.reference_data.locations.hotels.by_hotels.get',
+        hotel_ids,
+        _hotels_by_hotels_request,
+        HOTEL_IDS_MAX,
+        ttl_hours=720
+    )
+    return {
+        'data': data,
+        'meta': [response.get('meta') for response in responses]
     }
-    while pointer_left < hotel_ids_len:
-        response = amadeus.reference_data.locations.hotels.by_hotels.get(
-            hotelIds=','.join(hotel_ids[pointer_left:pointer_right])
-        )
-        if response.result.get('data') is not None:
-            result['data'].extend(response.result['data'])
-        result['meta'].append(response.result['meta'])
-        pointer_left = pointer_right
-        pointer_right += HOTEL_IDS_MAX
-        if pointer_right >= hotel_ids_len:
-            pointer_right = hotel_ids_len
-    return result
 
 
-@safe_request()
+HOTEL_OFFERS_END_POINT = 'amadeus.shopping.hotel_offers_search.get'
+HOTEL_OFFERS_TTL_HOURS = 1
+# Счётчики разбиения batch предложений, отклонённых из-за NoRoomsAvailable
+# или ClientError.
+offers_split_stats = BatchSplitStats()
+# Повторная отправка медленных batch предложений.
+offers_hedge_policy = HedgePolicy(
+    percentile=AMADEUS_HEDGE_PERCENTILE,
+    budget_percent=AMADEUS_HEDGE_BUDGET_PERCENT,
+    min_samples=AMADEUS_HEDGE_MIN_SAMPLES
+)
+# Кэш отелей, в которых нет номеров на даты поиска (NoRoomsAvailable или
+# предложение с 'available': false) или из-за которых Amadeus отклонил
+# запрос (ClientError). Записи создаются только для отдельных отелей:
+# batch с такой ошибкой сначала делится до одного отеля (см. iter_batches).
+HOTEL_UNAVAILABLE_END_POINT = 'amadeus.shopping.hotel_offers_search.unavailable'
+
+
+def unavailable_cache_keys(
+        hotel_ids: list[str], offer_params: dict
+) -> dict[str, str]:
+    """
+    Возвращает ключи кэша недоступных отелей: отель, даты и количество
+    гостей (остальные параметры предложений на наличие номеров не влияют).
+
+    :param hotel_ids: Коды отелей Amadeus.
+    :param offer_params: Параметры запроса (см. build_offer_params).
+    :return: Словарь {код отеля: ключ}.
+    """
+    return make_item_hashes(hotel_ids, {
+        'checkInDate': offer_params.get('checkInDate'),
+        'checkOutDate': offer_params.get('checkOutDate'),
+        'adults': offer_params.get('adults'),
+    })
+
+
+def get_unavailable_hotels(
+        hotel_ids: list[str], offer_params: dict
+) -> set[str]:
+    """
+    Возвращает отели из списка, которые недавно были недоступны на даты
+    поиска (см. mark_unavailable_hotels).
+
+    :param hotel_ids: Коды отелей Amadeus.
+    :param offer_params: Параметры запроса (см. build_offer_params).
+    :return: Множество кодов недоступных отелей.
+    """
+    keys = {
+        key: hotel_id for hotel_id, key
+        in unavailable_cache_keys(hotel_ids, offer_params).items()
+    }
+    cached = get_cached_responses(HOTEL_UNAVAILABLE_END_POINT, list(keys))
+    return {keys[key] for key in cached}
+
+
+def mark_unavailable_hotels(
+        hotel_ids: list[str], offer_params: dict, reason: str,
+        ttl_minutes: float
+) -> None:
+    """
+    Запоминает, что отели недоступны на даты поиска: в течение ttl_minutes
+    их предложения не запрашиваются.
+
+    :param hotel_ids: Коды отелей Amadeus.
+    :param offer_params: Параметры запроса (см. build_offer_params).
+    :param reason: Причина (для отладки): 'no_rooms', 'not_available'
+        или 'error'.
+    :param ttl_minutes: Время жизни записей (в минутах).
+    """
+    if not hotel_ids:
+        return
+    save_cache_responses(
+        HOTEL_UNAVAILABLE_END_POINT,
+        {
+            key: {'data': reason} for key
+            in unavailable_cache_keys(hotel_ids, offer_params).values()
+        },
+        ttl_hours=ttl_minutes / 60
+    )
+
+
+@safe_request(end_point=HOTEL_OFFERS_END_POINT,
+              on_latency=offers_hedge_policy.record_latency)
 def _hotel_offers_request(**params):
     return amadeus.shopping.hotel_offers_search.get(**params)
 
 
-@api_cache(
-    'amadeus.shopping.hotel_offers_search.get',
-    ttl_hours=1
-)
+def build_offer_params(
+        guest_adults: int = 1,
+        check_in_date: str = None,
+        check_out_date: str = None,
+        country_of_residence: str = None,
+        room_quantity: int = 1,
+        price_range: str = None,
+        currency: str = None,
+        payment_policy: str = 'NONE',
+        board_type: str = None,
+        include_closed: bool = True,
+        best_rate_only: bool = True,
+        lang: str = None
+) -> dict:
+    """
+    Возвращает параметры запроса amadeus.shopping.hotel_offers_search
+    (кроме hotelIds). Параметры описаны в get_hotel_offers_search.
+    """
+    offer_params = {
+        'adults': guest_adults,
+        'roomQuantity': room_quantity,
+        'paymentPolicy': payment_policy,
+        'includeClosed': str(include_closed).lower(),
+        'bestRateOnly': str(best_rate_only).lower(),
+    }
+    if check_in_date is not None:
+        offer_params['checkInDate'] = check_in_date
+    if check_out_date is not None:
+        offer_params['checkOutDate'] = check_out_date
+    if country_of_residence is not None:
+        offer_params['countryOfResidence'] = country_of_residence
+    if price_range is not None:
+        offer_params['priceRange'] = price_range
+    if currency is not None:
+        offer_params['currency'] = currency
+    if board_type is not None:
+        offer_params['boardType'] = board_type
+    if lang is not None:
+        offer_params['lang'] = lang
+    return offer_params
+
+
+def iter_hotel_offers_search(hotel_ids: list[str], **offer_kwargs):
+    """
+    Запрашивает предложения от указанных отелей и отдаёт их частями по мере
+    получения: сначала все найденные в кэше, затем ответ каждого batch
+    сразу после его завершения.
+
+    :param hotel_ids: Список кодов отелей Amadeus.
+    :param offer_kwargs: Остальные параметры get_hotel_offers_search.
+    :return: Генератор словарей {'data': список предложений,
+        'meta': 'meta' ответа Amadeus или None для предложений из кэша}.
+    """
+    offer_params = build_offer_params(**offer_kwargs)
+    HOTEL_IDS_MAX = 20
+
+    # Предложения кэшируются по каждому отелю отдельно, поэтому при небольшом
+    # изменении списка отелей запрашиваются только отсутствующие в кэше.
+    cache_keys = make_item_hashes(hotel_ids, offer_params)
+    offers = get_cached_responses(
+        HOTEL_OFFERS_END_POINT, list(cache_keys.values())
+    )
+    missing_ids = list(dict.fromkeys(
+        hotel_id for hotel_id in hotel_ids if cache_keys[hotel_id] not in offers
+    ))
+    # Отели, недавно недоступные на эти даты, повторно не запрашиваются.
+    unavailable_ids = get_unavailable_hotels(missing_ids, offer_params)
+    missing_ids = [
+        hotel_id for hotel_id in missing_ids if hotel_id not in unavailable_ids
+    ]
+
+    def fetch_batch(
+            batch: list[str], single_flight: bool = True
+    ) -> dict | None:
+        batch_params = {'hotelIds': ','.join(batch), **offer_params}
+        try:
+            if not single_flight:
+                return _hotel_offers_request(**batch_params).result
+            # Одинаковые batch одновременных поисков запрашиваются один раз.
+            return call_single_flight(
+                (HOTEL_OFFERS_END_POINT, make_request_hash(batch_params)),
+                lambda: _hotel_offers_request(**batch_params).result
+            )
+        except (NoRoomsAvailable, ClientError) as error:
+            # Batch из нескольких отелей делит пополам iter_batches
+            # (см. split_on), пока не останется один отель, из-за которого
+            # отклонён batch. Запоминается только этот отель.
+            if len(batch) == 1:
+                if isinstance(error, NoRoomsAvailable):
+                    mark_unavailable_hotels(
+                        batch, offer_params, 'no_rooms',
+                        AMADEUS_UNAVAILABLE_TTL_MINUTES
+                    )
+                else:
+                    mark_unavailable_hotels(
+                        batch, offer_params, 'error',
+                        AMADEUS_ERROR_TTL_MINUTES
+                    )
+            raise
+        except (ExternalServiceUnavailable, SearchInterrupted):
+            raise
+        except Exception as error:
+            # Ошибка, не связанная с конкретным отелем (например, сервера
+            # после всех повторов), в кэш недоступных отелей не попадает.
+            logger.error(f'Batch {batch} не удалось получить {error}')
+            return None
+
+    cached_offers = [
+        offers[cache_keys[hotel_id]]['data']
+        for hotel_id in dict.fromkeys(hotel_ids)
+        if offers.get(cache_keys[hotel_id], {}).get('data') is not None
+    ]
+    if cached_offers:
+        yield {'data': cached_offers, 'meta': None}
+
+    batches = split_batches(missing_ids, HOTEL_IDS_MAX)
+    # Amadeus отклоняет весь batch, если в одном из отелей нет номеров
+    # или код отеля неверен (ClientError). Такой batch делится пополам,
+    # пока этот отель не будет найден, чтобы не потерять предложения
+    # остальных отелей.
+    for index, batch, batch_result in iter_batches(
+            fetch_batch,
+            batches,
+            split_on=(NoRoomsAvailable, ClientError),
+            split_stats=offers_split_stats,
+            hedge=offers_hedge_policy,
+            # Повторный запрос не должен присоединяться к медленному.
+            hedge_fetch=partial(fetch_batch, single_flight=False)
+    ):
+        if batch_result is None:
+            continue
+        batch_offers = {
+            offer['hotel']['hotelId']: offer
+            for offer in batch_result.get('data') or []
+        }
+        mark_unavailable_hotels(
+            [
+                hotel_id for hotel_id, offer in batch_offers.items()
+                if offer.get('available') is False
+            ],
+            offer_params, 'not_available', AMADEUS_UNAVAILABLE_TTL_MINUTES
+        )
+        # Отель без предложения в успешном ответе тоже запоминается,
+        # чтобы не запрашивать его повторно в пределах TTL.
+        save_cache_responses(
+            HOTEL_OFFERS_END_POINT,
+            {
+                cache_keys[hotel_id]: {'data': batch_offers.get(hotel_id)}
+                for hotel_id in batch
+            },
+            ttl_hours=HOTEL_OFFERS_TTL_HOURS
+        )
+        batch_data = [
+            batch_offers[hotel_id] for hotel_id in batch
+            if hotel_id in batch_offers
+        ]
+        if len(batch) < len(batches[index]):
+            offers_split_stats.record_recovered(len(batch_data))
+        yield {'data': batch_data, 'meta': batch_result.get('meta')}
+
+
 def get_hotel_offers_search(
         hotel_ids: list[str],
         guest_adults: int = 1,
@@ -337,73 +1266,38 @@ def get_hotel_offers_search(
         Примеры: 'FR', 'fr', 'fr-FR'. Если язык недоступен, текст будет
         возвращен на английском языке. Код языка ISO
         (https://www.iso.org/iso-639-language-codes.html).
-    :return: Ответ Amadeus в виде Response.result.
+    :return: Ответ Amadeus в виде Response.result. Предложения отелей,
+        найденные в кэше, в Amadeus повторно не запрашиваются, поэтому 'meta'
+        содержит только ответы на выполненные запросы (в порядке получения).
     """
-    offer_params = {
-        'adults': guest_adults,
-        'roomQuantity': room_quantity,
-        'paymentPolicy': payment_policy,
-        'includeClosed': str(include_closed).lower(),
-        'bestRateOnly': str(best_rate_only).lower(),
-    }
-    if check_in_date is not None:
-        offer_params['checkInDate'] = check_in_date
-    if check_out_date is not None:
-        offer_params['checkOutDate'] = check_out_date
-    if country_of_residence is not None:
-        offer_params['countryOfResidence'] = country_of_residence
-    if price_range is not None:
-        offer_params['priceRange'] = price_range
-    if currency is not None:
-        offer_params['currency'] = currency
-    if board_type is not None:
-        offer_params['boardType'] = board_type
-    if lang is not None:
-        offer_params['lang'] = lang
-    HOTEL_IDS_MAX = 20
-    pointer_left = 0
-    hotel_ids_len = len(hotel_ids)
-    pointer_right = HOTEL_IDS_MAX if HOTEL_IDS_MAX < hotel_ids_len \
-        else hotel_ids_len
     result = {
         'data': [],
         'meta': []
     }
-
-    def move_pointer():
-        nonlocal pointer_left, pointer_right
-        pointer_left = pointer_right
-        pointer_right += HOTEL_IDS_MAX
-        if pointer_right >= hotel_ids_len:
-            pointer_right = hotel_ids_len
-
-    while pointer_left < hotel_ids_len:
-        offer_params['hotelIds'] = ','.join(
-            hotel_ids[pointer_left:pointer_right]
-        )
-
-        try:
-            response = _hotel_offers_request(**offer_params)
-        except NoRoomsAvailable:
-            logger.info(
-                f'Нет доступных номеров для batch '
-                f'{hotel_ids[pointer_left:pointer_right]}'
-            )
-            move_pointer()
-            continue
-
-        except Exception as error:
-            logger.error(
-                f'Batch {hotel_ids[pointer_left:pointer_right]}'
-                f'не удалось получить {error}'
-            )
-            move_pointer()
-            continue
-
-        if response.result.get('data') is not None:
-            result['data'].extend(response.result.get('data'))
-        result['meta'].append(response.result.get('meta'))
-        move_pointer()
+    offers = {}
+    for batch_result in iter_hotel_offers_search(
+            hotel_ids,
+            guest_adults=guest_adults,
+            check_in_date=check_in_date,
+            check_out_date=check_out_date,
+            country_of_residence=country_of_residence,
+            room_quantity=room_quantity,
+            price_range=price_range,
+            currency=currency,
+            payment_policy=payment_policy,
+            board_type=board_type,
+            include_closed=include_closed,
+            best_rate_only=best_rate_only,
+            lang=lang
+    ):
+        for offer in batch_result['data']:
+            offers[offer['hotel']['hotelId']] = offer
+        if batch_result['meta'] is not None:
+            result['meta'].append(batch_result['meta'])
+
+    for hotel_id in dict.fromkeys(hotel_ids):
+        if hotel_id in offers:
+            result['data'].append(offers[hotel_id])
 
     return result
 
@@ -412,7 +1306,7 @@ def get_hotel_offers_search(
     'amadeus.shopping.hotel_offer_search(offer_id).get',
     ttl_hours=24
 )
-@safe_request()
+@safe_request(end_point='amadeus.shopping.hotel_offer_search(offer_id).get')
 def get_hotel_offer(offer_id: str, lang: str = None) -> dict:
     """
     Возвращает окончательную цену и условия бронирования.
@@ -434,7 +1328,7 @@ def get_hotel_offer(offer_id: str, lang: str = None) -> dict:
     return response.result
 
 
-@safe_request()
+@safe_request(end_point='amadeus.booking.hotel_orders.post')
 def post_hotel_orders(
         guests: list[dict[str, str]],
         travel_agent: dict,
@@ -522,47 +1416,54 @@ def post_hotel_orders(
     return response.result
 
 
-@api_cache(
-    'amadeus.e_reputation.hotel_sentiments.get',
-    ttl_hours=720)
-@safe_request()
-def get_hotel_sentiments_raw(hotel_ids: list[str]) -> dict:
+@safe_request(end_point='amadeus.e_reputation.hotel_sentiments.get')
+def _hotel_sentiments_request(hotel_ids: list[str]) -> dict:
+    return amadeus.e_reputation.hotel_sentiments.get(
+        hotelIds=','.join(hotel_ids)
+    ).result
+
+
+def get_hotel_sentiments_raw(
+        hotel_ids: list[str], timeout: float | None = None
+) -> dict:
     """
     Возвращает рейтинги и оценки отелей на основе отзывов клиентов.
 
     :param hotel_ids: Список строк с идентификаторами отелей.
         Например:
             ['TELONMFS', 'PILONBHG', 'RTLONWAT']
+    :param timeout: Общее время ожидания ответов (в секундах). Отели,
+        отзывы о которых не получены за это время, в ответ не попадают.
     :return: Ответ Amadeus в виде Response.result.
     """
     HOTEL_IDS_MAX = 3
-    pointer_left = 0
-    hotel_ids_len = len(hotel_ids)
-    pointer_right = HOTEL_IDS_MAX if HOTEL_IDS_MAX < hotel_ids_len \
-        else hotel_ids_len
+    data, responses = get_hotel_records(
+        'amadeus.e_reputation.hotel_sentiments.get',
+        hotel_ids,
+        _hotel_sentiments_request,
+        HOTEL_IDS_MAX,
+        ttl_hours=720,
+        timeout=timeout
+    )
     result = {
-        'data': [],
+        'data': data,
         'meta': [],
         'warnings': []
     }
-    while pointer_left < hotel_ids_len:
-        response = amadeus.e_reputation.hotel_sentiments.get(
-            hotelIds=','.join(hotel_ids[pointer_left:pointer_right])
-        )
-        if response.result.get('data') is not None:
-            result['data'].extend(response.result['data'])
-        result['meta'].append(response.result['meta'])
-        if response.result.get('warnings') is not None:
-            result['warnings'].extend(response.result['warnings'])
-        pointer_left = pointer_right
-        pointer_right += HOTEL_IDS_MAX
-        if pointer_right >= hotel_ids_len:
-            pointer_right = hotel_ids_len
+    for response in responses:
+        result['meta'].append(response.get('meta'))
+        if response.get('warnings') is not None:
+            result['warnings'].extend(response['warnings'])
     return result
 
-def get_hotel_sentiments(hotel_ids: list[str]) -> dict:
+
+def get_hotel_sentiments(
+        hotel_ids: list[str], timeout: float = AMADEUS_SENTIMENTS_TIMEOUT
+) -> dict:
     try:
-        return get_hotel_sentiments_raw(hotel_ids)
+        return get_hotel_sentiments_raw(hotel_ids, timeout=timeout)
+    except SearchCancelled:
+        raise
     except Exception as error:
         logger.warning(f'Отзывы недоступны. Ошибка: {error}')
         return {'data': []}
@@ -3,6 +3,7 @@ from urllib.parse import quote_plus, urlparse
 
 import requests
 
+from config_data.config import CACHE_STALE_TTL_HOURS
 from utils.cache_response import api_cache
 
 BAD_HOSTS = [
@@ -142,7 +143,8 @@ def get_urls_photos_hotel_from(
     return candidates[:max_images]
 
 
-@api_cache('hotel_photos_fallback', ttl_hours=720)
+@api_cache('hotel_photos_fallback', ttl_hours=720,
+           stale_ttl_hours=CACHE_STALE_TTL_HOURS)
 def get_urls_photos_hotel(
         hotel_name: str,
         city: str,
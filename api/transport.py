@@ -0,0 +1,98 @@
+import threading
+from urllib.request import Request
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+
+class PooledResponse:
+    """
+    Ответ PooledTransport в виде, который ожидает amadeus.Client
+    (аналог http.client.HTTPResponse, возвращаемого urlopen).
+    """
+
+    def __init__(self, status: int, headers: dict[str, str], body: bytes):
+        self.status = status
+        self.code = status
+        # Amadeus ищет заголовки с учётом регистра ('Content-Type').
+        self.headers = {key.title(): value for key, value in headers.items()}
+        self._body = body
+
+    def getheaders(self) -> list[tuple[str, str]]:
+        return list(self.headers.items())
+
+    def read(self) -> bytes:
+        return self._body
+
+
+class PooledTransport:
+    """
+    HTTP-клиент для amadeus.Client (параметр http), совместимый с urlopen.
+    В отличие от urlopen, использует пул постоянных (keep-alive) соединений,
+    поэтому TLS-соединение не устанавливается заново для каждого запроса.
+    Если все соединения пула заняты, запрос не ждёт освобождения соединения
+    (такое ожидание не ограничено по времени и не прерывается отменой
+    поиска), а открывает дополнительное, которое закрывается после запроса.
+    """
+
+    def __init__(
+            self,
+            pool_size: int = 10,
+            connect_timeout: float = 5,
+            read_timeout: float = 30
+    ):
+        """
+        :param pool_size: Количество соединений с одним хостом, которые
+            остаются открытыми между запросами.
+        :param connect_timeout: Время ожидания соединения (в секундах).
+        :param read_timeout: Время ожидания ответа (в секундах).
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_size,
+            pool_block=False
+        )
+        self.session = Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def __call__(self, http_request: Request) -> PooledResponse:
+        """
+        Выполняет запрос, подготовленный amadeus.Client.
+
+        :param http_request: Запрос urllib.request.Request.
+        :return: Ответ сервера.
+        :raises requests.RequestException: При сетевых ошибках и таймаутах.
+        """
+        response = self.session.request(
+            http_request.get_method(),
+            http_request.full_url,
+            data=http_request.data,
+            headers=dict(http_request.header_items()),
+            timeout=self.timeout
+        )
+        with self._lock:
+            self._requests += 1
+        return PooledResponse(
+            response.status_code, dict(response.headers), response.content
+        )
+
+    def stats(self) -> dict[str, int]:
+        """
+        Возвращает счётчики использования соединений:
+        * requests - выполнено запросов;
+        * connections - открыто новых соединений;
+        * reused - запросов, выполненных по уже открытому соединению.
+        """
+        pools = self.adapter.poolmanager.pools
+        connections = sum(pools[key].num_connections for key in pools.keys())
+        with self._lock:
+            requests = self._requests
+        return {
+            'requests': requests,
+            'connections': connections,
+            'reused': max(0, requests - connections),
+        }
@@ -10,6 +10,152 @@ else:
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 AMADEUS_API_KEY = os.getenv('AMADEUS_API_KEY')
 AMADEUS_API_SECRET = os.getenv('AMADEUS_API_SECRET')
+# Сервер Amadeus. По умолчанию (AMADEUS_HOST не задан) - тестовое окружение
+# Amadeus; для локального сервера amadeus_stub: AMADEUS_HOST=localhost,
+# AMADEUS_PORT=8088, AMADEUS_SSL=false.
+AMADEUS_HOST = os.getenv('AMADEUS_HOST') or None
+AMADEUS_SSL = os.getenv('AMADEUS_SSL', 'true').lower() in ('true', '1', 'yes')
+AMADEUS_PORT = int(os.getenv('AMADEUS_PORT', 443 if AMADEUS_SSL else 80))
+
+# Количество потоков, обрабатывающих сообщения бота.
+BOT_NUM_THREADS = int(os.getenv('BOT_NUM_THREADS', 2))
+
+# Максимальное число одновременно выполняемых пакетных запросов к Amadeus
+# в рамках одного поиска.
+AMADEUS_MAX_PARALLEL_BATCHES = int(
+    os.getenv('AMADEUS_MAX_PARALLEL_BATCHES', 4)
+)
+# Пул постоянных HTTP-соединений с Amadeus. По умолчанию - по соединению
+# на каждый поток, который может обращаться к Amadeus одновременно: потоки
+# бота, их пакетные и повторные (hedge) запросы, а также 4 фоновых потока
+# (2 - обновление кэша, прогрев кэша и обновление токена доступа).
+# Если пул занят, открывается дополнительное соединение (оно закрывается
+# после запроса), поэтому запрос не ожидает освобождения пула.
+AMADEUS_HTTP_POOL_SIZE = int(
+    os.getenv('AMADEUS_HTTP_POOL_SIZE',
+              BOT_NUM_THREADS * (1 + AMADEUS_MAX_PARALLEL_BATCHES
+                                 + max(1, AMADEUS_MAX_PARALLEL_BATCHES // 2))
+              + 4)
+)
+# Время ожидания (в секундах) соединения с Amadeus и ответа Amadeus.
+AMADEUS_CONNECT_TIMEOUT = float(os.getenv('AMADEUS_CONNECT_TIMEOUT', 5))
+AMADEUS_READ_TIMEOUT = float(os.getenv('AMADEUS_READ_TIMEOUT', 30))
+# Общее для процесса ограничение частоты запросов к Amadeus: не более
+# AMADEUS_RATE_LIMIT запросов в секунду с всплеском до AMADEUS_RATE_BURST.
+AMADEUS_RATE_LIMIT = float(os.getenv('AMADEUS_RATE_LIMIT', 10))
+AMADEUS_RATE_BURST = int(os.getenv('AMADEUS_RATE_BURST', 1))
+# Дополнительные ограничения для отдельных методов Amadeus:
+# {end_point: (запросов в секунду, всплеск)}, например,
+# {'amadeus.shopping.hotel_offers_search.get': (5, 1)}.
+AMADEUS_END_POINT_RATE_LIMITS: dict[str, tuple[float, int]] = {}
+# Предохранитель для методов Amadeus: после AMADEUS_BREAKER_FAILURE_THRESHOLD
+# неудачных попыток подряд запросы к методу не выполняются в течение
+# AMADEUS_BREAKER_RECOVERY_TIMEOUT секунд.
+AMADEUS_BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv('AMADEUS_BREAKER_FAILURE_THRESHOLD', 5)
+)
+AMADEUS_BREAKER_RECOVERY_TIMEOUT = float(
+    os.getenv('AMADEUS_BREAKER_RECOVERY_TIMEOUT', 30)
+)
+# Время (в секундах), в течение которого ожидаются отзывы об отелях.
+# Отели, отзывы о которых не успели загрузиться, показываются без рейтинга.
+AMADEUS_SENTIMENTS_TIMEOUT = float(
+    os.getenv('AMADEUS_SENTIMENTS_TIMEOUT', 10)
+)
+# Время (в минутах), в течение которого не запрашиваются предложения отеля,
+# в котором нет номеров на даты поиска, и отеля, из-за которого Amadeus
+# отклонил запрос (например, из-за неверного кода отеля).
+AMADEUS_UNAVAILABLE_TTL_MINUTES = float(
+    os.getenv('AMADEUS_UNAVAILABLE_TTL_MINUTES', 15)
+)
+AMADEUS_ERROR_TTL_MINUTES = float(os.getenv('AMADEUS_ERROR_TTL_MINUTES', 5))
+# Повторная (hedged) отправка запроса предложений отелей, который
+# выполняется дольше AMADEUS_HEDGE_PERCENTILE-го процентиля времени
+# последних запросов (определяется после AMADEUS_HEDGE_MIN_SAMPLES запросов).
+# Повторных запросов - не более AMADEUS_HEDGE_BUDGET_PERCENT процентов
+# от общего количества; 0 - повторная отправка отключена.
+AMADEUS_HEDGE_PERCENTILE = float(os.getenv('AMADEUS_HEDGE_PERCENTILE', 95))
+AMADEUS_HEDGE_BUDGET_PERCENT = float(
+    os.getenv('AMADEUS_HEDGE_BUDGET_PERCENT', 5)
+)
+AMADEUS_HEDGE_MIN_SAMPLES = int(os.getenv('AMADEUS_HEDGE_MIN_SAMPLES', 20))
+# Максимальное количество городов, отели которых хранятся в памяти
+# (см. api.request_amadeus.get_hotels_by_city).
+HOTELS_INDEX_MAX_CITIES = int(os.getenv('HOTELS_INDEX_MAX_CITIES', 50))
+# Локальный справочник городов (CSV, см. utils.city_index.CityIndex.load_csv)
+# и минимальная похожесть названий (от 0 до 1) при поиске с опечатками.
+# Amadeus запрашивается, только если город не найден в справочнике.
+CITY_INDEX_PATH = os.getenv(
+    'CITY_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 'utils', 'misc', 'cities.csv')
+)
+CITY_INDEX_FUZZY_CUTOFF = float(os.getenv('CITY_INDEX_FUZZY_CUTOFF', 0.8))
+# Потоковый режим поиска: первый найденный отель показывается сразу,
+# остальные добавляются по мере получения предложений.
+SEARCH_STREAMING = os.getenv('SEARCH_STREAMING', 'true').lower() in (
+    'true', '1', 'yes'
+)
+# Ленивый поиск для команд, порядок сортировки которых известен до запроса
+# предложений (LAZY_SORT_COMMANDS): предложения запрашиваются у отелей
+# в порядке сортировки частями по SEARCH_LAZY_WINDOW отелей, пока не найдено
+# SEARCH_LAZY_MIN_HOTELS отелей с предложениями. Остальные запрашиваются
+# по мере листания списка отелей.
+SEARCH_LAZY_OFFERS = os.getenv('SEARCH_LAZY_OFFERS', 'true').lower() in (
+    'true', '1', 'yes'
+)
+SEARCH_LAZY_MIN_HOTELS = int(os.getenv('SEARCH_LAZY_MIN_HOTELS', 10))
+SEARCH_LAZY_WINDOW = int(os.getenv('SEARCH_LAZY_WINDOW', 40))
+# Время (в секундах), отведённое на поиск отелей. По его истечении поиск
+# завершается с уже полученными результатами.
+SEARCH_TIMEOUT = float(os.getenv('SEARCH_TIMEOUT', 60))
+# Случайное отклонение срока жизни записей кэша API (доля от срока жизни),
+# чтобы записи, сохранённые одновременно, не устаревали одновременно.
+CACHE_TTL_JITTER = float(os.getenv('CACHE_TTL_JITTER', 0.1))
+# Сжатие ответов API в кэше (zlib) и уровень сжатия (от 1 до 9).
+CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'true').lower() in (
+    'true', '1', 'yes'
+)
+CACHE_COMPRESSION_LEVEL = int(os.getenv('CACHE_COMPRESSION_LEVEL', 6))
+# Фоновая очистка кэша ответов API в базе данных (см. utils.cache_janitor):
+# каждые CACHE_JANITOR_INTERVAL_MINUTES минут удаляются устаревшие записи
+# и, если размер кэша больше CACHE_MAX_MB мегабайт (0 - без ограничения),
+# давно не использованные записи; удаление - частями по
+# CACHE_JANITOR_BATCH_SIZE записей.
+CACHE_JANITOR_INTERVAL_MINUTES = float(
+    os.getenv('CACHE_JANITOR_INTERVAL_MINUTES', 10)
+)
+CACHE_JANITOR_BATCH_SIZE = int(os.getenv('CACHE_JANITOR_BATCH_SIZE', 500))
+CACHE_MAX_MB = float(os.getenv('CACHE_MAX_MB', 512))
+# Максимальный размер кэша ответов API в памяти (в мегабайтах; 0 - кэш
+# в памяти отключён), см. utils.memory_cache.MemoryCache.
+CACHE_MEMORY_MAX_MB = float(os.getenv('CACHE_MEMORY_MAX_MB', 64))
+# Сколько часов после истечения срока жизни справочные данные (города,
+# отели города, фото) ещё отдаются из кэша, пока они обновляются в фоне.
+CACHE_STALE_TTL_HOURS = float(os.getenv('CACHE_STALE_TTL_HOURS', 168))
+# Фоновый прогрев кэша (см. api.cache_warmer): каждые
+# CACHE_WARMER_INTERVAL_MINUTES минут в часы CACHE_WARMER_HOURS ('1-7' -
+# с 1:00 до 7:00) для CACHE_WARMER_TOP_CITIES самых популярных за
+# CACHE_WARMER_HISTORY_DAYS дней городов запрашиваются отели, отзывы
+# о первых CACHE_WARMER_MAX_HOTELS отелях и их предложения на самые частые
+# (не более CACHE_WARMER_DATE_WINDOWS) даты заезда в ближайшие
+# CACHE_WARMER_OFFER_DAYS дней. Прогрев использует не более
+# CACHE_WARMER_QUOTA_PERCENT процентов AMADEUS_RATE_LIMIT.
+CACHE_WARMER_ENABLED = os.getenv('CACHE_WARMER_ENABLED', 'true').lower() in (
+    'true', '1', 'yes'
+)
+CACHE_WARMER_HOURS = os.getenv('CACHE_WARMER_HOURS', '1-7')
+CACHE_WARMER_INTERVAL_MINUTES = float(
+    os.getenv('CACHE_WARMER_INTERVAL_MINUTES', 30)
+)
+CACHE_WARMER_TOP_CITIES = int(os.getenv('CACHE_WARMER_TOP_CITIES', 10))
+CACHE_WARMER_HISTORY_DAYS = int(os.getenv('CACHE_WARMER_HISTORY_DAYS', 30))
+CACHE_WARMER_MAX_HOTELS = int(os.getenv('CACHE_WARMER_MAX_HOTELS', 40))
+CACHE_WARMER_DATE_WINDOWS = int(os.getenv('CACHE_WARMER_DATE_WINDOWS', 3))
+CACHE_WARMER_OFFER_DAYS = int(os.getenv('CACHE_WARMER_OFFER_DAYS', 14))
+CACHE_WARMER_QUOTA_PERCENT = float(
+    os.getenv('CACHE_WARMER_QUOTA_PERCENT', 10)
+)
 
 DEFAULT_COMMANDS = (
     ('start', 'Запустить бота'),
@@ -21,6 +167,7 @@ DEFAULT_COMMANDS = (
 )
 
 SORT_COMMANDS = {'lowprice', 'bestdeal', 'guest_rating'}
+LAZY_SORT_COMMANDS = {'bestdeal', 'guest_rating'}
 
 CALENDAR_SERVICE_MESSAGE = '_calendar_done_'
 
@@ -4,7 +4,9 @@ from datetime import datetime, date
 from typing import Any, Dict
 
 from peewee import (SqliteDatabase, Model, CharField, IntegerField,
-                    ForeignKeyField, DateTimeField, TextField, FloatField, DateField)
+                    ForeignKeyField, DateTimeField, TextField, FloatField, DateField,
+                    BlobField, chunked, fn, SQL)
+from playhouse.migrate import SqliteMigrator, migrate
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'data_history.db')
@@ -19,9 +21,17 @@ class BaseModel(Model):
 class APICache(BaseModel):
     end_point = CharField()
     request_hash = CharField()
-    value = TextField()
+    # Байт способа кодирования и данные (см. utils.cache_response.
+    # encode_cache_value). В старых записях - JSON-текст.
+    value = BlobField()
     created_at = DateTimeField(default=datetime.now)
-    expires_at = DateTimeField(null=True)
+    expires_at = DateTimeField(null=True, index=True)
+    # Время последнего обращения к записи (обновляется с задержкой, см.
+    # utils.cache_janitor) - для удаления давно не использованных записей.
+    accessed_at = DateTimeField(default=datetime.now, index=True)
+    # Размер value в байтах. Суммарный размер кэша считается по индексу,
+    # без чтения самих значений (см. utils.cache_response.evict_cache_to_size).
+    size = IntegerField(default=0, index=True, constraints=[SQL('DEFAULT 0')])
 
     class Meta:
         indexes = [
@@ -98,9 +108,35 @@ class Hotel(BaseModel):
 
 def create_tables():
     with db:
+        migrate_api_cache()
         db.create_tables([APICache, User, Request, Hotel], safe=True)
 
 
+def migrate_api_cache() -> None:
+    """
+    Добавляет в таблицу кэша, созданную предыдущими версиями, столбцы
+    accessed_at (заполняется значением created_at) и size (заполняется
+    размером value). Выполняется до create_tables, которая создаёт
+    недостающие индексы (в том числе по expires_at, accessed_at и size).
+    """
+    table = APICache._meta.table_name
+    if not db.table_exists(table):
+        return
+    columns = {column.name for column in db.get_columns(table)}
+    migrator = SqliteMigrator(db)
+    with db.atomic():
+        if 'accessed_at' not in columns:
+            migrate(migrator.add_column(
+                table, 'accessed_at', DateTimeField(null=True)
+            ))
+            APICache.update(accessed_at=APICache.created_at).execute()
+        if 'size' not in columns:
+            migrate(migrator.add_column(
+                table, 'size', IntegerField(null=True)
+            ))
+            APICache.update(size=fn.LENGTH(APICache.value)).execute()
+
+
 def add_request_to_history(
         user_id: int,
         user_name: str,
@@ -136,33 +172,46 @@ def add_request_to_history(
         price_range=request_data['range_prices'],
         radius=request_data['radius'],
     )
+    add_hotels_to_history(request_record, hotels_data)
+    return request_record
+
 
+def add_hotels_to_history(
+        request_record: Request,
+        hotels_data: dict[str, dict[str, Any]]
+) -> None:
+    """
+    Сохраняет отели, найденные по запросу, в историю. Отели, которые уже
+    сохранены для этого запроса, пропускаются (повторная загрузка тех же
+    отелей не приводит к ошибке уникального индекса).
+
+    :param request_record: Запись запроса.
+    :param hotels_data: Словарь с данными отелей.
+    :return: None
+    """
     hotels_to_create = []
     for hotel_id, hotel in hotels_data.items():
-        hotels_to_create.append(
-            Hotel(
-                hotel_id=hotel_id,
-                request=request_record,
-                name=hotel['name'],
-                description=hotel.get('offer', {}).get('room', {}) \
-                    .get('description', {}).get('text', 'не указано'),
-                price=hotel['offer']['price']['total'],
-                latitude=hotel['geoCode']['latitude'],
-                longitude=hotel['geoCode']['longitude'],
-                rating=hotel['rating'],
-                postal_code=hotel['address'].get('postalCode', 'не указано'),
-                distance=hotel['distance']['value'],
-                unit=hotel['distance']['unit'],
-                hotel_sentiments=hotel.get('sentiments', {}).get('overallRating', None),
-                board_type=hotel['offer'].get('boardType', 'не указано'),
-                photos=json.dumps(hotel.get('photos', []), ensure_ascii=False),
-                lines=json.dumps(hotel['address']['lines'], ensure_ascii=False)
-            )
-        )
-    if hotels_to_create:
-        Hotel.bulk_create(hotels_to_create, batch_size=50)
-
-    return request_record
+        hotels_to_create.append({
+            'hotel_id': hotel_id,
+            'request': request_record,
+            'name': hotel['name'],
+            'description': hotel.get('offer', {}).get('room', {}) \
+                .get('description', {}).get('text', 'не указано'),
+            'price': hotel['offer']['price']['total'],
+            'latitude': hotel['geoCode']['latitude'],
+            'longitude': hotel['geoCode']['longitude'],
+            'rating': hotel['rating'],
+            'postal_code': hotel['address'].get('postalCode', 'не указано'),
+            'distance': hotel['distance']['value'],
+            'unit': hotel['distance']['unit'],
+            'hotel_sentiments': hotel.get('sentiments', {}).get('overallRating', None),
+            'board_type': hotel['offer'].get('boardType', 'не указано'),
+            'photos': json.dumps(hotel.get('photos', []), ensure_ascii=False),
+            'lines': json.dumps(hotel['address']['lines'], ensure_ascii=False)
+        })
+    with db.atomic():
+        for batch in chunked(hotels_to_create, 50):
+            Hotel.insert_many(batch).on_conflict_ignore().execute()
 
 
 def get_user_history(user_id: int, search_date: date | None = None) -> list[Dict]:
@@ -221,3 +270,68 @@ def get_user_history(user_id: int, search_date: date | None = None) -> list[Dict
             'hotels': hotels,
         })
     return history
+
+
+def get_popular_searches(
+        since: datetime,
+        top_cities: int,
+        check_in_from: date,
+        check_in_to: date,
+        windows_per_city: int
+) -> list[Dict]:
+    """
+    Возвращает города, которые чаще всего искали пользователи, и самые
+    частые параметры предложений (даты, валюта, диапазон цен) поисков
+    с датой заезда в заданном интервале.
+
+    :param since: Учитываются запросы, созданные после этого момента.
+    :param top_cities: Количество городов.
+    :param check_in_from: Начало интервала дат заезда.
+    :param check_in_to: Конец интервала дат заезда.
+    :param windows_per_city: Количество вариантов параметров предложений
+        для каждого города.
+    :return: Список словарей {'city', 'country', 'count', 'radius',
+        'windows': [{'check_in', 'check_out', 'currency_code',
+        'price_range'}]} в порядке убывания количества запросов.
+    """
+    count = fn.COUNT(Request.id)
+    cities = (
+        Request
+        .select(Request.city, Request.country, count.alias('count'),
+                fn.MAX(Request.radius).alias('radius'))
+        .where(Request.created_at >= since)
+        .group_by(Request.city, Request.country)
+        .order_by(count.desc())
+        .limit(top_cities)
+    )
+    popular = []
+    for city in cities.dicts():
+        windows = (
+            Request
+            .select(Request.check_in_date, Request.check_out_date,
+                    Request.currency_code, Request.price_range)
+            .where(
+                (Request.created_at >= since)
+                & (Request.city == city['city'])
+                & (Request.country == city['country'])
+                & (Request.check_in_date >= check_in_from)
+                & (Request.check_in_date <= check_in_to)
+            )
+            .group_by(Request.check_in_date, Request.check_out_date,
+                      Request.currency_code, Request.price_range)
+            .order_by(count.desc())
+            .limit(windows_per_city)
+        )
+        popular.append({
+            **city,
+            'windows': [
+                {
+                    'check_in': window.check_in_date,
+                    'check_out': window.check_out_date,
+                    'currency_code': window.currency_code,
+                    'price_range': window.price_range,
+                }
+                for window in windows
+            ],
+        })
+    return popular
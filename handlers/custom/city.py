@@ -6,12 +6,15 @@ from pycountry import currencies
 from requests import Timeout, ReadTimeout, RequestException
 from telebot.types import Message, CallbackQuery
 
-from api.request_amadeus import get_cities, logger
+from api.request_amadeus import find_cities, logger
 from handlers.custom.calendar import start_calendar
+from handlers.custom.hotel import retry_after_text
 from keyboards.inline.city_select import gen_markup_select_city
 from loader import bot
 from states.user_states import States
+from utils.exceptions import ExternalServiceUnavailable
 from utils.parsing import safe_parse_callback_index
+from utils.rate_limiter import rate_limit_session
 from utils.telegram_safe import safe_edit_message
 from utils.user import get_user_and_chat_ids
 from utils.validation import require_valid_session
@@ -26,14 +29,16 @@ def get_city(message: Message) -> None:
         data['request']['template_find_city'] = template_find_city
 
     try:
-        found_cities = get_cities(template_find_city)
-    except (ClientError, ConnectionError, Timeout, ReadTimeout) as error:
+        with rate_limit_session(user_id):
+            found_cities = find_cities(template_find_city)
+    except (ClientError, ConnectionError, Timeout, ReadTimeout,
+            ExternalServiceUnavailable) as error:
         logger.warning(f'Ошибка при обращении к Amadeus API: {error}, '
                        f'запрос пользователя: {template_find_city}')
         bot.send_message(
             chat_id,
-            '⚠️ Проблема с подключением к сервису Amadeus!\n'
-            'Повторите ввод города позже'
+            f'⚠️ Проблема с подключением к сервису Amadeus!\n'
+            f'Повторите ввод города {retry_after_text(error)}'
         )
         return
 
@@ -65,9 +70,14 @@ def get_city(message: Message) -> None:
             session_id = data['session_id']
 
         bot.set_state(user_id, States.city_confirm, chat_id)
+        if found_cities.get('meta', {}).get('source') == 'suggestions':
+            text = (f'Не могу найти город {template_find_city}. '
+                    f'Возможно, Вы имели в виду один из этих городов:')
+        else:
+            text = 'Выберите город из следующих найденных:'
         bot.send_message(
             chat_id,
-            'Выберите город из следующих найденных:',
+            text,
             reply_markup=gen_markup_select_city(cities[:50], session_id)
         )
     else:
@@ -1,4 +1,6 @@
+import math
 import threading
+from collections import defaultdict
 from datetime import date
 from typing import Union
 
@@ -7,24 +9,31 @@ from requests import Timeout, ReadTimeout, RequestException
 from telebot.types import CallbackQuery, Message, ReplyKeyboardRemove
 
 from api.request_amadeus import (get_hotel_offer, get_hotels_by_city,
-                                 get_hotel_offers_search, get_hotel_sentiments,
-                                 logger)
+                                 get_hotel_sentiments,
+                                 iter_hotel_offers_search, logger)
 from api.search_hotel_images_url import get_urls_photos_hotel
 from config_data.config import (SORT_COMMANDS, PHOTOS,
-                                COMMANDS_TO_REPLY_KEYBOARD)
-from database.data_storage import add_request_to_history, Hotel
+                                COMMANDS_TO_REPLY_KEYBOARD, SEARCH_STREAMING,
+                                LAZY_SORT_COMMANDS, SEARCH_LAZY_OFFERS,
+                                SEARCH_LAZY_MIN_HOTELS, SEARCH_LAZY_WINDOW,
+                                SEARCH_TIMEOUT)
+from database.data_storage import (add_request_to_history,
+                                   add_hotels_to_history, Hotel)
 from handlers.custom.calendar import start_calendar
 from keyboards.inline.pagination import gen_markup_pagin_hotels
 from keyboards.inline.sorting_command import gen_markup_command_sorting
 from keyboards.reply.controls import gen_reply_controls_for_display
 from loader import bot
 from states.user_states import States
+from utils.cancellation import (active_searches, cancellation_scope,
+                                deadline_passed, raise_if_cancelled)
 from utils.exceptions import (ExternalServiceUnavailable, HotelNotFound,
-                              OffersNotFound)
+                              OffersNotFound, SearchCancelled, SearchTimeout)
 from utils.hotel import (format_hotel_text, sorting_hotels, sorting_order,
                          media_lock)
 from utils.hotel_photo import send_hotel_photo, send_message_no_photo
 from utils.parsing import safe_parse_callback_index
+from utils.rate_limiter import rate_limit_session
 from utils.telegram_safe import (safe_delete_message, safe_edit_message,
                                  safe_edit_media, safe_remove_markup,
                                  fail_search)
@@ -50,6 +59,16 @@ def hotel_change(callback_query: CallbackQuery) -> None:
     step = safe_parse_callback_index(callback_query, 2, transform=int)
     bot.answer_callback_query(callback_query.id)
 
+    with bot.retrieve_data(user_id, chat_id) as data:
+        num_hotels = data['num_hotels']
+        num_hotel = data['num_hotel']
+        has_pending = bool(data['response'].get('pending_hotel_ids'))
+
+    # Ленивый поиск: при приближении к концу списка запрашиваются
+    # предложения следующих по порядку сортировки отелей.
+    if step > 0 and has_pending and num_hotel + step >= num_hotels - 1:
+        load_more_hotels(user_id, chat_id)
+
     with bot.retrieve_data(user_id, chat_id) as data:
         num_hotels = data['num_hotels']
         num_hotel = data['num_hotel']
@@ -92,7 +111,8 @@ def accept_hotel_offer(callback_query: CallbackQuery):
         message_photo_id = data.get('message_photo_id')
 
     try:
-        response = get_hotel_offer(hotel_offer_id)
+        with rate_limit_session(user_id):
+            response = get_hotel_offer(hotel_offer_id)
         if response['data']['available']:
             bot.answer_callback_query(callback_query.id)
             safe_delete_message(chat_id, [message_photo_id])
@@ -119,17 +139,26 @@ def search_hotels_core(
         request: dict,
         *,
         on_progress: callable = None,
+        on_hotels: callable = None,
 ) -> dict:
     """
     Выполняет основную логику поиска отелей, обращаясь к API.
 
     :param request: Словарь с параметрами поиска.
     :param on_progress: Callback-функция для отслеживания прогресса.
+    :param on_hotels: Callback-функция потокового режима. Вызывается
+        с аргументами (hotels_with_offer, new_ids) сразу после получения
+        каждой части предложений (и отзывов о её отелях), т.е. до окончания
+        поиска. new_ids - коды отелей, добавленных этой частью.
     :return: Словарь с результатами поиска.
     :raises ExternalServiceUnavailable: Если внешний сервис недоступен.
     :raises HotelNotFound: Если отели по заданным критериям не найдены.
     :raises OffersNotFound: Если от найденных отелей нет предложений.
     :raises SentimentsUnavailable: Если не удалось загрузить отзывы.
+    :raises SearchCancelled: Если поиск отменён (utils.cancellation).
+    :raises SearchTimeout: Если время поиска истекло раньше, чем найден
+        хотя бы один отель с предложением. Иначе возвращаются уже
+        найденные отели.
     """
     def progress(text: str) -> None:
         if on_progress:
@@ -139,10 +168,7 @@ def search_hotels_core(
     city = request['city']
     city_name = city['name']
     city_iata_code = city['iataCode']
-    check_in_date = str(request['date']['check_in'])
-    check_out_date = str(request['date']['check_out'])
-    price_range = request['range_prices']
-    currency_code = request['currency']['code']
+    offer_params = get_offer_params(request)
     search_radius = request['radius']
     command = request['command']
 
@@ -159,46 +185,57 @@ def search_hotels_core(
 
     if not hotels_by_city.get('data'):
         raise HotelNotFound()
+    raise_if_cancelled()
 
-    # --- 3. Получение предложений (offers) ---
+    hotel_ids = list(dict.fromkeys(
+        hotel['hotelId'] for hotel in hotels_by_city['data']
+    ))
+    hotels_dict = {hotel['hotelId']: hotel for hotel in hotels_by_city['data']}
+    lazy = SEARCH_LAZY_OFFERS and command in LAZY_SORT_COMMANDS
+
+    # --- 3. Упорядочивание отелей (ленивый поиск) ---
+    if lazy:
+        if command == 'guest_rating':
+            # Отзывы кэшируются надолго, поэтому их можно получить для всех
+            # отелей до запроса предложений.
+            progress(f'Отели в городе {city_name} найдены.\n'
+                     f'Подождите, получаю отзывы о отелях...')
+            add_sentiments(hotels_dict, hotel_ids)
+        sorting_hotels(hotel_ids, hotels_dict, command)
+
+    # --- 4. Получение предложений (offers) и фильтрация отелей ---
     progress(f'Отели в городе {city_name} найдены.\n'
              f'Подождите, получаю предложения от отелей...')
-    hotel_ids = [hotel['hotelId'] for hotel in hotels_by_city['data']]
-    try:
-        hotel_offers = get_hotel_offers_search(
-            hotel_ids=hotel_ids,
-            check_in_date=check_in_date,
-            check_out_date=check_out_date,
-            price_range=price_range,
-            currency=currency_code
-        )
-    except (ClientError, ConnectionError, Timeout, ReadTimeout) as error:
-        raise ExternalServiceUnavailable('get_hotel_offers_search') from error
-
-    # --- 4. Фильтрация отелей с доступными предложениями ---
-    hotels_dict = {hotel['hotelId']: hotel for hotel in hotels_by_city['data']}
     hotels_with_offer = {}
-    for offer in hotel_offers.get('data', []):
-        if offer.get('available'):
-            hotel_id = offer['hotel']['hotelId']
-            if hotel_id in hotels_dict:
-                hotel = hotels_dict[hotel_id]
-                hotel['offer'] = offer['offers'][0]
-                hotels_with_offer[hotel_id] = hotel
+    consumed = collect_hotels_with_offer(
+        hotel_ids,
+        hotels_dict,
+        offer_params,
+        hotels_with_offer,
+        min_hotels=SEARCH_LAZY_MIN_HOTELS if lazy else None,
+        on_hotels=on_hotels
+    )
 
+    raise_if_cancelled()
     if not hotels_with_offer:
+        if deadline_passed():
+            raise SearchTimeout()
         raise OffersNotFound()
 
+    # Части приходят в порядке готовности, а не в порядке списка отелей.
+    hotels_keys_with_offer = [
+        hotel_id for hotel_id in hotel_ids if hotel_id in hotels_with_offer
+    ]
+
     # --- 5. Получение отзывов (sentiments) ---
-    progress(f'Отели в городе {city_name} найдены.\n'
-             f'Отели с предложениями найдены.\n'
-             f'Подождите, получаю отзывы о отелях...')
-    hotels_keys_with_offer = list(hotels_with_offer.keys())
-    hotel_sentiments = get_hotel_sentiments(hotels_keys_with_offer)
-    for sentiment in hotel_sentiments.get('data', []):
-        hotels_with_offer[sentiment['hotelId']]['sentiments'] = sentiment
+    if not on_hotels and not (lazy and command == 'guest_rating'):
+        progress(f'Отели в городе {city_name} найдены.\n'
+                 f'Отели с предложениями найдены.\n'
+                 f'Подождите, получаю отзывы о отелях...')
+        add_sentiments(hotels_with_offer, hotels_keys_with_offer)
 
     # --- 6. Сортировка ---
+    raise_if_cancelled()
     progress(f'Отели в городе {city_name} найдены.\n'
              f'Отели с предложениями найдены.\n'
              f'Отзывы о отелях получены.\n'
@@ -210,9 +247,194 @@ def search_hotels_core(
         'hotels_by_city': hotels_by_city,
         'hotels_with_offer': hotels_with_offer,
         'hotels_keys_with_offer': hotels_keys_with_offer,
+        # Отели, предложения которых ещё не запрашивались (ленивый поиск).
+        'pending_hotel_ids': hotel_ids[consumed:],
+    }
+
+
+def get_offer_params(request: dict) -> dict:
+    """
+    Возвращает параметры запроса предложений отелей
+    (см. iter_hotel_offers_search).
+
+    :param request: Словарь с параметрами поиска.
+    :return: Словарь параметров.
+    """
+    return {
+        'check_in_date': str(request['date']['check_in']),
+        'check_out_date': str(request['date']['check_out']),
+        'price_range': request['range_prices'],
+        'currency': request['currency']['code'],
     }
 
 
+def collect_hotels_with_offer(
+        hotel_ids: list[str],
+        hotels_dict: dict,
+        offer_params: dict,
+        hotels_with_offer: dict,
+        *,
+        min_hotels: int = None,
+        on_hotels: callable = None,
+) -> int:
+    """
+    Запрашивает предложения от отелей и добавляет отели с доступными
+    предложениями в hotels_with_offer.
+
+    :param hotel_ids: Коды отелей в порядке, в котором их нужно опрашивать.
+    :param hotels_dict: Данные отелей по их кодам.
+    :param offer_params: Параметры предложений (см. get_offer_params).
+    :param hotels_with_offer: Словарь, в который добавляются отели
+        с предложениями.
+    :param min_hotels: Если задано, предложения запрашиваются частями
+        по SEARCH_LAZY_WINDOW отелей, пока не найдено min_hotels отелей
+        с предложениями. Иначе - у всех отелей сразу.
+    :param on_hotels: См. search_hotels_core.
+    :return: Количество опрошенных отелей (с начала hotel_ids). После
+        истечения времени поиска следующие части не запрашиваются.
+    :raises ExternalServiceUnavailable: Если внешний сервис недоступен.
+    """
+    window = len(hotel_ids) if min_hotels is None else SEARCH_LAZY_WINDOW
+    consumed = 0
+    found = 0
+    while consumed < len(hotel_ids) and not deadline_passed():
+        window_ids = hotel_ids[consumed:consumed + max(1, window)]
+        try:
+            for hotel_offers in iter_hotel_offers_search(
+                    window_ids, **offer_params
+            ):
+                new_ids = []
+                for offer in hotel_offers['data']:
+                    if offer.get('available'):
+                        hotel_id = offer['hotel']['hotelId']
+                        if hotel_id in hotels_dict:
+                            hotel = hotels_dict[hotel_id]
+                            hotel['offer'] = offer['offers'][0]
+                            hotels_with_offer[hotel_id] = hotel
+                            new_ids.append(hotel_id)
+                found += len(new_ids)
+                if on_hotels and new_ids:
+                    # В потоковом режиме отзывы запрашиваются для каждой
+                    # части, чтобы показать отель сразу с рейтингом.
+                    add_sentiments(hotels_with_offer, [
+                        hotel_id for hotel_id in new_ids
+                        if 'sentiments' not in hotels_with_offer[hotel_id]
+                    ])
+                    on_hotels(hotels_with_offer, new_ids)
+        except (ClientError, ConnectionError, Timeout, ReadTimeout) as error:
+            raise ExternalServiceUnavailable(
+                'get_hotel_offers_search'
+            ) from error
+        consumed += len(window_ids)
+        if min_hotels is not None and found >= min_hotels:
+            break
+    return consumed
+
+
+def add_sentiments(hotels_with_offer: dict, hotel_ids: list[str]) -> None:
+    """
+    Запрашивает отзывы об указанных отелях и добавляет их к данным отелей.
+
+    :param hotels_with_offer: Словарь отелей с предложениями.
+    :param hotel_ids: Коды отелей, отзывы о которых нужно получить.
+    :return: None
+    """
+    if not hotel_ids:
+        return
+    hotel_sentiments = get_hotel_sentiments(hotel_ids)
+    for sentiment in hotel_sentiments.get('data', []):
+        if sentiment['hotelId'] in hotels_with_offer:
+            hotels_with_offer[sentiment['hotelId']]['sentiments'] = sentiment
+
+
+# Блокировки ленивой загрузки отелей: {(user_id, chat_id): Lock}.
+loading_hotels_locks: defaultdict[tuple[int, int], threading.Lock] = (
+    defaultdict(threading.Lock)
+)
+loading_hotels_locks_lock = threading.Lock()
+
+
+def load_more_hotels(user_id: int, chat_id: int) -> None:
+    """
+    Ленивый поиск: запрашивает предложения следующих по порядку сортировки
+    отелей, пока не найдено SEARCH_LAZY_MIN_HOTELS отелей с предложениями,
+    и добавляет их в конец списка отелей пользователя и в историю.
+    Если следующие отели уже загружаются (например, при быстрых повторных
+    нажатиях "вперёд" в другом потоке бота), повторная загрузка
+    не выполняется.
+
+    :param user_id: Идентификатор пользователя.
+    :param chat_id: Идентификатор чата.
+    :return: None
+    """
+    with loading_hotels_locks_lock:
+        lock = loading_hotels_locks[(user_id, chat_id)]
+    if not lock.acquire(blocking=False):
+        return
+
+    try:
+        with bot.retrieve_data(user_id, chat_id) as data:
+            request = data['request']
+            response = data['response']
+            pending_ids = list(response.get('pending_hotel_ids') or [])
+            hotels_by_city = response.get('hotels_by_city') or {}
+            request_record = data.get('request_record')
+        if not pending_ids:
+            return
+
+        hotels_dict = {
+            hotel['hotelId']: hotel
+            for hotel in hotels_by_city.get('data', [])
+        }
+        found = {}
+        try:
+            with rate_limit_session(user_id):
+                consumed = collect_hotels_with_offer(
+                    pending_ids,
+                    hotels_dict,
+                    get_offer_params(request),
+                    found,
+                    min_hotels=SEARCH_LAZY_MIN_HOTELS
+                )
+                # Для guest_rating отзывы получены до запроса предложений.
+                if request['command'] != 'guest_rating':
+                    add_sentiments(found, list(found))
+        except Exception as error:
+            logger.warning(f'Не удалось загрузить следующие отели: {error}, '
+                           f'запрос: {request}')
+            return
+
+        new_ids = [hotel_id for hotel_id in pending_ids[:consumed]
+                   if hotel_id in found]
+        if request_record is not None and new_ids:
+            add_hotels_to_history(
+                request_record,
+                {hotel_id: found[hotel_id] for hotel_id in new_ids}
+            )
+
+        with bot.retrieve_data(user_id, chat_id) as data:
+            response = data['response']
+            response['pending_hotel_ids'] = pending_ids[consumed:]
+            for hotel_id in new_ids:
+                if hotel_id not in response['hotels_with_offer']:
+                    response['hotels_with_offer'][hotel_id] = found[hotel_id]
+                    response['hotels_keys_with_offer'].append(hotel_id)
+            data['num_hotels'] = len(response['hotels_keys_with_offer'])
+    finally:
+        lock.release()
+
+
+def retry_after_text(error: Exception) -> str:
+    """
+    Возвращает текст о том, когда имеет смысл повторить запрос: если сервис
+    временно отключён предохранителем, известно точное время.
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after:
+        return f'через {math.ceil(retry_after)} сек.'
+    return 'позже'
+
+
 def do_search_hotels(message: Union[Message, CallbackQuery]) -> None:
     """
     Управляет процессом поиска отелей.
@@ -235,7 +457,11 @@ def do_search_hotels(message: Union[Message, CallbackQuery]) -> None:
         command = request['command']
 
     # --- 1. Подготовка к поиску ---
+    # Новый поиск отменяет предыдущий поиск пользователя.
+    token = active_searches.start(user_id, SEARCH_TIMEOUT)
     msg_id = None
+    # Отели, уже показанные пользователю в потоковом режиме.
+    streamed = False
 
     def on_progress(text: str):
         """
@@ -244,14 +470,54 @@ def do_search_hotels(message: Union[Message, CallbackQuery]) -> None:
         статуса поиска в чате с пользователем.
         """
         nonlocal msg_id
-        msg_id = safe_edit_message(text, chat_id, msg_id)
+        if not streamed and not token.cancelled:
+            msg_id = safe_edit_message(text, chat_id, msg_id)
+
+    def on_hotels(hotels_with_offer: dict, new_ids: list[str]):
+        """
+        Callback-функция потокового режима. Первый найденный отель
+        показывается сразу, следующие добавляются в конец списка,
+        а счётчик "Страница X из N" обновляется.
+        """
+        nonlocal streamed
+        if token.cancelled:
+            raise SearchCancelled()
+        with bot.retrieve_data(user_id, chat_id) as data:
+            response = data['response']
+            if not streamed:
+                response.update({
+                    'hotels_with_offer': {},
+                    'hotels_keys_with_offer': [],
+                    'pending_hotel_ids': [],
+                })
+                data.update({'num_hotel': 0, 'request_record': None})
+            for hotel_id in new_ids:
+                if hotel_id not in response['hotels_with_offer']:
+                    response['hotels_keys_with_offer'].append(hotel_id)
+                response['hotels_with_offer'].setdefault(
+                    hotel_id, hotels_with_offer[hotel_id]
+                )
+            data['num_hotels'] = len(response['hotels_keys_with_offer'])
+
+        if streamed:
+            refresh_hotel_counter(user_id, chat_id)
+            return
+        streamed = True
+        show_found_hotels(message, msg_id, city_name, command, streaming=True)
 
     # --- 2. Основной блок: вызов ядра поиска и обработка всех исключений ---
     try:
-        search_result = search_hotels_core(
-            request,
-            on_progress=on_progress
-        )
+        with rate_limit_session(user_id), cancellation_scope(token):
+            search_result = search_hotels_core(
+                request,
+                on_progress=on_progress,
+                on_hotels=on_hotels if SEARCH_STREAMING else None
+            )
+    except SearchCancelled:
+        logger.info(f'Поиск отелей отменён, запрос: {request}')
+        if not streamed:
+            safe_delete_message(chat_id, msg_id)
+        return
     except HotelNotFound:
         fail_search(
             user_id, chat_id, msg_id,
@@ -268,17 +534,32 @@ def do_search_hotels(message: Union[Message, CallbackQuery]) -> None:
             gen_reply_controls_for_display()
         )
         return
-    except (ExternalServiceUnavailable, RequestException) as error:
-        logger.warning(f'Ошибка при поиске отелей: {error}, запрос: {request}')
-        fail_search(
-            user_id, chat_id, msg_id,
-            f'⚠️ Проблема с подключением к сервису Amadeus!\n'
-            f'Повторите поиск позже, нажав кнопку '
-            f'{COMMANDS_TO_REPLY_KEYBOARD["Repeat search"]}.',
-            gen_reply_controls_for_display()
-        )
-        return
     except Exception as error:
+        if streamed:
+            # Часть отелей уже показана - поиск завершается с ними.
+            logger.warning(f'Поиск отелей прерван: {error}, запрос: {request}')
+            finish_streamed_search(message, request, None)
+            return
+        if isinstance(error, SearchTimeout):
+            fail_search(
+                user_id, chat_id, msg_id,
+                f'⏱ Поиск отелей занял слишком много времени.\n'
+                f'Повторите поиск позже, нажав кнопку '
+                f'{COMMANDS_TO_REPLY_KEYBOARD["Repeat search"]}.',
+                gen_reply_controls_for_display()
+            )
+            return
+        if isinstance(error, (ExternalServiceUnavailable, RequestException)):
+            logger.warning(f'Ошибка при поиске отелей: {error}, '
+                           f'запрос: {request}')
+            fail_search(
+                user_id, chat_id, msg_id,
+                f'⚠️ Проблема с подключением к сервису Amadeus!\n'
+                f'Повторите поиск {retry_after_text(error)}, нажав кнопку '
+                f'{COMMANDS_TO_REPLY_KEYBOARD["Repeat search"]}.',
+                gen_reply_controls_for_display()
+            )
+            return
         logger.exception(f'Непредвиденная ошибка при поиске отелей: {error}, '
                          f'запрос: {request}')
         fail_search(
@@ -288,6 +569,15 @@ def do_search_hotels(message: Union[Message, CallbackQuery]) -> None:
             gen_reply_controls_for_display()
         )
         return
+    finally:
+        active_searches.finish(user_id, token)
+
+    # Поиск мог быть отменён уже после получения результатов.
+    if token.cancelled:
+        return
+    if streamed:
+        finish_streamed_search(message, request, search_result)
+        return
 
     # --- 3. Сохранение успешного результата в историю (БД) ---
     request_record = add_request_to_history(
@@ -307,17 +597,127 @@ def do_search_hotels(message: Union[Message, CallbackQuery]) -> None:
         })
 
     # --- 5. Переход к отображению результатов ---
+    show_found_hotels(message, msg_id, city_name, command)
+
+
+def show_found_hotels(
+        message: Union[Message, CallbackQuery],
+        msg_id: int | None,
+        city_name: str,
+        command: str,
+        streaming: bool = False
+) -> None:
+    """
+    Удаляет сообщение о прогрессе поиска и показывает первый отель.
+
+    :param message: Сообщение или CallbackQuery, начавшее поиск.
+    :param msg_id: Идентификатор сообщения о прогрессе поиска.
+    :param city_name: Название города.
+    :param command: Команда сортировки.
+    :param streaming: Поиск ещё продолжается (потоковый режим).
+    :return: None
+    """
+    user_id, chat_id = get_user_and_chat_ids(message)
     bot.set_state(user_id, States.display_hotels, chat_id)
     safe_delete_message(chat_id, msg_id)
+    if streaming:
+        text = (f'В городе {city_name} найдены следующие отели. '
+                f'Поиск продолжается, остальные отели будут добавлены '
+                f'{sorting_order(command)}:')
+    else:
+        text = (f'В городе {city_name} найдены следующие отели, '
+                f'{sorting_order(command)}:')
     bot.send_message(
-        chat_id,
-        f'В городе {city_name} найдены следующие отели, '
-        f'{sorting_order(command)}:',
-        reply_markup=gen_reply_controls_for_display()
+        chat_id, text, reply_markup=gen_reply_controls_for_display()
     )
     display_hotels(message)
 
 
+def finish_streamed_search(
+        message: Union[Message, CallbackQuery],
+        request: dict,
+        search_result: dict | None
+) -> None:
+    """
+    Завершает поиск в потоковом режиме: упорядочивает ещё не просмотренные
+    отели, сохраняет результат в историю и обновляет счётчик отелей.
+    Уже просмотренные пользователем отели остаются на своих местах.
+
+    :param message: Сообщение или CallbackQuery, начавшее поиск.
+    :param request: Словарь с параметрами поиска.
+    :param search_result: Результат search_hotels_core или None, если поиск
+        прерван ошибкой (тогда сортируются уже полученные отели).
+    :return: None
+    """
+    user_id, chat_id = get_user_and_chat_ids(message)
+
+    with bot.retrieve_data(user_id, chat_id) as data:
+        response = data['response']
+        # Отели в FSM могли получить фотографии, пока шёл поиск.
+        hotels_with_offer = response['hotels_with_offer']
+        hotels_keys = response['hotels_keys_with_offer']
+        num_hotel = data['num_hotel']
+        if search_result is None:
+            sorted_keys = list(hotels_keys)
+            sorting_hotels(sorted_keys, hotels_with_offer, request['command'])
+        else:
+            for hotel_id, hotel in search_result['hotels_with_offer'].items():
+                hotels_with_offer.setdefault(hotel_id, hotel)
+            sorted_keys = search_result['hotels_keys_with_offer']
+            response.update({
+                'hotels_by_city': search_result['hotels_by_city'],
+                'pending_hotel_ids': search_result['pending_hotel_ids'],
+            })
+        seen_keys = hotels_keys[:num_hotel + 1]
+        response['hotels_keys_with_offer'] = seen_keys + [
+            hotel_id for hotel_id in sorted_keys if hotel_id not in seen_keys
+        ]
+        data['num_hotels'] = len(response['hotels_keys_with_offer'])
+
+    request_record = add_request_to_history(
+        user_id,
+        message.from_user.full_name,
+        request,
+        hotels_with_offer
+    )
+    with bot.retrieve_data(user_id, chat_id) as data:
+        data['request_record'] = request_record
+
+    refresh_hotel_counter(user_id, chat_id)
+
+
+def refresh_hotel_counter(user_id: int, chat_id: int) -> None:
+    """
+    Обновляет сообщение о текущем отеле после изменения количества отелей
+    (счётчик "Страница X из N" и кнопки пагинации).
+
+    :param user_id: Идентификатор пользователя.
+    :param chat_id: Идентификатор чата.
+    :return: None
+    """
+    with bot.retrieve_data(user_id, chat_id) as data:
+        message_hotel_id = data.get('message_hotel_id')
+        if message_hotel_id is None:
+            return
+        session_id = data['session_id']
+        num_hotel = data['num_hotel']
+        num_hotels = data['num_hotels']
+        hotel_id = data['response']['hotels_keys_with_offer'][num_hotel]
+        hotel = data['response']['hotels_with_offer'][hotel_id]
+
+    safe_edit_message(
+        format_hotel_text(hotel, num_hotel, num_hotels),
+        chat_id,
+        message_hotel_id,
+        markup=gen_markup_pagin_hotels(
+            hotel['name'],
+            hotel['offer']['id'],
+            session_id,
+            True if num_hotels > 1 else False
+        )
+    )
+
+
 @bot.message_handler(state=States.search_hotels)
 def search_hotels_handler(message: Union[Message, CallbackQuery]) -> None:
     do_search_hotels(message)
@@ -409,6 +809,7 @@ def display_controls_handler(message: Message) -> None:
         return
 
     if txt == COMMANDS_TO_REPLY_KEYBOARD['Complete']:
+        active_searches.cancel(user_id)
         with bot.retrieve_data(user_id, chat_id) as data:
             message_hotel_id = data.get('message_hotel_id')
             message_photo_id = data.get('message_photo_id')
@@ -445,7 +846,6 @@ def display_hotels(message: Message | CallbackQuery) -> None:
         num_hotels = data['num_hotels']
         hotel_id = data['response']['hotels_keys_with_offer'][num_hotel]
         hotel = data['response']['hotels_with_offer'][hotel_id]
-        request_record = data['request_record']
         message_hotel_id = data.get('message_hotel_id')
         message_photo_id = data.get('message_photo_id')
 
@@ -491,7 +891,7 @@ def display_hotels(message: Message | CallbackQuery) -> None:
 
     thread = threading.Thread(
         target=_load_photos_background,
-        args=(user_id, chat_id, hotel, hotel_id, request_record, cancel_flag),
+        args=(user_id, chat_id, hotel, hotel_id, cancel_flag),
         daemon=True
     )
     thread.start()
@@ -499,7 +899,7 @@ def display_hotels(message: Message | CallbackQuery) -> None:
 
 def _load_photos_background(user_id: int, chat_id: int,
                             hotel: dict, hotel_id: str,
-                            request_record, cancel_flag: dict) -> None:
+                            cancel_flag: dict) -> None:
     """Фоновая загрузка фото с возможностью отмены."""
     hotel_name = hotel['name']
     if cancel_flag.get('cancel'):
@@ -515,14 +915,10 @@ def _load_photos_background(user_id: int, chat_id: int,
 
         if photos:
             hotel['photos'] = photos
-            hotel_record = Hotel.get(
-                (Hotel.hotel_id == hotel_id) &
-                (Hotel.request == request_record)
-            )
-            if hotel_record.photos == Hotel.EMPTY_PHOTOS:
-                hotel_record.set_photos(photos)
-
             with bot.retrieve_data(user_id, chat_id) as data:
+                # Пока поиск в потоковом режиме не завершён, запроса в истории
+                # ещё нет: фото сохранятся в БД вместе с отелями из FSM.
+                request_record = data.get('request_record')
                 hotel = data['response']['hotels_with_offer'][hotel_id]
                 hotel.update({
                     'photos': photos,
@@ -530,6 +926,14 @@ def _load_photos_background(user_id: int, chat_id: int,
                     'num_photos': len(photos or [])
                 })
 
+            if request_record is not None:
+                hotel_record = Hotel.get(
+                    (Hotel.hotel_id == hotel_id) &
+                    (Hotel.request == request_record)
+                )
+                if hotel_record.photos == Hotel.EMPTY_PHOTOS:
+                    hotel_record.set_photos(photos)
+
             if cancel_flag.get('cancel'):
                 return
 
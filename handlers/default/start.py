@@ -7,6 +7,7 @@ from database.data_storage import User
 from handlers.custom.hotel import do_search_hotels
 from loader import bot
 from states.user_states import States
+from utils.cancellation import active_searches
 from utils.user import get_user_and_chat_ids
 
 
@@ -19,6 +20,8 @@ def bot_start(message: Message) -> None:
 
     User.get_or_create(id=user_id, defaults={'name': user_name})
     command = message.text.replace('/', '')
+    # Незавершённый поиск пользователя больше не нужен.
+    active_searches.cancel(user_id)
 
     if command == 'start':
         with bot.retrieve_data(user_id, chat_id) as data:
@@ -1,7 +1,9 @@
 from telebot import TeleBot
-from telebot.storage import StateMemoryStorage
 
-from config_data.config import BOT_TOKEN
+from config_data.config import BOT_TOKEN, BOT_NUM_THREADS
+from utils.state_storage import LockedStateMemoryStorage
 
-storage = StateMemoryStorage()
-bot = TeleBot(token=BOT_TOKEN, state_storage=storage)
+storage = LockedStateMemoryStorage()
+bot = TeleBot(
+    token=BOT_TOKEN, state_storage=storage, num_threads=BOT_NUM_THREADS
+)
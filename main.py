@@ -70,6 +70,18 @@ if __name__ == '__main__':
 
     create_tables()
 
+    from utils.cache_janitor import CacheJanitor
+    from utils.cache_response import compress_cache_values
+
+    compress_cache_values()
+    CacheJanitor().start()
+
+    from api.cache_warmer import CacheWarmer
+    from config_data.config import CACHE_WARMER_ENABLED
+
+    if CACHE_WARMER_ENABLED:
+        CacheWarmer().start()
+
     bot.add_custom_filter(StateFilter(bot))
     set_default_commands(bot)
     start_polling(bot)
@@ -0,0 +1,24 @@
+import os
+import tempfile
+import unittest
+
+from database import data_storage
+from utils import cache_response
+
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """
+    Тест с отдельной временной базой данных вместо data_history.db
+    и пустым кэшем в памяти.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_path = os.path.join(directory.name, 'test.db')
+        data_storage.db.init(self.db_path)
+        self.addCleanup(data_storage.db.init, data_storage.DB_PATH)
+        self.addCleanup(data_storage.db.close)
+        data_storage.create_tables()
+        cache_response.memory_cache.clear()
+        self.addCleanup(cache_response.memory_cache.clear)
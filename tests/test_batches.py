@@ -0,0 +1,67 @@
+import threading
+import unittest
+
+from api.request_amadeus import (BatchSplitStats, iter_batches, map_batches,
+                                 split_batches)
+
+
+class Rejected(Exception):
+    """Часть отклонена целиком из-за одного элемента."""
+
+
+def fetch(batch: list[str]) -> list[str]:
+    if 'BAD' in batch:
+        raise Rejected()
+    return [item.lower() for item in batch]
+
+
+class SplitBatchesTest(unittest.TestCase):
+
+    def test_split(self):
+        self.assertEqual(split_batches(['a', 'b', 'c', 'd', 'e'], 2),
+                         [['a', 'b'], ['c', 'd'], ['e']])
+        self.assertEqual(split_batches([], 2), [])
+
+
+class IterBatchesTest(unittest.TestCase):
+
+    def test_rejected_batch_is_bisected(self):
+        stats = BatchSplitStats()
+        results = sorted(iter_batches(
+            fetch,
+            [['A', 'B', 'BAD', 'C'], ['D', 'E']],
+            split_on=(Rejected,),
+            split_stats=stats
+        ), key=lambda item: (item[0], item[1]))
+        self.assertEqual(results, [
+            (0, ['A', 'B'], ['a', 'b']),
+            (0, ['BAD'], None),
+            (0, ['C'], ['c']),
+            (1, ['D', 'E'], ['d', 'e']),
+        ])
+        self.assertEqual(stats.stats(), {
+            'splits': 2, 'extra_calls': 4,
+            'isolated_ids': 1, 'recovered_hotels': 0,
+        })
+
+    def test_other_errors_are_raised(self):
+        with self.assertRaises(Rejected):
+            list(iter_batches(fetch, [['A', 'BAD']]))
+
+    def test_timeout_skips_slow_batches(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow_fetch(batch: list[str]) -> list[str]:
+            if batch == ['SLOW']:
+                release.wait(5)
+            return batch
+
+        self.assertEqual(
+            map_batches(slow_fetch, [['A'], ['SLOW'], ['B']], timeout=0.2),
+            [['A'], None, ['B']]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from database.data_storage import APICache, db
+from tests.helpers import TempDatabaseTestCase
+from utils import cache_response
+from utils.cache_response import (CODEC_JSON, CODEC_ZLIB_JSON,
+                                  compress_cache_values, decode_cache_value,
+                                  encode_cache_value, get_cached_response,
+                                  get_cached_responses, iter_cached_responses,
+                                  memory_cache, save_cache_response)
+
+SMALL = {'data': 'Париж'}
+LARGE = {'data': [{'hotelId': f'HOTEL{index:03}', 'name': 'Отель'}
+                  for index in range(50)]}
+
+
+class CacheCodecTest(unittest.TestCase):
+
+    def test_small_values_are_not_compressed(self):
+        value = encode_cache_value(SMALL)
+        self.assertEqual(value[0], CODEC_JSON)
+        self.assertEqual(decode_cache_value(value), SMALL)
+
+    def test_large_values_are_compressed(self):
+        value = encode_cache_value(LARGE)
+        self.assertEqual(value[0], CODEC_ZLIB_JSON)
+        self.assertLess(len(value), len(json.dumps(LARGE)) / 3)
+        self.assertEqual(decode_cache_value(value), LARGE)
+        self.assertEqual(decode_cache_value(memoryview(value)), LARGE)
+
+    def test_compression_can_be_disabled(self):
+        with mock.patch.object(cache_response, 'CACHE_COMPRESSION', False):
+            self.assertEqual(encode_cache_value(LARGE)[0], CODEC_JSON)
+
+    def test_legacy_text_value(self):
+        self.assertEqual(decode_cache_value(json.dumps(SMALL)), SMALL)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            decode_cache_value(bytes([7]) + b'{}')
+
+
+class CompressCacheValuesTest(TempDatabaseTestCase):
+
+    def insert_legacy(self, request_hash: str, value: str) -> None:
+        now = datetime.now()
+        db.execute_sql(
+            'INSERT INTO apicache (end_point, request_hash, value, '
+            'created_at, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)',
+            ('legacy', request_hash, value, now, now + timedelta(hours=1), now)
+        )
+
+    def value_types(self) -> dict[str, str]:
+        return dict(db.execute_sql(
+            'SELECT request_hash, typeof(value) FROM apicache'
+        ).fetchall())
+
+    def test_legacy_rows_are_converted(self):
+        self.insert_legacy('small', json.dumps(SMALL, ensure_ascii=False))
+        self.insert_legacy('large', json.dumps(LARGE, ensure_ascii=False))
+        self.assertEqual(compress_cache_values(batch_size=1), 2)
+        self.assertEqual(self.value_types(),
+                         {'small': 'blob', 'large': 'blob'})
+        cache_response.memory_cache.clear()
+        self.assertEqual(get_cached_response('legacy', 'small'), SMALL)
+        self.assertEqual(get_cached_response('legacy', 'large'), LARGE)
+        self.assertEqual(compress_cache_values(), 0)
+
+    def test_malformed_rows_are_deleted(self):
+        self.insert_legacy('broken', '{"data": ')
+        self.insert_legacy('small', json.dumps(SMALL))
+        with self.assertLogs(cache_response.logger, 'WARNING'):
+            self.assertEqual(compress_cache_values(), 1)
+        self.assertEqual(self.value_types(), {'small': 'blob'})
+        self.assertEqual(APICache.select().count(), 1)
+
+
+class UnreadableCacheRowTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        save_cache_response('codec', 'good', SMALL)
+        save_cache_response('codec', 'bad', SMALL)
+        # Запись, сохранённая более новой версией бота (неизвестный кодек).
+        APICache.update(value=bytes([7]) + b'{}').where(
+            APICache.request_hash == 'bad'
+        ).execute()
+        memory_cache.clear()
+
+    def assert_deleted(self):
+        self.assertEqual(
+            [row.request_hash for row in APICache.select()], ['good']
+        )
+        self.assertIsNone(memory_cache.get(('codec', 'bad')))
+
+    def test_get_cached_response_treats_row_as_miss(self):
+        with self.assertLogs(cache_response.logger, 'WARNING'):
+            self.assertIsNone(get_cached_response('codec', 'bad'))
+        self.assert_deleted()
+
+    def test_get_cached_responses_skips_row(self):
+        with self.assertLogs(cache_response.logger, 'WARNING'):
+            found = get_cached_responses('codec', ['good', 'bad'])
+        self.assertEqual(found, {'good': SMALL})
+        self.assert_deleted()
+
+    def test_iter_cached_responses_skips_row(self):
+        with self.assertLogs(cache_response.logger, 'WARNING'):
+            self.assertEqual(list(iter_cached_responses('codec')), [SMALL])
+        self.assert_deleted()
+
+
+if __name__ == '__main__':
+    unittest.main()
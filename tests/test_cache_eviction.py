@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime, timedelta
+
+from database import data_storage
+from database.data_storage import APICache, db
+from tests.helpers import TempDatabaseTestCase
+from utils import cache_response
+from utils.cache_response import (clear_expired_cache, evict_cache_to_size,
+                                  get_cached_response, save_cache_response,
+                                  save_cache_responses)
+
+END_POINT = 'tests.eviction'
+
+
+class EvictCacheToSizeTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = datetime.now()
+        # Записи в порядке давности последнего обращения: old, middle, new.
+        for minutes, request_hash in ((30, 'old'), (20, 'middle'),
+                                      (10, 'new')):
+            save_cache_response(END_POINT, request_hash,
+                                {'data': request_hash * 10})
+            APICache.update(
+                accessed_at=now - timedelta(minutes=minutes)
+            ).where(APICache.request_hash == request_hash).execute()
+        self.sizes = dict(
+            APICache.select(APICache.request_hash, APICache.size).tuples()
+        )
+
+    def cached_hashes(self) -> set[str]:
+        return {row.request_hash for row in APICache.select()}
+
+    def test_size_is_stored(self):
+        for request_hash, size in self.sizes.items():
+            value = APICache.get(APICache.request_hash == request_hash).value
+            self.assertEqual(size, len(value))
+
+    def test_least_recently_used_rows_are_evicted_first(self):
+        total = sum(self.sizes.values())
+        self.assertEqual(evict_cache_to_size(total), 0)
+        self.assertEqual(evict_cache_to_size(total - 1), 1)
+        self.assertEqual(self.cached_hashes(), {'middle', 'new'})
+        self.assertEqual(evict_cache_to_size(self.sizes['new']), 1)
+        self.assertEqual(self.cached_hashes(), {'new'})
+
+    def test_evicted_rows_are_removed_from_memory(self):
+        self.assertEqual(
+            cache_response.memory_cache.stats()['entries'], 3
+        )
+        evict_cache_to_size(self.sizes['new'], batch_size=1)
+        self.assertEqual(
+            cache_response.memory_cache.stats()['entries'], 1
+        )
+        self.assertIsNone(get_cached_response(END_POINT, 'old'))
+        self.assertIsNone(get_cached_response(END_POINT, 'middle'))
+        self.assertEqual(get_cached_response(END_POINT, 'new'),
+                         {'data': 'new' * 10})
+
+    def test_total_size_is_read_from_the_index(self):
+        plan = db.execute_sql(
+            'EXPLAIN QUERY PLAN SELECT SUM(size) FROM apicache'
+        ).fetchall()
+        self.assertIn('COVERING INDEX', plan[0][-1])
+
+
+class ClearExpiredCacheTest(TempDatabaseTestCase):
+
+    def test_expired_rows_are_removed_from_memory(self):
+        save_cache_responses(END_POINT, {'expired': {'data': 1},
+                                         'fresh': {'data': 2}})
+        APICache.update(
+            expires_at=datetime.now() - timedelta(minutes=1)
+        ).where(APICache.request_hash == 'expired').execute()
+        self.assertEqual(clear_expired_cache(), 1)
+        self.assertEqual(
+            cache_response.memory_cache.stats()['entries'], 1
+        )
+        self.assertEqual(get_cached_response(END_POINT, 'fresh'),
+                         {'data': 2})
+
+
+class MigrateApiCacheTest(TempDatabaseTestCase):
+
+    def test_size_column_is_added_and_filled(self):
+        db.drop_tables([APICache])
+        db.execute_sql(
+            'CREATE TABLE apicache (id INTEGER NOT NULL PRIMARY KEY, '
+            'end_point VARCHAR(255) NOT NULL, '
+            'request_hash VARCHAR(255) NOT NULL, value BLOB NOT NULL, '
+            'created_at DATETIME NOT NULL, expires_at DATETIME, '
+            'accessed_at DATETIME NOT NULL)'
+        )
+        now = datetime.now()
+        db.execute_sql(
+            'INSERT INTO apicache (end_point, request_hash, value, '
+            'created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+            (END_POINT, 'legacy', b'\x00{"data": 1}', now, now)
+        )
+        data_storage.create_tables()
+        self.assertEqual(APICache.get().size, len(b'\x00{"data": 1}'))
+        indexes = {index.name for index in db.get_indexes('apicache')}
+        self.assertIn('apicache_size', indexes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+from datetime import date
+
+from tests.helpers import TempDatabaseTestCase
+from utils.cache_response import (api_cache, bind_arguments, canonical_value,
+                                  make_call_hash, make_item_hashes,
+                                  make_request_hash)
+
+
+def get_hotels(city_code: str, radius: int = 5, amenities: list = None,
+               *, source: str = 'ALL') -> dict:
+    return {}
+
+
+def get_hotels_other(city_code: str, radius: int = 5, amenities: list = None,
+                     *, source: str = 'ALL') -> dict:
+    return {}
+
+
+def variadic(first, *rest, **options) -> None:
+    pass
+
+
+class CanonicalValueTest(unittest.TestCase):
+
+    def test_containers(self):
+        self.assertEqual(canonical_value([1, [2, 3]]), (1, (2, 3)))
+        self.assertEqual(canonical_value({'b': 1, 'a': [2]}),
+                         (('a', (2,)), ('b', 1)))
+        self.assertEqual(canonical_value({'b', 'a', 'b'}), ('a', 'b'))
+        self.assertEqual(canonical_value(date(2030, 1, 10)), '2030-01-10')
+
+    def test_unordered(self):
+        self.assertEqual(canonical_value(['b', 'a', 'b'], unordered=True),
+                         ('a', 'b'))
+        self.assertEqual(canonical_value(['b', 'a']), ('b', 'a'))
+
+
+class BindArgumentsTest(unittest.TestCase):
+
+    def test_defaults_are_applied(self):
+        self.assertEqual(
+            bind_arguments(get_hotels, ('PAR',), {'source': 'BEDBANK'}),
+            {'city_code': 'PAR', 'radius': 5, 'amenities': None,
+             'source': 'BEDBANK'}
+        )
+
+    def test_variadic_signature(self):
+        self.assertEqual(bind_arguments(variadic, (1, 2), {'x': 3}),
+                         {'first': 1, 'rest': (2,), 'options': {'x': 3}})
+
+    def test_invalid_arguments(self):
+        for args, kwargs in (((), {}), (('PAR', 5, None, 'ALL'), {}),
+                             (('PAR',), {'city_code': 'LON'}),
+                             (('PAR',), {'unknown': 1})):
+            with self.subTest(args=args, kwargs=kwargs), \
+                    self.assertRaises(TypeError):
+                bind_arguments(get_hotels, args, kwargs)
+
+
+class MakeCallHashTest(unittest.TestCase):
+
+    def key(self, *args, **kwargs) -> str:
+        return make_call_hash(get_hotels, args, kwargs, {'amenities'})
+
+    def test_positional_keyword_and_default_calls_match(self):
+        key = self.key('PAR')
+        self.assertEqual(self.key('PAR', 5), key)
+        self.assertEqual(self.key(city_code='PAR', radius=5), key)
+        self.assertEqual(self.key('PAR', source='ALL'), key)
+        self.assertEqual(self.key(radius=5, city_code='PAR'), key)
+
+    def test_different_arguments_differ(self):
+        self.assertNotEqual(self.key('PAR'), self.key('LON'))
+        self.assertNotEqual(self.key('PAR'), self.key('PAR', 10))
+        self.assertNotEqual(self.key('PAR', amenities=None),
+                            self.key('PAR', amenities=[]))
+        self.assertNotEqual(self.key('PAR', 5), self.key('PAR', '5'))
+
+    def test_unordered_params(self):
+        self.assertEqual(self.key('PAR', amenities=['SPA', 'WIFI']),
+                         self.key('PAR', amenities=['WIFI', 'SPA', 'SPA']))
+        ordered = make_call_hash(get_hotels, ('PAR',),
+                                 {'amenities': ['SPA', 'WIFI']})
+        self.assertNotEqual(
+            ordered,
+            make_call_hash(get_hotels, ('PAR',),
+                           {'amenities': ['WIFI', 'SPA']})
+        )
+
+    def test_function_name_is_part_of_the_key(self):
+        self.assertNotEqual(
+            make_call_hash(get_hotels, ('PAR',), {}),
+            make_call_hash(get_hotels_other, ('PAR',), {})
+        )
+
+
+class RequestHashTest(unittest.TestCase):
+
+    def test_request_hash_ignores_key_order(self):
+        self.assertEqual(make_request_hash({'a': 1, 'b': [1, 2]}),
+                         make_request_hash({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(make_request_hash({'a': 1}),
+                            make_request_hash({'a': 2}))
+
+    def test_item_hashes(self):
+        params = {'checkInDate': '2030-01-10', 'adults': 2}
+        hashes = make_item_hashes(['HOTEL001', 'HOTEL002'], params)
+        self.assertEqual(len(set(hashes.values())), 2)
+        self.assertEqual(
+            make_item_hashes(['HOTEL001'], dict(reversed(params.items()))),
+            {'HOTEL001': hashes['HOTEL001']}
+        )
+        self.assertNotEqual(
+            make_item_hashes(['HOTEL001'], {**params, 'adults': 1}),
+            {'HOTEL001': hashes['HOTEL001']}
+        )
+        self.assertNotEqual(make_item_hashes(['HOTEL001']),
+                            make_item_hashes(['HOTEL001'], params))
+
+
+class ApiCacheKeyTest(TempDatabaseTestCase):
+
+    def test_equivalent_calls_share_the_cache(self):
+        calls = []
+
+        @api_cache('tests.cache_keys', unordered_params=('amenities',))
+        def get_hotels_cached(city_code: str, radius: int = 5,
+                              amenities: list = None) -> dict:
+            calls.append(city_code)
+            return {'data': len(calls)}
+
+        self.assertEqual(get_hotels_cached('PAR', amenities=['SPA', 'WIFI']),
+                         {'data': 1})
+        self.assertEqual(
+            get_hotels_cached(radius=5, city_code='PAR',
+                              amenities=['WIFI', 'SPA']),
+            {'data': 1}
+        )
+        self.assertEqual(get_hotels_cached('PAR', 10), {'data': 2})
+        self.assertEqual(calls, ['PAR', 'PAR'])
+
+
+if __name__ == '__main__':
+    unittest.main()
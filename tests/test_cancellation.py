@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+
+from api.request_amadeus import iter_batches
+from utils.cancellation import (CancellationRegistry, CancellationToken,
+                                cancellable_sleep, cancellation_scope,
+                                check_cancelled, current_token,
+                                deadline_passed, raise_if_cancelled)
+from utils.exceptions import SearchCancelled, SearchTimeout
+
+
+class CancellationTokenTest(unittest.TestCase):
+
+    def test_cancel(self):
+        token = CancellationToken()
+        token.check()
+        token.cancel()
+        self.assertTrue(token.cancelled)
+        with self.assertRaises(SearchCancelled):
+            token.check()
+
+    def test_deadline(self):
+        token = CancellationToken(timeout=0.05)
+        self.assertFalse(token.expired)
+        time.sleep(0.06)
+        self.assertTrue(token.expired)
+        self.assertEqual(token.remaining(), 0)
+        with self.assertRaises(SearchTimeout):
+            token.check()
+
+    def test_sleep_is_interrupted_by_cancel(self):
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+        started = time.monotonic()
+        with self.assertRaises(SearchCancelled):
+            token.sleep(5)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_sleep_past_deadline_raises_timeout_at_deadline(self):
+        token = CancellationToken(timeout=0.1)
+        started = time.monotonic()
+        with self.assertRaises(SearchTimeout):
+            token.sleep(5)
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class CancellationScopeTest(unittest.TestCase):
+
+    def test_scope_sets_and_resets_current_token(self):
+        token = CancellationToken(timeout=0)
+        self.assertIsNone(current_token.get())
+        with cancellation_scope(token):
+            self.assertIs(current_token.get(), token)
+            self.assertTrue(deadline_passed())
+            # После истечения времени поиск не отменяется.
+            raise_if_cancelled()
+            with self.assertRaises(SearchTimeout):
+                check_cancelled()
+        self.assertIsNone(current_token.get())
+        check_cancelled()
+        self.assertFalse(deadline_passed())
+
+    def test_registry_cancels_previous_search_of_user(self):
+        registry = CancellationRegistry()
+        first = registry.start(1)
+        second = registry.start(1)
+        other = registry.start(2)
+        self.assertTrue(first.cancelled)
+        self.assertFalse(second.cancelled)
+        # Завершение старого поиска не удаляет токен нового.
+        registry.finish(1, first)
+        registry.cancel(1)
+        self.assertTrue(second.cancelled)
+        self.assertFalse(other.cancelled)
+
+
+class IterBatchesCancellationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seen_tokens = []
+
+    def slow_fetch(self, batch: list[str]) -> list[str]:
+        # Токен поиска доступен в потоке пула через контекстную переменную.
+        self.seen_tokens.append(current_token.get())
+        cancellable_sleep(5)
+        return batch
+
+    def test_cancel_reaches_batch_workers(self):
+        token = CancellationToken()
+        threading.Timer(0.1, token.cancel).start()
+        started = time.monotonic()
+        with cancellation_scope(token), self.assertRaises(SearchCancelled):
+            list(iter_batches(self.slow_fetch, [['A'], ['B']]))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.seen_tokens, [token, token])
+
+    def test_deadline_stops_waiting_for_batches(self):
+        token = CancellationToken(timeout=0.2)
+
+        def fetch(batch: list[str]) -> list[str]:
+            if batch == ['SLOW']:
+                return self.slow_fetch(batch)
+            return batch
+
+        started = time.monotonic()
+        with cancellation_scope(token), \
+                self.assertLogs('api.request_amadeus', 'WARNING'):
+            results = list(iter_batches(fetch, [['FAST'], ['SLOW']]))
+        self.assertLess(time.monotonic() - started, 1)
+        # Уже полученные части возвращаются, медленная пропускается.
+        self.assertEqual(results, [(0, ['FAST'], ['FAST'])])
+        self.assertEqual(self.seen_tokens, [token])
+
+
+if __name__ == '__main__':
+    unittest.main()
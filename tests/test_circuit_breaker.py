@@ -0,0 +1,121 @@
+import unittest
+from unittest import mock
+
+from requests.exceptions import ReadTimeout
+
+from api.request_amadeus import circuit_breakers, safe_request
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from utils.exceptions import ExternalServiceUnavailable
+
+
+class FakeClock:
+    """Замена модуля time в utils.circuit_breaker."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('utils.circuit_breaker.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3,
+                                      recovery_timeout=30)
+
+    def fail(self, times: int) -> None:
+        for _ in range(times):
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.clock.now += 10
+        self.assertAlmostEqual(self.breaker.retry_after(), 20)
+
+    def test_success_resets_failures(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_one_probe(self):
+        self.fail(3)
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.breaker.retry_after(), 0)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        # Пробный запрос, не завершившийся за recovery_timeout, повторяется.
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_probe_success_closes(self):
+        self.fail(3)
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_probe_failure_reopens(self):
+        self.fail(3)
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow_request())
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_registry_keeps_one_breaker_per_end_point(self):
+        registry = CircuitBreakerRegistry(failure_threshold=1)
+        self.assertIs(registry.get('a'), registry.get('a'))
+        registry.get('a').record_failure()
+        self.assertTrue(registry.is_open('a'))
+        self.assertFalse(registry.is_open('b'))
+        self.assertEqual(registry.states(), {
+            'a': CircuitBreaker.OPEN, 'b': CircuitBreaker.CLOSED
+        })
+
+
+class SafeRequestBreakerTest(unittest.TestCase):
+
+    END_POINT = 'tests.circuit_breaker.timeout'
+
+    def setUp(self):
+        patcher = mock.patch('api.request_amadeus.cancellable_sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = 0
+
+        @safe_request(max_retries=3, end_point=self.END_POINT)
+        def request():
+            self.calls += 1
+            raise ReadTimeout()
+
+        self.request = request
+
+    def test_open_breaker_stops_requests(self):
+        breaker = circuit_breakers.get(self.END_POINT)
+        self.addCleanup(breaker.record_success)
+        while breaker.state != CircuitBreaker.OPEN:
+            with self.assertRaises((ReadTimeout,
+                                    ExternalServiceUnavailable)):
+                self.request()
+        calls = self.calls
+        with self.assertRaises(ExternalServiceUnavailable) as context:
+            self.request()
+        self.assertEqual(self.calls, calls)
+        self.assertEqual(context.exception.service, self.END_POINT)
+        self.assertGreater(context.exception.retry_after, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import unittest
+from unittest import mock
+
+from api import request_amadeus
+from api.request_amadeus import find_cities
+from config_data.config import CITY_INDEX_PATH
+from utils.city_index import CityIndex, normalize_city_name
+from utils.exceptions import ExternalServiceUnavailable
+
+
+def make_city(iata_code: str, name: str, country_code: str) -> dict:
+    return {
+        'type': 'location',
+        'subType': 'city',
+        'name': name,
+        'iataCode': iata_code,
+        'address': {'countryCode': country_code},
+    }
+
+
+CITIES = [
+    make_city('PAR', 'Paris', 'FR'),
+    make_city('PRX', 'Paris', 'US'),
+    make_city('BER', 'Berlin', 'DE'),
+    make_city('CGN', 'Köln', 'DE'),
+    make_city('SFO', 'San Francisco', 'US'),
+    make_city('SJC', 'San Jose', 'US'),
+    make_city('SAN', 'San Diego', 'US'),
+    make_city('LAS', 'Las Vegas', 'US'),
+]
+
+
+def make_index() -> CityIndex:
+    index = CityIndex(fuzzy_cutoff=0.8)
+    index.add_cities(CITIES, {'PAR': ['Париж'], 'CGN': ['Cologne']})
+    return index
+
+
+def names(cities: list[dict]) -> list[str]:
+    return [f'{city["iataCode"]}:{city["name"]}' for city in cities]
+
+
+class NormalizeCityNameTest(unittest.TestCase):
+
+    def test_normalize(self):
+        self.assertEqual(normalize_city_name(' Köln-Bonn '), 'koln bonn')
+        self.assertEqual(normalize_city_name('SAINT   Petersburg'),
+                         'saint petersburg')
+        self.assertEqual(normalize_city_name('Санкт-Петербург'),
+                         'санкт петербург')
+
+
+class CityIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = make_index()
+
+    def test_cities_without_iata_code_are_skipped(self):
+        self.assertEqual(
+            self.index.add_cities([{'name': 'Nowhere'}, CITIES[0]]), 0
+        )
+        self.assertEqual(len(self.index), len(CITIES))
+
+    def test_prefix_of_any_word(self):
+        # Более короткие (точнее совпадающие) названия - первыми.
+        self.assertEqual(names(self.index.search('san')),
+                         ['SJC:San Jose', 'SAN:San Diego', 'SFO:San Francisco'])
+        self.assertEqual(names(self.index.search('veg')), ['LAS:Las Vegas'])
+
+    def test_names_starting_with_prefix_come_first(self):
+        self.index.add_cities([make_city('XSA', 'Little Sanford', 'US')])
+        self.assertEqual(names(self.index.search('san'))[-1],
+                         'XSA:Little Sanford')
+
+    def test_alt_names_and_diacritics(self):
+        self.assertEqual(names(self.index.search('париж')), ['PAR:Paris'])
+        self.assertEqual(names(self.index.search('koln')), ['CGN:Köln'])
+        self.assertEqual(names(self.index.search('cologne')), ['CGN:Köln'])
+
+    def test_fuzzy_match(self):
+        self.assertEqual(names(self.index.search('Berlim')),
+                         ['BER:Berlin'])
+        self.assertEqual(self.index.search('Qwerty'), [])
+
+    def test_country_filter_and_limit(self):
+        self.assertEqual(names(self.index.search('paris', 'US')),
+                         ['PRX:Paris'])
+        self.assertEqual(len(self.index.search('san', max_cities=2)), 2)
+
+    def test_find_exact(self):
+        self.assertEqual(names(self.index.find_exact(' PARIS ')),
+                         ['PAR:Paris', 'PRX:Paris'])
+        self.assertEqual(names(self.index.find_exact('Париж')),
+                         ['PAR:Paris'])
+        self.assertEqual(self.index.find_exact('Pari'), [])
+        self.assertEqual(self.index.find_exact('Bern'), [])
+
+    def test_results_are_copies(self):
+        self.index.search('paris')[0]['name'] = 'Changed'
+        self.assertEqual(self.index.search('paris')[0]['name'], 'Paris')
+
+    def test_load_csv(self):
+        index = CityIndex()
+        self.assertGreater(index.load_csv(CITY_INDEX_PATH), 100)
+        self.assertEqual(names(index.find_exact('Москва')), ['MOW:Moscow'])
+
+
+class FindCitiesTest(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('city_index', make_index()),
+                            ('_city_index_loaded', True)):
+            patcher = mock.patch.object(request_amadeus, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(request_amadeus, 'get_cities')
+        self.get_cities = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exact_match_in_country_does_not_call_amadeus(self):
+        result = find_cities('paris', country_code='FR')
+        self.assertEqual(result['meta']['source'], 'index')
+        self.assertEqual(names(result['data']), ['PAR:Paris'])
+        self.get_cities.assert_not_called()
+
+    def test_homonyms_missing_from_index_are_found(self):
+        # В справочнике нет Парижа в Техасе и Лондона в Канаде.
+        self.get_cities.return_value = {
+            'data': [make_city('PAR', 'Paris', 'FR'),
+                     make_city('PRX', 'Paris', 'US')],
+            'meta': {'count': 2},
+        }
+        self.get_cities.return_value['data'][1]['address']['stateCode'] = 'TX'
+        result = find_cities('Paris')
+        self.get_cities.assert_called_once_with('PARIS', country_code=None)
+        self.assertEqual(names(result['data']), ['PAR:Paris', 'PRX:Paris'])
+        self.assertNotIn('source', result['meta'])
+
+        self.get_cities.return_value = {
+            'data': [make_city('LON', 'London', 'GB'),
+                     make_city('YXU', 'London', 'CA')],
+            'meta': {'count': 2},
+        }
+        self.assertEqual(names(find_cities('london')['data']),
+                         ['LON:London', 'YXU:London'])
+
+    def test_index_cities_are_merged_with_amadeus(self):
+        self.get_cities.return_value = {
+            'data': [make_city('PAR', 'Paris', 'FR')], 'meta': {'count': 1}
+        }
+        result = find_cities('Париж')
+        self.assertEqual(names(result['data']), ['PAR:Paris'])
+        result = find_cities('paris')
+        self.assertEqual(names(result['data']), ['PAR:Paris', 'PRX:Paris'])
+        self.assertEqual(result['meta']['count'], 2)
+
+    def test_exact_match_when_amadeus_is_unavailable(self):
+        self.get_cities.side_effect = ExternalServiceUnavailable('cities')
+        result = find_cities('paris')
+        self.assertEqual(result['meta']['source'], 'index')
+        self.assertEqual(names(result['data']), ['PAR:Paris', 'PRX:Paris'])
+
+    def test_near_miss_calls_amadeus(self):
+        # 'bern' похоже на 'berlin', но город Берн должен быть доступен.
+        self.get_cities.return_value = {
+            'data': [make_city('BRN', 'Bern', 'CH')], 'meta': {'count': 1}
+        }
+        result = find_cities(' bern')
+        self.get_cities.assert_called_once_with('BERN', country_code=None)
+        self.assertEqual(names(result['data']), ['BRN:Bern'])
+        # Найденный в Amadeus город добавлен в справочник.
+        self.assertEqual(
+            names(find_cities('Bern', country_code='CH')['data']), ['BRN:Bern']
+        )
+        self.assertEqual(self.get_cities.call_count, 1)
+
+    def test_prefix_calls_amadeus(self):
+        self.get_cities.return_value = {
+            'data': [make_city('SJU', 'San Juan', 'PR')], 'meta': {'count': 1}
+        }
+        self.assertEqual(names(find_cities('san')['data']), ['SJU:San Juan'])
+
+    def test_suggestions_when_amadeus_finds_nothing(self):
+        self.get_cities.return_value = {'data': [], 'meta': {'count': 0}}
+        result = find_cities('Berlim')
+        self.assertEqual(result['meta']['source'], 'suggestions')
+        self.assertEqual(names(result['data']), ['BER:Berlin'])
+        self.assertEqual(find_cities('Qwerty')['data'], [])
+
+    def test_suggestions_when_amadeus_is_unavailable(self):
+        self.get_cities.side_effect = ExternalServiceUnavailable('cities')
+        self.assertEqual(find_cities('Berlim')['meta']['source'],
+                         'suggestions')
+        with self.assertRaises(ExternalServiceUnavailable):
+            find_cities('Qwerty')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from datetime import date
+
+from database.data_storage import (Hotel, add_hotels_to_history,
+                                   add_request_to_history)
+from tests.helpers import TempDatabaseTestCase
+
+
+def make_hotel(name: str) -> dict:
+    return {
+        'name': name,
+        'offer': {'price': {'total': '120.50'}, 'boardType': 'ROOM_ONLY'},
+        'geoCode': {'latitude': 48.85, 'longitude': 2.35},
+        'rating': 4,
+        'address': {'lines': ['1 RUE DE RIVOLI'], 'postalCode': '75001'},
+        'distance': {'value': 0.5, 'unit': 'KM'},
+        'sentiments': {'overallRating': 87},
+    }
+
+
+REQUEST_DATA = {
+    'command': 'lowprice',
+    'template_find_city': 'Paris',
+    'city': {'name': 'Paris'},
+    'country': 'France',
+    'currency': {'code': 'EUR', 'name': 'Евро'},
+    'date': {'check_in': date(2030, 1, 10), 'check_out': date(2030, 1, 12)},
+    'range_prices': '50-300',
+    'radius': 5,
+}
+
+
+class AddHotelsToHistoryTest(TempDatabaseTestCase):
+
+    def test_hotels_are_saved_once(self):
+        request_record = add_request_to_history(
+            1, 'user', REQUEST_DATA, {'HOTEL001': make_hotel('First')}
+        )
+        # Повторная загрузка тех же отелей (например, двумя потоками бота)
+        # не приводит к ошибке уникального индекса.
+        add_hotels_to_history(request_record, {
+            'HOTEL001': make_hotel('First'),
+            'HOTEL002': make_hotel('Second'),
+        })
+        hotels = Hotel.select().where(Hotel.request == request_record) \
+            .order_by(Hotel.hotel_id)
+        self.assertEqual([hotel.hotel_id for hotel in hotels],
+                         ['HOTEL001', 'HOTEL002'])
+        self.assertEqual(hotels[1].name, 'Second')
+        self.assertEqual(hotels[1].price, 120.5)
+        self.assertEqual(hotels[1].hotel_sentiments, 87)
+
+
+if __name__ == '__main__':
+    unittest.main()
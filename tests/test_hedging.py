@@ -0,0 +1,207 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from requests import ConnectionError
+
+from api import request_amadeus
+from api.request_amadeus import iter_batches, safe_request
+from utils.hedging import HedgePolicy
+
+# Порог повторной отправки в тестах (в секундах).
+THRESHOLD = 0.05
+
+
+def make_policy() -> HedgePolicy:
+    policy = HedgePolicy(percentile=50, budget_percent=100, min_samples=1)
+    policy.record_latency(THRESHOLD)
+    return policy
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class HedgePolicyTest(unittest.TestCase):
+
+    def test_threshold_needs_min_samples(self):
+        policy = HedgePolicy(percentile=95, min_samples=3)
+        policy.record_latency(1)
+        policy.record_latency(2)
+        self.assertIsNone(policy.threshold())
+        policy.record_latency(3)
+        self.assertEqual(policy.threshold(), 3)
+
+    def test_percentile(self):
+        policy = HedgePolicy(percentile=50, min_samples=1)
+        for seconds in (5, 1, 4, 2, 3):
+            policy.record_latency(seconds)
+        self.assertEqual(policy.threshold(), 3)
+
+    def test_budget(self):
+        policy = HedgePolicy(budget_percent=10)
+        for _ in range(20):
+            policy.record_call()
+        self.assertTrue(policy.try_acquire())
+        self.assertTrue(policy.try_acquire())
+        self.assertFalse(policy.try_acquire())
+        self.assertFalse(HedgePolicy(budget_percent=0).try_acquire())
+
+
+class IterBatchesHedgeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def test_fast_batch_is_not_hedged(self):
+        policy = make_policy()
+        hedge_fetch = mock.Mock()
+        results = list(iter_batches(
+            lambda batch: 'primary', [['A']],
+            hedge=policy, hedge_fetch=hedge_fetch
+        ))
+        self.assertEqual(results, [(0, ['A'], 'primary')])
+        hedge_fetch.assert_not_called()
+        self.assertEqual(policy.stats()['hedges'], 0)
+
+    def test_hedge_of_slow_primary_wins(self):
+        policy = make_policy()
+
+        def slow_primary(batch: list[str]) -> str:
+            self.release.wait(5)
+            return 'primary'
+
+        started = time.monotonic()
+        results = list(iter_batches(
+            slow_primary, [['A']],
+            hedge=policy, hedge_fetch=lambda batch: 'hedge'
+        ))
+        self.assertLess(time.monotonic() - started, 1)
+        # Ответ медленного запроса, полученный позже, не отдаётся.
+        self.assertEqual(results, [(0, ['A'], 'hedge')])
+        stats = policy.stats()
+        self.assertEqual((stats['calls'], stats['hedges'], stats['hedge_wins']),
+                         (1, 1, 1))
+
+    def test_budget_limits_hedges(self):
+        policy = make_policy()
+        policy.budget_percent = 0
+
+        def slow_primary(batch: list[str]) -> str:
+            time.sleep(THRESHOLD * 4)
+            return 'primary'
+
+        hedge_fetch = mock.Mock()
+        results = list(iter_batches(
+            slow_primary, [['A']], hedge=policy, hedge_fetch=hedge_fetch
+        ))
+        self.assertEqual(results, [(0, ['A'], 'primary')])
+        hedge_fetch.assert_not_called()
+
+    def test_queued_hedge_is_cancelled_when_primary_wins(self):
+        policy = make_policy()
+        primary_release = {'A': threading.Event(), 'B': threading.Event()}
+        for event in primary_release.values():
+            self.addCleanup(event.set)
+        hedged = []
+
+        def primary(batch: list[str]) -> str:
+            primary_release[batch[0]].wait(5)
+            return f'primary-{batch[0]}'
+
+        def hedge_fetch(batch: list[str]) -> str:
+            # Один поток повторных запросов занят первой частью,
+            # повторный запрос второй части ждёт в очереди.
+            hedged.append(batch[0])
+            self.release.wait(5)
+            return f'hedge-{batch[0]}'
+
+        results = []
+        patcher = mock.patch.object(
+            request_amadeus, 'AMADEUS_MAX_PARALLEL_BATCHES', 2
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        consumer = threading.Thread(target=lambda: results.extend(
+            iter_batches(primary, [['A'], ['B']],
+                         hedge=policy, hedge_fetch=hedge_fetch)
+        ))
+        consumer.start()
+
+        self.assertTrue(wait_for(lambda: hedged))
+        self.assertTrue(wait_for(lambda: policy.stats()['hedges'] == 2))
+        running = hedged[0]
+        queued = 'B' if running == 'A' else 'A'
+        primary_release[queued].set()
+        self.assertTrue(wait_for(lambda: len(results) == 1))
+        primary_release[running].set()
+        consumer.join(5)
+
+        self.assertEqual(sorted(result for _, _, result in results),
+                         ['primary-A', 'primary-B'])
+        self.assertEqual(hedged, [running])
+        self.assertEqual(policy.stats()['hedge_wins'], 0)
+
+
+class SafeRequestLatencyTest(unittest.TestCase):
+    END_POINT = 'tests.hedging.latency'
+
+    def setUp(self):
+        self.latencies = []
+        for target in ('cancellable_sleep', 'rate_limiter'):
+            patcher = mock.patch.object(request_amadeus, target)
+            self.addCleanup(patcher.stop)
+            setattr(self, target, patcher.start())
+
+    def request(self, func):
+        return safe_request(end_point=self.END_POINT,
+                            on_latency=self.latencies.append)(func)
+
+    def test_only_the_upstream_call_is_timed(self):
+        # Ожидание ограничителя частоты в порог не входит.
+        self.rate_limiter.acquire.side_effect = lambda _: time.sleep(0.2)
+
+        @self.request
+        def upstream():
+            time.sleep(0.02)
+            return 'ok'
+
+        self.assertEqual(upstream(), 'ok')
+        self.assertEqual(len(self.latencies), 1)
+        self.assertGreaterEqual(self.latencies[0], 0.02)
+        self.assertLess(self.latencies[0], 0.2)
+
+    def test_failed_attempts_are_not_recorded(self):
+        attempts = []
+
+        @self.request
+        def upstream():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError('reset')
+            return 'ok'
+
+        with self.assertLogs(request_amadeus.logger, 'WARNING'):
+            self.assertEqual(upstream(), 'ok')
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(len(self.latencies), 1)
+
+        @self.request
+        def broken():
+            raise ValueError('bad response')
+
+        with self.assertRaises(ValueError), \
+                self.assertLogs(request_amadeus.logger, 'ERROR'):
+            broken()
+        self.assertEqual(len(self.latencies), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from api import request_amadeus
+from api.request_amadeus import get_hotel_offers_search
+from tests.helpers import TempDatabaseTestCase
+
+
+def make_offer(hotel_id: str) -> dict:
+    return {
+        'hotel': {'hotelId': hotel_id},
+        'available': True,
+        'offers': [{'price': {'total': '100.00'}}],
+    }
+
+
+class HotelOffersCacheTest(TempDatabaseTestCase):
+    """Предложения кэшируются по каждому отелю отдельно."""
+
+    # Отель, для которого Amadeus не возвращает предложений.
+    NO_OFFER_ID = 'NOOFFER1'
+
+    def setUp(self):
+        super().setUp()
+        self.requested = []
+        patcher = mock.patch.object(
+            request_amadeus, '_hotel_offers_request',
+            side_effect=self.fake_request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_request(self, hotelIds: str, **params) -> SimpleNamespace:
+        hotel_ids = hotelIds.split(',')
+        self.requested.append(hotel_ids)
+        return SimpleNamespace(result={
+            'data': [
+                make_offer(hotel_id) for hotel_id in hotel_ids
+                if hotel_id != self.NO_OFFER_ID
+            ],
+            'meta': {},
+        })
+
+    def search(self, hotel_ids: list[str], **params) -> list[str]:
+        params.setdefault('check_in_date', '2030-01-10')
+        params.setdefault('check_out_date', '2030-01-12')
+        result = get_hotel_offers_search(hotel_ids, **params)
+        return [offer['hotel']['hotelId'] for offer in result['data']]
+
+    def test_only_missing_hotels_are_requested(self):
+        self.assertEqual(self.search(['HOTEL001', 'HOTEL002']),
+                         ['HOTEL001', 'HOTEL002'])
+        self.assertEqual(
+            self.search(['HOTEL003', 'HOTEL002', 'HOTEL001']),
+            ['HOTEL003', 'HOTEL002', 'HOTEL001']
+        )
+        self.assertEqual(self.requested,
+                         [['HOTEL001', 'HOTEL002'], ['HOTEL003']])
+
+    def test_hotel_without_offer_is_not_requested_again(self):
+        self.assertEqual(self.search(['HOTEL001', self.NO_OFFER_ID]),
+                         ['HOTEL001'])
+        self.assertEqual(self.search([self.NO_OFFER_ID, 'HOTEL001']),
+                         ['HOTEL001'])
+        self.assertEqual(len(self.requested), 1)
+
+    def test_offer_params_are_part_of_the_key(self):
+        self.search(['HOTEL001'])
+        self.search(['HOTEL001'], check_in_date='2030-01-11')
+        self.search(['HOTEL001'], guest_adults=2)
+        self.assertEqual(len(self.requested), 3)
+
+    def test_large_lists_are_split_into_batches(self):
+        hotel_ids = [f'HOTEL{index:03}' for index in range(45)]
+        self.assertEqual(self.search(hotel_ids), hotel_ids)
+        self.assertEqual(
+            sorted(len(batch) for batch in self.requested), [5, 20, 20]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
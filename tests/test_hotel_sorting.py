@@ -0,0 +1,51 @@
+import unittest
+
+from utils.hotel import sorting_hotels
+
+
+def make_hotel(rating: int | None = None, price: str = '100.00',
+               distance: float = 1.0) -> dict:
+    hotel = {
+        'offer': {'price': {'total': price}},
+        'distance': {'value': distance},
+    }
+    if rating is not None:
+        hotel['sentiments'] = {'overallRating': rating}
+    return hotel
+
+
+class SortingHotelsTest(unittest.TestCase):
+
+    def test_guest_rating_puts_hotels_without_rating_last(self):
+        hotels = {
+            'NO_DATA_1': make_hotel(),
+            'LOW': make_hotel(rating=40),
+            'NO_DATA_2': make_hotel(),
+            'HIGH': make_hotel(rating=90),
+            'EMPTY': {**make_hotel(), 'sentiments': {}},
+        }
+        hotel_ids = list(hotels)
+        sorting_hotels(hotel_ids, hotels, 'guest_rating')
+        self.assertEqual(hotel_ids,
+                         ['HIGH', 'LOW', 'NO_DATA_1', 'NO_DATA_2', 'EMPTY'])
+
+    def test_zero_rating_is_above_missing_rating(self):
+        hotels = {'NO_DATA': make_hotel(), 'ZERO': make_hotel(rating=0)}
+        hotel_ids = list(hotels)
+        sorting_hotels(hotel_ids, hotels, 'guest_rating')
+        self.assertEqual(hotel_ids, ['ZERO', 'NO_DATA'])
+
+    def test_lowprice_and_bestdeal(self):
+        hotels = {
+            'FAR_CHEAP': make_hotel(price='50.00', distance=9.0),
+            'NEAR_DEAR': make_hotel(price='300.00', distance=0.5),
+        }
+        hotel_ids = list(hotels)
+        sorting_hotels(hotel_ids, hotels, 'bestdeal')
+        self.assertEqual(hotel_ids, ['NEAR_DEAR', 'FAR_CHEAP'])
+        sorting_hotels(hotel_ids, hotels, 'lowprice')
+        self.assertEqual(hotel_ids, ['FAR_CHEAP', 'NEAR_DEAR'])
+
+
+if __name__ == '__main__':
+    unittest.main()
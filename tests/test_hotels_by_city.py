@@ -0,0 +1,146 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from api import request_amadeus
+from api.request_amadeus import (HOTELS_BY_CITY_END_POINT, get_hotels_by_city,
+                                 get_hotels_by_city_max_radius,
+                                 hotels_by_city_index_key)
+from database.data_storage import APICache
+from tests.helpers import TempDatabaseTestCase
+from utils.cache_response import (get_cache_expires_at, memory_cache,
+                                  save_cache_response)
+from utils.hotel_index import HotelDistanceIndex, HotelIndexRegistry
+
+
+def make_hotel(hotel_id: str, distance: float) -> dict:
+    return {'hotelId': hotel_id,
+            'distance': {'value': distance, 'unit': 'KM'}}
+
+
+def hotel_ids(hotels: list[dict]) -> list[str]:
+    return [hotel['hotelId'] for hotel in hotels]
+
+
+class HotelsByCityIndexKeyTest(unittest.TestCase):
+
+    def test_filter_order_does_not_matter(self):
+        self.assertEqual(
+            hotels_by_city_index_key('PAR', amenities=['SPA', 'WIFI'],
+                                     ratings=[5, 4], chain_codes=['HI', 'AC']),
+            hotels_by_city_index_key('PAR', amenities=['WIFI', 'SPA', 'SPA'],
+                                     ratings=[4, 5], chain_codes=['AC', 'HI'])
+        )
+
+    def test_missing_and_empty_filters_differ(self):
+        self.assertNotEqual(hotels_by_city_index_key('PAR', ratings=None),
+                            hotels_by_city_index_key('PAR', ratings=[]))
+        self.assertNotEqual(hotels_by_city_index_key('PAR', amenities=None),
+                            hotels_by_city_index_key('PAR', amenities=[]))
+
+    def test_other_parameters_are_part_of_the_key(self):
+        self.assertNotEqual(hotels_by_city_index_key('PAR'),
+                            hotels_by_city_index_key('LON'))
+        self.assertNotEqual(hotels_by_city_index_key('PAR'),
+                            hotels_by_city_index_key('PAR', radius_unit='MILE'))
+
+
+class HotelDistanceIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = HotelDistanceIndex([
+            make_hotel('OUTSIDE', 5.01), make_hotel('CENTER', 0),
+            make_hotel('BORDER', 5), make_hotel('INSIDE', 4.99),
+        ])
+
+    def test_within_includes_border_and_excludes_outside(self):
+        self.assertEqual(hotel_ids(self.index.within(5)),
+                         ['CENTER', 'INSIDE', 'BORDER'])
+        self.assertEqual(hotel_ids(self.index.within(4.999)),
+                         ['CENTER', 'INSIDE'])
+        self.assertEqual(hotel_ids(self.index.within(100)),
+                         ['CENTER', 'INSIDE', 'BORDER', 'OUTSIDE'])
+        self.assertEqual(hotel_ids(self.index.within(-1)), [])
+
+    def test_within_returns_copies(self):
+        self.index.within(5)[0]['hotelId'] = 'CHANGED'
+        self.assertEqual(hotel_ids(self.index.within(0)), ['CENTER'])
+
+
+class HotelIndexRegistryTest(unittest.TestCase):
+
+    def test_index_of_other_version_is_not_returned(self):
+        registry = HotelIndexRegistry(max_size=2)
+        index = registry.put('PAR', [make_hotel('A', 1)], version=1)
+        self.assertIs(registry.get('PAR', 1), index)
+        self.assertIsNone(registry.get('PAR', 2))
+        self.assertIsNone(registry.get('LON', 1))
+
+    def test_least_recently_used_index_is_removed(self):
+        registry = HotelIndexRegistry(max_size=2)
+        for key in ('PAR', 'LON'):
+            registry.put(key, [], version=1)
+        registry.get('PAR', 1)
+        registry.put('BER', [], version=1)
+        self.assertIsNone(registry.get('LON', 1))
+        self.assertIsNotNone(registry.get('PAR', 1))
+
+
+class GetHotelsByCityTest(TempDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(request_amadeus, 'hotels_by_city_index',
+                                    HotelIndexRegistry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(request_amadeus, 'amadeus')
+        self.by_city = (patcher.start()
+                        .reference_data.locations.hotels.by_city.get)
+        self.addCleanup(patcher.stop)
+        self.by_city.return_value = SimpleNamespace(result={
+            'data': [make_hotel('FAR', 20), make_hotel('NEAR', 1)]
+        })
+        self.request_hash = get_hotels_by_city_max_radius.cache_key('PAR')
+
+    def test_radius_change_does_not_call_amadeus(self):
+        self.assertEqual(hotel_ids(get_hotels_by_city('PAR', radius=5)['data']),
+                         ['NEAR'])
+        self.assertEqual(hotel_ids(get_hotels_by_city('PAR', radius=50)['data']),
+                         ['NEAR', 'FAR'])
+        self.by_city.assert_called_once()
+
+    def test_updated_cache_entry_rebuilds_index(self):
+        get_hotels_by_city('PAR')
+        # Запись кэша обновлена (например, в фоне после устаревания).
+        save_cache_response(HOTELS_BY_CITY_END_POINT, self.request_hash,
+                            {'data': [make_hotel('NEW', 2)]})
+        self.assertEqual(hotel_ids(get_hotels_by_city('PAR')['data']),
+                         ['NEW'])
+        self.by_city.assert_called_once()
+
+    def test_stale_cache_entry_is_refreshed_in_background(self):
+        get_hotels_by_city('PAR')
+        APICache.update(expires_at=datetime.now() - timedelta(minutes=1)) \
+            .execute()
+        memory_cache.clear()
+        self.by_city.return_value = SimpleNamespace(result={
+            'data': [make_hotel('NEW', 2)]
+        })
+        # Пока запись обновляется, используются устаревшие отели.
+        self.assertEqual(hotel_ids(get_hotels_by_city('PAR')['data']),
+                         ['NEAR'])
+        deadline = time.monotonic() + 5
+        while (get_cache_expires_at(HOTELS_BY_CITY_END_POINT,
+                                    self.request_hash) < datetime.now()
+               and time.monotonic() < deadline):
+            time.sleep(0.01)
+        self.assertEqual(self.by_city.call_count, 2)
+        self.assertEqual(hotel_ids(get_hotels_by_city('PAR')['data']),
+                         ['NEW'])
+
+
+if __name__ == '__main__':
+    unittest.main()
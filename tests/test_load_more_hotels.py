@@ -0,0 +1,104 @@
+import threading
+import unittest
+from unittest import mock
+
+from handlers.custom import hotel as hotel_handlers
+from loader import bot
+
+USER_ID, CHAT_ID = 501, 601
+
+
+def make_hotel(hotel_id: str) -> dict:
+    return {'hotelId': hotel_id, 'name': hotel_id}
+
+
+class LoadMoreHotelsTest(unittest.TestCase):
+
+    def setUp(self):
+        bot.set_state(USER_ID, 'search_hotels_stop', CHAT_ID)
+        self.addCleanup(bot.delete_state, USER_ID, CHAT_ID)
+        with bot.retrieve_data(USER_ID, CHAT_ID) as data:
+            data.update({
+                'request': {'command': 'bestdeal'},
+                'response': {
+                    'hotels_by_city': {'data': [
+                        make_hotel(hotel_id) for hotel_id in ('A', 'B', 'C')
+                    ]},
+                    'hotels_with_offer': {'A': make_hotel('A')},
+                    'hotels_keys_with_offer': ['A'],
+                    'pending_hotel_ids': ['B', 'C'],
+                },
+                'num_hotels': 1,
+                'request_record': None,
+            })
+        for name in ('get_offer_params', 'add_sentiments'):
+            patcher = mock.patch.object(hotel_handlers, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def patch_collect(self, side_effect) -> mock.Mock:
+        patcher = mock.patch.object(
+            hotel_handlers, 'collect_hotels_with_offer',
+            side_effect=side_effect
+        )
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_concurrent_calls_load_once(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def collect(pending_ids, hotels_dict, offer_params, found, **kwargs):
+            started.set()
+            release.wait(5)
+            found['B'] = hotels_dict['B']
+            return 1
+
+        collect_mock = self.patch_collect(collect)
+        first = threading.Thread(
+            target=hotel_handlers.load_more_hotels, args=(USER_ID, CHAT_ID)
+        )
+        first.start()
+        self.assertTrue(started.wait(5))
+        # Повторное нажатие, пока первая загрузка не завершена.
+        hotel_handlers.load_more_hotels(USER_ID, CHAT_ID)
+        release.set()
+        first.join(5)
+
+        self.assertEqual(collect_mock.call_count, 1)
+        with bot.retrieve_data(USER_ID, CHAT_ID) as data:
+            self.assertEqual(data['response']['hotels_keys_with_offer'],
+                             ['A', 'B'])
+            self.assertEqual(data['response']['pending_hotel_ids'], ['C'])
+            self.assertEqual(data['num_hotels'], 2)
+
+    def test_next_load_starts_after_previous_one(self):
+        def collect(pending_ids, hotels_dict, offer_params, found, **kwargs):
+            found[pending_ids[0]] = hotels_dict[pending_ids[0]]
+            return 1
+
+        collect_mock = self.patch_collect(collect)
+        hotel_handlers.load_more_hotels(USER_ID, CHAT_ID)
+        hotel_handlers.load_more_hotels(USER_ID, CHAT_ID)
+        # Отели закончились - запросов больше нет.
+        hotel_handlers.load_more_hotels(USER_ID, CHAT_ID)
+
+        self.assertEqual(collect_mock.call_count, 2)
+        with bot.retrieve_data(USER_ID, CHAT_ID) as data:
+            self.assertEqual(data['response']['hotels_keys_with_offer'],
+                             ['A', 'B', 'C'])
+
+    def test_lock_is_released_after_error(self):
+        collect_mock = self.patch_collect(RuntimeError('upstream'))
+        with self.assertLogs(hotel_handlers.logger, 'WARNING'):
+            hotel_handlers.load_more_hotels(USER_ID, CHAT_ID)
+            hotel_handlers.load_more_hotels(USER_ID, CHAT_ID)
+
+        self.assertEqual(collect_mock.call_count, 2)
+        with bot.retrieve_data(USER_ID, CHAT_ID) as data:
+            self.assertEqual(data['response']['pending_hotel_ids'],
+                             ['B', 'C'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+
+from utils.cancellation import CancellationToken, cancellation_scope
+from utils.exceptions import SearchCancelled, SearchTimeout
+from utils.rate_limiter import RateLimiter, TokenBucket, rate_limit_session
+
+
+def elapsed(func, *args) -> float:
+    started = time.monotonic()
+    func(*args)
+    return time.monotonic() - started
+
+
+def acquire_times(acquire, count: int) -> None:
+    for _ in range(count):
+        acquire()
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+        with self.assertRaises(ValueError):
+            TokenBucket(1, burst=0)
+
+    def test_burst_is_available_at_once(self):
+        bucket = TokenBucket(rate=10, burst=3)
+        self.assertLess(elapsed(acquire_times, bucket.acquire, 3), 0.05)
+
+    def test_waits_for_refill(self):
+        bucket = TokenBucket(rate=20, burst=1)
+        bucket.acquire()
+        self.assertGreaterEqual(elapsed(bucket.acquire), 0.04)
+
+    def test_sessions_are_served_in_turn(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.acquire()
+        served = []
+
+        def acquire(session: str) -> None:
+            bucket.acquire(session)
+            served.append(session)
+
+        threads = []
+        # Сначала в очередь встают 3 запроса сессии 'a', затем - 'b'.
+        for session in ('a', 'a', 'a', 'b'):
+            thread = threading.Thread(target=acquire, args=(session,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join(timeout=5)
+        self.assertEqual(served, ['a', 'b', 'a', 'a'])
+
+    def test_cancelled_search_stops_waiting(self):
+        bucket = TokenBucket(rate=0.1, burst=1)
+        bucket.acquire()
+        token = CancellationToken()
+        threading.Timer(0.1, token.cancel).start()
+        started = time.monotonic()
+        with cancellation_scope(token), self.assertRaises(SearchCancelled):
+            bucket.acquire('a')
+        self.assertLess(time.monotonic() - started, 1)
+        # Отменённый запрос не остаётся в очереди и не задерживает других.
+        self.assertEqual(len(bucket._queues), 0)
+
+    def test_search_timeout_stops_waiting(self):
+        bucket = TokenBucket(rate=0.1, burst=1)
+        bucket.acquire()
+        with cancellation_scope(CancellationToken(timeout=0.1)), \
+                self.assertRaises(SearchTimeout):
+            bucket.acquire()
+
+    def test_cancelled_waiter_releases_its_turn(self):
+        bucket = TokenBucket(rate=5, burst=1)
+        bucket.acquire()
+        token = CancellationToken()
+        errors = []
+
+        def cancelled_acquire() -> None:
+            with cancellation_scope(token):
+                try:
+                    bucket.acquire('a')
+                except SearchCancelled as error:
+                    errors.append(error)
+
+        thread = threading.Thread(target=cancelled_acquire)
+        thread.start()
+        time.sleep(0.05)
+        token.cancel()
+        thread.join(timeout=5)
+        self.assertEqual(len(errors), 1)
+        self.assertLess(elapsed(bucket.acquire, 'b'), 0.5)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_end_point_limit(self):
+        limiter = RateLimiter(1000, 100, {'slow': (20, 1)})
+        self.assertLess(
+            elapsed(acquire_times, lambda: limiter.acquire('fast'), 10), 0.05
+        )
+        limiter.acquire('slow')
+        self.assertGreaterEqual(elapsed(limiter.acquire, 'slow'), 0.04)
+
+    def test_session_limit(self):
+        limiter = RateLimiter(1000, 100)
+        limiter.set_session_limit('background', 20, 1)
+        self.assertLess(
+            elapsed(acquire_times, limiter.acquire, 10), 0.05
+        )
+        with rate_limit_session('background'):
+            limiter.acquire()
+            self.assertGreaterEqual(elapsed(limiter.acquire), 0.04)
+
+
+if __name__ == '__main__':
+    unittest.main()
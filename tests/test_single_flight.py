@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+
+from tests.helpers import TempDatabaseTestCase
+from utils.cache_response import api_cache, call_single_flight
+from utils.exceptions import SearchCancelled
+
+FLIGHT_KEY = ('tests.single_flight', 'key')
+
+
+def run_concurrently(func, count: int) -> list:
+    """Вызывает func в count потоках и возвращает результаты (или ошибки)."""
+    results = [None] * count
+
+    def target(index: int) -> None:
+        try:
+            results[index] = func()
+        except Exception as error:
+            results[index] = error
+
+    threads = [threading.Thread(target=target, args=(index,))
+               for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+class CallSingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def slow(self, result=None, error: Exception | None = None):
+        def func():
+            with self.lock:
+                self.calls += 1
+            # Остальные вызовы успевают присоединиться к первому.
+            time.sleep(0.1)
+            if error is not None:
+                raise error
+            return result
+        return func
+
+    def test_concurrent_calls_share_one_request(self):
+        func = self.slow({'data': ['A']})
+        results = run_concurrently(
+            lambda: call_single_flight(FLIGHT_KEY, func), 5
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'data': ['A']}] * 5)
+        # Каждый вызывающий получает свою копию результата.
+        results[0]['data'].append('B')
+        self.assertEqual(results[1], {'data': ['A']})
+
+    def test_error_is_shared(self):
+        func = self.slow(error=ValueError('upstream'))
+        results = run_concurrently(
+            lambda: call_single_flight(FLIGHT_KEY, func), 3
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(result, ValueError)
+                            for result in results))
+
+    def test_finished_request_is_not_reused(self):
+        self.assertEqual(call_single_flight(FLIGHT_KEY, lambda: 1), 1)
+        self.assertEqual(call_single_flight(FLIGHT_KEY, lambda: 2), 2)
+
+    def test_different_keys_are_independent(self):
+        func = self.slow('result')
+        run_concurrently(lambda: call_single_flight(
+            ('tests.single_flight', threading.current_thread().name), func
+        ), 3)
+        self.assertEqual(self.calls, 3)
+
+    def test_waiter_repeats_request_of_cancelled_search(self):
+        leader_started = threading.Event()
+
+        def cancelled():
+            leader_started.set()
+            time.sleep(0.1)
+            raise SearchCancelled()
+
+        leader = threading.Thread(target=run_concurrently, args=(
+            lambda: call_single_flight(FLIGHT_KEY, cancelled), 1
+        ))
+        leader.start()
+        leader_started.wait(5)
+        # Отмена чужого поиска не является ошибкой запроса.
+        self.assertEqual(call_single_flight(FLIGHT_KEY, lambda: 'own'), 'own')
+        leader.join(5)
+
+
+class ApiCacheSingleFlightTest(TempDatabaseTestCase):
+
+    def test_concurrent_misses_make_one_upstream_call(self):
+        calls = []
+
+        @api_cache('tests.single_flight.api_cache')
+        def fetch(city_code: str) -> dict:
+            calls.append(city_code)
+            time.sleep(0.1)
+            return {'data': city_code}
+
+        results = run_concurrently(lambda: fetch('PAR'), 4)
+        self.assertEqual(results, [{'data': 'PAR'}] * 4)
+        self.assertEqual(calls, ['PAR'])
+        # Следующий вызов получает ответ из кэша.
+        self.assertEqual(fetch('PAR'), {'data': 'PAR'})
+        self.assertEqual(calls, ['PAR'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import threading
+import time
+import unittest
+
+from utils.state_storage import LockedStateMemoryStorage
+
+CHAT_ID, USER_ID = 10, 20
+
+
+def increment(storage: LockedStateMemoryStorage, key: str, times: int) -> None:
+    for _ in range(times):
+        with storage.get_interactive_data(CHAT_ID, USER_ID) as data:
+            value = data.get(key, 0)
+            # Переключение потоков между чтением и записью.
+            time.sleep(0)
+            data[key] = value + 1
+
+
+class LockedStateMemoryStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = LockedStateMemoryStorage()
+        self.storage.set_state(CHAT_ID, USER_ID, 'state')
+
+    def test_concurrent_updates_are_not_lost(self):
+        threads = [
+            threading.Thread(target=increment, args=(self.storage, key, 200))
+            for key in ('num_hotel', 'num_hotel', 'photos', 'photos')
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        data = self.storage.get_data(CHAT_ID, USER_ID)
+        self.assertEqual(data, {'num_hotel': 400, 'photos': 400})
+
+    def test_data_is_read_after_the_other_block_is_saved(self):
+        entered = threading.Event()
+        seen = []
+
+        def writer():
+            with self.storage.get_interactive_data(CHAT_ID, USER_ID) as data:
+                entered.set()
+                time.sleep(0.1)
+                data['hotels'] = ['A']
+
+        def reader():
+            # Контекст создан до записи, но данные читаются при входе в блок.
+            context = self.storage.get_interactive_data(CHAT_ID, USER_ID)
+            entered.wait()
+            with context as data:
+                seen.append(list(data.get('hotels', [])))
+
+        threads = [threading.Thread(target=writer),
+                   threading.Thread(target=reader)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(seen, [['A']])
+
+    def test_nested_calls_in_one_thread_do_not_deadlock(self):
+        with self.storage.get_interactive_data(CHAT_ID, USER_ID) as data:
+            data['num_hotel'] = 1
+            self.storage.set_state(CHAT_ID, USER_ID, 'other')
+        self.assertEqual(self.storage.get_state(CHAT_ID, USER_ID), 'other')
+        self.assertEqual(self.storage.get_data(CHAT_ID, USER_ID),
+                         {'num_hotel': 1})
+
+    def test_lock_is_released_after_error(self):
+        try:
+            with self.storage.get_interactive_data(CHAT_ID, USER_ID) as data:
+                data['missing_key']
+        except KeyError:
+            pass
+        lock = self.storage.lock(CHAT_ID, USER_ID)
+        self.assertTrue(lock.acquire(blocking=False))
+        lock.release()
+
+    def test_users_have_separate_locks(self):
+        self.assertIs(self.storage.lock(CHAT_ID, USER_ID),
+                      self.storage.lock(CHAT_ID, USER_ID))
+        self.assertIsNot(self.storage.lock(CHAT_ID, USER_ID),
+                         self.storage.lock(CHAT_ID, USER_ID + 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
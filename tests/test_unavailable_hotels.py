@@ -0,0 +1,129 @@
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from amadeus import ClientError, ServerError
+
+from api import request_amadeus
+from api.request_amadeus import (HOTEL_UNAVAILABLE_END_POINT,
+                                 NoRoomsAvailable, get_hotel_offers_search)
+from database.data_storage import APICache
+from tests.helpers import TempDatabaseTestCase
+from utils import cache_response
+
+OFFER_PARAMS = {'check_in_date': '2030-01-10', 'check_out_date': '2030-01-12'}
+
+
+def make_offer(hotel_id: str, available: bool = True) -> dict:
+    return {
+        'hotel': {'hotelId': hotel_id},
+        'available': available,
+        'offers': [{'price': {'total': '100.00'}}],
+    }
+
+
+def make_error(error_class: type[Exception]) -> Exception:
+    return error_class(SimpleNamespace(
+        status_code=500 if error_class is ServerError else 400,
+        parsed=False, result=None
+    ))
+
+
+class UnavailableHotelsTest(TempDatabaseTestCase):
+    """Кэш отелей, недоступных на даты поиска."""
+
+    def setUp(self):
+        super().setUp()
+        self.requested = []
+        # Отели, из-за которых Amadeus отклоняет batch: {код: исключение}.
+        self.rejecting = {}
+        self.not_available = set()
+        # Ошибка, которую вернёт следующий запрос, независимо от отелей.
+        self.next_error = None
+        patcher = mock.patch.object(
+            request_amadeus, '_hotel_offers_request',
+            side_effect=self.fake_request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_request(self, hotelIds: str, **params) -> SimpleNamespace:
+        hotel_ids = hotelIds.split(',')
+        self.requested.append(hotel_ids)
+        if self.next_error is not None:
+            error, self.next_error = self.next_error, None
+            raise error
+        for hotel_id in hotel_ids:
+            if hotel_id in self.rejecting:
+                raise self.rejecting[hotel_id]
+        return SimpleNamespace(result={
+            'data': [make_offer(hotel_id, hotel_id not in self.not_available)
+                     for hotel_id in hotel_ids],
+            'meta': {},
+        })
+
+    def search(self, hotel_ids: list[str]) -> list[str]:
+        self.requested.clear()
+        with self.assertNoLogs(request_amadeus.logger, 'ERROR'):
+            result = get_hotel_offers_search(hotel_ids, **OFFER_PARAMS)
+        return [offer['hotel']['hotelId'] for offer in result['data']]
+
+    def unavailable(self) -> dict[str, str]:
+        keys = request_amadeus.unavailable_cache_keys(
+            ['A', 'B', 'C', 'D'],
+            request_amadeus.build_offer_params(**OFFER_PARAMS)
+        )
+        cached = cache_response.get_cached_responses(
+            HOTEL_UNAVAILABLE_END_POINT, list(keys.values())
+        )
+        return {
+            hotel_id: cached[key]['data']
+            for hotel_id, key in keys.items() if key in cached
+        }
+
+    def test_only_the_isolated_hotel_is_marked_no_rooms(self):
+        self.rejecting['C'] = NoRoomsAvailable()
+        self.assertEqual(sorted(self.search(['A', 'B', 'C', 'D'])),
+                         ['A', 'B', 'D'])
+        self.assertEqual(self.unavailable(), {'C': 'no_rooms'})
+        # Остальные отели взяты из кэша предложений, C - пропущен.
+        self.assertEqual(sorted(self.search(['A', 'B', 'C', 'D'])),
+                         ['A', 'B', 'D'])
+        self.assertEqual(self.requested, [])
+
+    def test_client_error_is_bisected_to_one_hotel(self):
+        self.rejecting['B'] = make_error(ClientError)
+        self.assertEqual(sorted(self.search(['A', 'B', 'C', 'D'])),
+                         ['A', 'C', 'D'])
+        self.assertEqual(self.unavailable(), {'B': 'error'})
+
+    def test_transient_error_is_not_cached(self):
+        self.next_error = make_error(ServerError)
+        with self.assertLogs(request_amadeus.logger, 'ERROR'):
+            result = get_hotel_offers_search(['A', 'B'], **OFFER_PARAMS)
+        self.assertEqual(result['data'], [])
+        self.assertEqual(self.unavailable(), {})
+        # Следующий поиск снова запрашивает те же отели.
+        self.assertEqual(self.search(['A', 'B']), ['A', 'B'])
+        self.assertEqual(self.requested, [['A', 'B']])
+
+    def test_offer_not_available_is_marked_per_hotel(self):
+        self.not_available.add('A')
+        self.search(['A', 'B'])
+        self.assertEqual(self.unavailable(), {'A': 'not_available'})
+
+    def test_entry_expires(self):
+        self.rejecting['A'] = NoRoomsAvailable()
+        self.search(['A'])
+        del self.rejecting['A']
+        APICache.update(
+            expires_at=datetime.now() - timedelta(minutes=1)
+        ).where(APICache.end_point == HOTEL_UNAVAILABLE_END_POINT).execute()
+        cache_response.memory_cache.clear()
+        self.assertEqual(self.search(['A']), ['A'])
+        self.assertEqual(self.requested, [['A']])
+
+
+if __name__ == '__main__':
+    unittest.main()
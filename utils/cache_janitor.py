@@ -0,0 +1,78 @@
+import logging
+import threading
+
+from config_data.config import (CACHE_JANITOR_BATCH_SIZE,
+                                CACHE_JANITOR_INTERVAL_MINUTES, CACHE_MAX_MB)
+from utils.cache_response import (clear_expired_cache, evict_cache_to_size,
+                                  flush_access_times)
+
+logger = logging.getLogger(__name__)
+
+
+class CacheJanitor:
+    """
+    Фоновая очистка кэша ответов API в базе данных. Периодически
+    записывает время обращения к записям, удаляет устаревшие записи
+    и ограничивает размер кэша, удаляя давно не использованные записи.
+    Удаление выполняется небольшими частями с паузами, поэтому не
+    задерживает запросы пользователей.
+    """
+
+    def __init__(
+            self,
+            interval_minutes: float = CACHE_JANITOR_INTERVAL_MINUTES,
+            batch_size: int = CACHE_JANITOR_BATCH_SIZE,
+            max_mb: float = CACHE_MAX_MB,
+            pause: float = 0.05
+    ):
+        """
+        :param interval_minutes: Интервал между очистками (в минутах).
+        :param batch_size: Количество записей, удаляемых в одной транзакции.
+        :param max_mb: Максимальный размер кэша (в мегабайтах);
+            0 - без ограничения.
+        :param pause: Пауза между частями удаления (в секундах).
+        """
+        self.interval = interval_minutes * 60
+        self.batch_size = batch_size
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'CacheJanitor':
+        """Запускает очистку в фоновом потоке."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._loop, name='cache-janitor', daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает очистку (после завершения текущей части)."""
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as error:
+                logger.exception(f'Ошибка очистки кэша: {error}')
+
+    def run_once(self) -> dict[str, int]:
+        """
+        Выполняет одну очистку.
+
+        :return: Количество записей: с обновлённым временем обращения,
+            удалённых устаревших и удалённых для ограничения размера.
+        """
+        stats = {
+            'touched': flush_access_times(self.batch_size),
+            'expired': clear_expired_cache(self.batch_size, self.pause),
+            'evicted': 0,
+        }
+        if self.max_bytes:
+            stats['evicted'] = evict_cache_to_size(
+                self.max_bytes, self.batch_size, self.pause
+            )
+        return stats
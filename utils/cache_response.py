@@ -1,10 +1,335 @@
 import hashlib
+import inspect
 import json
+import logging
 import random
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from copy import deepcopy
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import lru_cache, wraps
+from typing import Any, Iterable, NamedTuple
 
-from database.data_storage import APICache
+from peewee import chunked, fn
+
+from config_data.config import (CACHE_COMPRESSION, CACHE_COMPRESSION_LEVEL,
+                                CACHE_MEMORY_MAX_MB, CACHE_TTL_JITTER)
+from database.data_storage import APICache, db
+from utils.exceptions import SearchInterrupted
+from utils.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# Кэш в памяти перед кэшем в базе данных: {(end_point, request_hash): данные}.
+# Запись выполняется в оба кэша, поэтому после перезапуска данные остаются
+# в базе данных.
+memory_cache = MemoryCache(int(CACHE_MEMORY_MAX_MB * 1024 * 1024))
+
+
+# Типы значений, которые входят в ключ кэша без преобразования.
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def canonical_value(value, unordered: bool = False):
+    """
+    Приводит значение аргумента к неизменяемому виду с детерминированным
+    repr для ключа кэша: списки - к кортежам, словари и множества -
+    к упорядоченным кортежам.
+
+    :param value: Значение аргумента.
+    :param unordered: Порядок и повторы элементов списка не важны
+        (например, список кодов отелей): элементы упорядочиваются.
+    """
+    if type(value) in _SCALAR_TYPES:
+        return value
+    if isinstance(value, dict):
+        return tuple(sorted(
+            (str(key), item if type(item) in _SCALAR_TYPES
+             else canonical_value(item))
+            for key, item in value.items()
+        ))
+    if isinstance(value, (set, frozenset)):
+        unordered = True
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [canonical_value(item) for item in value]
+        if unordered:
+            return tuple(sorted(set(items), key=repr))
+        return tuple(items)
+    return str(value)
+
+
+def hash_key(key) -> str:
+    """
+    Вычисляет хэш ключа кэша, приведённого к каноническому виду
+    (см. canonical_value). repr кортежа из простых значений вычисляется
+    быстрее json.dumps с sort_keys, а blake2b - быстрее sha256.
+
+    :return: Шестнадцатеричная строка хэша (128 бит).
+    """
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+def make_request_hash(key_data: dict) -> str:
+    """
+    Вычисляет хэш запроса по словарю с его параметрами.
+
+    :param key_data: Параметры, однозначно определяющие запрос.
+    :return: Шестнадцатеричная строка хэша.
+    """
+    return hash_key(canonical_value(key_data))
+
+
+def make_item_hashes(items: Iterable[str],
+                     key_data: dict | None = None) -> dict[str, str]:
+    """
+    Вычисляет хэши записей, которые отличаются только идентификатором
+    (например, предложения разных отелей с одинаковыми параметрами
+    поиска). Общие параметры приводятся к каноническому виду один раз,
+    а для каждой записи хэшируется только короткая строка.
+
+    :param items: Идентификаторы записей, например, коды отелей.
+    :param key_data: Общие параметры записей.
+    :return: Словарь {идентификатор: хэш}.
+    """
+    common = repr(canonical_value(key_data or {}))
+    return {
+        item: hashlib.blake2b(
+            f'{item!r}:{common}'.encode(), digest_size=16
+        ).hexdigest()
+        for item in items
+    }
+
+
+class _Parameters(NamedTuple):
+    # Параметры функции: (имя, значение по умолчанию).
+    items: tuple[tuple[str, Any], ...]
+    names: frozenset[str]
+    # Количество параметров, которые можно передать позиционно.
+    positional: int
+    # Все параметры - обычные (без *args, **kwargs и только позиционных).
+    simple: bool
+
+
+@lru_cache(maxsize=None)
+def _parameters(func) -> _Parameters:
+    parameters = inspect.signature(func).parameters.values()
+    return _Parameters(
+        items=tuple((item.name, item.default) for item in parameters),
+        names=frozenset(item.name for item in parameters),
+        positional=sum(
+            item.kind == item.POSITIONAL_OR_KEYWORD for item in parameters
+        ),
+        simple=all(
+            item.kind in (item.POSITIONAL_OR_KEYWORD, item.KEYWORD_ONLY)
+            for item in parameters
+        )
+    )
+
+
+def bind_arguments(func, args: tuple, kwargs: dict) -> dict[str, Any]:
+    """
+    Связывает аргументы вызова с сигнатурой функции и дополняет их
+    значениями по умолчанию. Сигнатура разбирается один раз; для функций
+    с обычными параметрами аргументы связываются без медленного
+    inspect.Signature.bind.
+
+    :return: Словарь {имя параметра: значение} в порядке сигнатуры.
+    :raises TypeError: Если аргументы не соответствуют сигнатуре.
+    """
+    parameters = _parameters(func)
+    if (parameters.simple and len(args) <= parameters.positional
+            and kwargs.keys() <= parameters.names):
+        arguments = {}
+        for i, (name, default) in enumerate(parameters.items):
+            if i < len(args):
+                if name in kwargs:
+                    break
+                arguments[name] = args[i]
+                continue
+            value = kwargs.get(name, default)
+            if value is inspect.Parameter.empty:
+                break
+            arguments[name] = value
+        else:
+            return arguments
+    # Остальные случаи и ошибки (с тем же сообщением, что и при вызове).
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return bound.arguments
+
+
+def make_call_hash(func, args: tuple, kwargs: dict,
+                   unordered_params: Iterable[str] = ()) -> str:
+    """
+    Вычисляет хэш вызова функции для ключа кэша api_cache.
+
+    Аргументы связываются с сигнатурой функции и дополняются значениями
+    по умолчанию, поэтому f('LON', 5), f(city_code='LON', radius=5) и
+    вызов с явно переданным значением по умолчанию получают один ключ.
+
+    :param func: Функция.
+    :param args: Позиционные аргументы вызова.
+    :param kwargs: Именованные аргументы вызова.
+    :param unordered_params: Параметры-списки, порядок элементов которых
+        не важен (см. canonical_value).
+    :raises TypeError: Если аргументы не соответствуют сигнатуре.
+    """
+    arguments = []
+    for name, value in bind_arguments(func, args, kwargs).items():
+        if type(value) not in _SCALAR_TYPES:
+            value = canonical_value(value, name in unordered_params)
+        arguments.append((name, value))
+    return hash_key((func.__name__, tuple(arguments)))
+
+
+# Первый байт значения записи кэша - способ кодирования остальных байтов.
+CODEC_JSON = 0
+CODEC_ZLIB_JSON = 1
+# Значения меньше этого размера (в байтах) не сжимаются.
+COMPRESS_MIN_BYTES = 256
+
+
+def encode_cache_value(data) -> bytes:
+    """
+    Кодирует данные для хранения в кэше: JSON в UTF-8, сжатый zlib
+    (если CACHE_COMPRESSION включено и данные не слишком малы), с байтом
+    способа кодирования в начале.
+    """
+    raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    if CACHE_COMPRESSION and len(raw) >= COMPRESS_MIN_BYTES:
+        return bytes([CODEC_ZLIB_JSON]) + zlib.compress(
+            raw, CACHE_COMPRESSION_LEVEL
+        )
+    return bytes([CODEC_JSON]) + raw
+
+
+def decode_cache_value(value: bytes | memoryview | str):
+    """
+    Декодирует значение записи кэша (см. encode_cache_value).
+    Строка - значение в старом формате (JSON-текст).
+
+    :raises ValueError: Если способ кодирования неизвестен.
+    """
+    if isinstance(value, str):
+        return json.loads(value)
+    value = bytes(value)
+    codec, payload = value[0], value[1:]
+    if codec == CODEC_JSON:
+        return json.loads(payload)
+    if codec == CODEC_ZLIB_JSON:
+        return json.loads(zlib.decompress(payload))
+    raise ValueError(f'Неизвестный способ кодирования записи кэша: {codec}')
+
+
+def decode_cache_row(end_point: str, request_hash: str,
+                     value: bytes | memoryview | str):
+    """
+    Декодирует значение записи кэша из базы данных (см. decode_cache_value).
+    Запись, которую не удаётся декодировать (неизвестный способ кодирования,
+    повреждённые данные), удаляется: это лишь кэш, и ответ будет получен
+    заново.
+
+    :param end_point: Метка (namespace) кэша, идентифицирующая группу записей.
+    :param request_hash: Хэш запроса.
+    :param value: Значение записи.
+    :return: Данные записи; None, если запись повреждена и удалена.
+    """
+    try:
+        return decode_cache_value(value)
+    except (ValueError, zlib.error) as error:
+        logger.warning(f'Запись кэша {end_point} {request_hash} '
+                       f'повреждена и удалена: {error}')
+        APICache.delete().where(
+            (APICache.end_point == end_point)
+            & (APICache.request_hash == request_hash)
+        ).execute()
+        memory_cache.discard((end_point, request_hash))
+        return None
+
+
+def expires_at_with_jitter(
+        ttl_hours: float, now: datetime | None = None
+) -> datetime:
+    """
+    Возвращает момент истечения срока жизни записи кэша со случайным
+    отклонением ±CACHE_TTL_JITTER от ttl_hours, чтобы записи, сохранённые
+    одновременно, не устаревали одновременно.
+    """
+    jitter = random.uniform(-CACHE_TTL_JITTER, CACHE_TTL_JITTER)
+    return (now or datetime.now()) + timedelta(hours=ttl_hours * (1 + jitter))
+
+
+def get_cached_entry(
+        end_point: str, request_hash: str, stale_ttl_hours: float = 0
+) -> tuple[dict, bool] | None:
+    """
+    Возвращает из базы данных кэшированный ответ API и признак того,
+    что срок его жизни истёк.
+
+    :param end_point: Метка (namespace) кэша, идентифицирующая группу записей.
+    :param request_hash: Хэш запроса.
+    :param stale_ttl_hours: Сколько часов после истечения срока жизни
+        запись ещё возвращается (как устаревшая).
+    :return: Кортеж (данные, устарела ли запись); None, если записи нет
+        или истёк и срок её жизни, и stale_ttl_hours. Такая запись
+        удаляется позже (см. utils.cache_janitor).
+    """
+    key = (end_point, request_hash)
+    now = datetime.now()
+    in_memory = memory_cache.get(key)
+    if in_memory is not None:
+        value, expires_at = in_memory
+    else:
+        try:
+            cached = APICache.get(
+                (APICache.end_point == end_point)
+                & (APICache.request_hash == request_hash)
+            )
+        except APICache.DoesNotExist:
+            return None
+        value = decode_cache_row(end_point, request_hash, cached.value)
+        if value is None:
+            return None
+        expires_at = cached.expires_at
+        memory_cache.put(key, value, expires_at)
+    if expires_at and expires_at < now:
+        if expires_at + timedelta(hours=stale_ttl_hours) < now:
+            memory_cache.discard(key)
+            return None
+        record_access(end_point, [request_hash], now)
+        return value, True
+    record_access(end_point, [request_hash], now)
+    return value, False
+
+
+def get_cache_expires_at(
+        end_point: str, request_hash: str
+) -> datetime | None:
+    """
+    Возвращает момент истечения срока жизни записи кэша, не читая
+    и не декодируя её данные. Каждое сохранение записи задаёт новый срок
+    (см. expires_at_with_jitter), поэтому он служит и версией записи:
+    по нему производные от ответа структуры (например, индексы) узнают,
+    что ответ обновлён.
+
+    :param end_point: Метка (namespace) кэша, идентифицирующая группу записей.
+    :param request_hash: Хэш запроса.
+    :return: Срок жизни записи; datetime.max, если он не ограничен;
+        None, если записи нет.
+    """
+    row = (
+        APICache
+        .select(APICache.expires_at)
+        .where((APICache.end_point == end_point)
+               & (APICache.request_hash == request_hash))
+        .tuples()
+        .first()
+    )
+    if row is None:
+        return None
+    return row[0] or datetime.max
 
 
 def get_cached_response(end_point: str, request_hash: str) -> dict | None:
@@ -17,17 +342,10 @@ def get_cached_response(end_point: str, request_hash: str) -> dict | None:
     :return: Словарь с данными, если запись найдена и срок её жизни не истёк;
         None, если записи нет или истёк срок её жизни.
     """
-    try:
-        cached = APICache.get(
-            (APICache.end_point == end_point)
-            & (APICache.request_hash == request_hash)
-        )
-        if cached.expires_at and cached.expires_at < datetime.now():
-            cached.delete_instance()
-            return None
-        return json.loads(cached.value)
-    except APICache.DoesNotExist:
+    entry = get_cached_entry(end_point, request_hash)
+    if entry is None or entry[1]:
         return None
+    return entry[0]
 
 
 def save_cache_response(
@@ -41,33 +359,424 @@ def save_cache_response(
     :param end_point: Метка (namespace) кэша, идентифицирующая группу записей.
     :param request_hash: Хэш запроса, определяющий конкретный вызов.
     :param data: Словарь с данными ответа, который будет сохранён.
-    :param ttl_hours: Время жизни записи (в часах).
+    :param ttl_hours: Время жизни записи (в часах), см. expires_at_with_jitter.
     """
+    value = encode_cache_value(data)
+    expires_at = expires_at_with_jitter(ttl_hours)
     APICache.insert(
         end_point=end_point,
         request_hash=request_hash,
-        value=json.dumps(data, ensure_ascii=False),
-        expires_at=datetime.now() + timedelta(hours=ttl_hours)
+        value=value,
+        size=len(value),
+        expires_at=expires_at,
+        accessed_at=datetime.now()
     ).on_conflict(
         conflict_target=[APICache.end_point, APICache.request_hash],
-        preserve=[APICache.value, APICache.created_at, APICache.expires_at]
+        preserve=[APICache.value, APICache.size, APICache.created_at,
+                  APICache.expires_at, APICache.accessed_at]
     ).execute()
+    memory_cache.put((end_point, request_hash), data, expires_at)
 
 
-def clear_expired_cache():
+def get_cached_responses(
+        end_point: str, request_hashes: list[str]
+) -> dict[str, dict]:
     """
-    Удаляет из базы данных записи кэша API, срок жизни которых истёк.
+    Возвращает из базы данных сразу несколько кэшированных ответов API
+    одним запросом. Записи с истёкшим сроком жизни пропускаются.
+
+    :param end_point: Метка (namespace) кэша, идентифицирующая группу записей.
+    :param request_hashes: Хэши запросов.
+    :return: Словарь {request_hash: данные} только для найденных записей.
     """
-    deleted_count = APICache.delete().where(
-        (APICache.expires_at.is_null(False)) &
-        (APICache.expires_at < datetime.now())
+    found = {}
+    now = datetime.now()
+    missing = []
+    for request_hash in request_hashes:
+        in_memory = memory_cache.get((end_point, request_hash))
+        if in_memory is None:
+            missing.append(request_hash)
+            continue
+        value, expires_at = in_memory
+        if not (expires_at and expires_at < now):
+            found[request_hash] = value
+    for hashes in chunked(missing, 500):
+        query = APICache.select(
+            APICache.request_hash, APICache.value, APICache.expires_at
+        ).where(
+            (APICache.end_point == end_point)
+            & (APICache.request_hash.in_(hashes))
+        )
+        for cached in query:
+            if cached.expires_at and cached.expires_at < now:
+                continue
+            value = decode_cache_row(
+                end_point, cached.request_hash, cached.value
+            )
+            if value is None:
+                continue
+            found[cached.request_hash] = value
+            memory_cache.put(
+                (end_point, cached.request_hash), value, cached.expires_at
+            )
+    record_access(end_point, list(found), now)
+    return found
+
+
+def save_cache_responses(
+        end_point: str, items: dict[str, dict], ttl_hours: float = 6
+):
+    """
+    Сохраняет в базе данных сразу несколько ответов API.
+    Существующие записи перезаписываются (см. save_cache_response).
+
+    :param end_point: Метка (namespace) кэша, идентифицирующая группу записей.
+    :param items: Словарь {request_hash: данные}.
+    :param ttl_hours: Время жизни записей (в часах).
+    """
+    now = datetime.now()
+    rows = []
+    for request_hash, data in items.items():
+        value = encode_cache_value(data)
+        rows.append({
+            'end_point': end_point,
+            'request_hash': request_hash,
+            'value': value,
+            'size': len(value),
+            'created_at': now,
+            'expires_at': expires_at_with_jitter(ttl_hours, now),
+            'accessed_at': now,
+        })
+    with db.atomic():
+        for batch in chunked(rows, 100):
+            APICache.insert_many(batch).on_conflict(
+                conflict_target=[APICache.end_point, APICache.request_hash],
+                preserve=[APICache.value, APICache.size, APICache.created_at,
+                          APICache.expires_at, APICache.accessed_at]
+            ).execute()
+    for row in rows:
+        memory_cache.put(
+            (end_point, row['request_hash']),
+            items[row['request_hash']],
+            row['expires_at']
+        )
+
+
+def iter_cached_responses(end_point: str):
+    """
+    Перебирает все кэшированные ответы API с меткой end_point, срок жизни
+    которых не истёк.
+
+    :param end_point: Метка (namespace) кэша, идентифицирующая группу записей.
+    :return: Генератор словарей с данными.
+    """
+    query = APICache.select(APICache.request_hash, APICache.value).where(
+        (APICache.end_point == end_point)
+        & (APICache.expires_at.is_null(True)
+           | (APICache.expires_at >= datetime.now()))
+    )
+    # Повреждённые записи удаляются после перебора, чтобы не изменять
+    # таблицу во время чтения.
+    corrupted = []
+    for cached in query.iterator():
+        try:
+            data = decode_cache_value(cached.value)
+        except (ValueError, zlib.error):
+            corrupted.append(cached)
+            continue
+        yield data
+    for cached in corrupted:
+        decode_cache_row(end_point, cached.request_hash, cached.value)
+
+
+def compress_cache_values(batch_size: int = 500) -> int:
+    """
+    Перекодирует записи кэша, сохранённые в старом формате (JSON-текст),
+    в формат encode_cache_value. Записи, которые не удаётся разобрать как
+    JSON, удаляются (это лишь кэш). Повторный вызов ничего не меняет.
+    Если записи перекодированы или удалены, файл базы данных сжимается
+    (VACUUM).
+
+    :param batch_size: Количество записей, перекодируемых в одной транзакции.
+    :return: Количество перекодированных записей.
+    """
+    converted = 0
+    deleted = 0
+    while True:
+        rows = list(
+            APICache
+            .select(APICache.id, APICache.end_point, APICache.value)
+            .where(fn.typeof(APICache.value) == 'text')
+            .limit(batch_size)
+            .tuples()
+        )
+        if not rows:
+            break
+        with db.atomic():
+            for row_id, end_point, value in rows:
+                try:
+                    data = json.loads(value)
+                except ValueError as error:
+                    logger.warning(f'Запись кэша {row_id} ({end_point}) '
+                                   f'повреждена и удалена: {error}')
+                    APICache.delete().where(APICache.id == row_id).execute()
+                    deleted += 1
+                    continue
+                value = encode_cache_value(data)
+                APICache.update(
+                    value=value, size=len(value)
+                ).where(APICache.id == row_id).execute()
+                converted += 1
+    if converted or deleted:
+        db.execute_sql('VACUUM')
+        logger.info(f'Перекодировано записей кэша: {converted}, '
+                    f'удалено повреждённых: {deleted}')
+    return converted
+
+
+# Сколько часов после истечения срока жизни записи ещё используются:
+# {end_point: stale_ttl_hours} (см. api_cache).
+_stale_ttl_hours: dict[str, float] = {}
+
+
+def delete_cache_rows(rows: list[tuple[int, str, str]]) -> int:
+    """
+    Удаляет записи кэша из базы данных и те же записи из кэша в памяти,
+    чтобы удалённые записи не возвращались из памяти.
+
+    :param rows: Кортежи (id, end_point, request_hash).
+    :return: Количество удалённых записей.
+    """
+    deleted = APICache.delete().where(
+        APICache.id.in_([row_id for row_id, _, _ in rows])
     ).execute()
+    for _, end_point, request_hash in rows:
+        memory_cache.discard((end_point, request_hash))
+    return deleted
+
+
+def delete_in_batches(query, batch_size: int, pause: float = 0) -> int:
+    """
+    Удаляет записи кэша, выбранные запросом query (APICache.select), частями
+    по batch_size в отдельных транзакциях, чтобы не блокировать базу данных
+    надолго (см. delete_cache_rows).
+
+    :param query: Запрос, выбирающий записи (в порядке удаления).
+    :param batch_size: Количество записей, удаляемых в одной транзакции.
+    :param pause: Пауза между частями (в секундах).
+    :return: Количество удалённых записей.
+    """
+    deleted = 0
+    while True:
+        rows = list(query.select(
+            APICache.id, APICache.end_point, APICache.request_hash
+        ).limit(batch_size).tuples())
+        if not rows:
+            return deleted
+        deleted += delete_cache_rows(rows)
+        if len(rows) < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def clear_expired_cache(batch_size: int = 500, pause: float = 0) -> int:
+    """
+    Удаляет из базы данных записи кэша API, срок жизни которых истёк
+    (с учётом stale_ttl_hours метки кэша, см. api_cache).
+
+    :param batch_size: См. delete_in_batches.
+    :param pause: См. delete_in_batches.
+    :return: Количество удалённых записей.
+    """
+    now = datetime.now()
+    condition = (
+        (APICache.expires_at.is_null(False)) &
+        (APICache.expires_at < now)
+    )
+    for end_point, stale_ttl_hours in _stale_ttl_hours.items():
+        condition &= ~(
+            (APICache.end_point == end_point) &
+            (APICache.expires_at >= now - timedelta(hours=stale_ttl_hours))
+        )
+    deleted_count = delete_in_batches(
+        APICache.select().where(condition), batch_size, pause
+    )
     if deleted_count:
-        print(f'[clear_expired_cache] Удалено '
-              f'устаревших записей: {deleted_count}')
+        logger.info(f'Удалено устаревших записей кэша: {deleted_count}')
+    return deleted_count
 
 
-def api_cache(end_point: str, ttl_hours: float = 6):
+def evict_cache_to_size(max_bytes: int, batch_size: int = 500,
+                        pause: float = 0) -> int:
+    """
+    Удаляет давно не использованные записи кэша (по accessed_at), пока
+    суммарный размер значений больше max_bytes. Записи удаляются и из кэша
+    в памяти. Размер кэша считается по индексу столбца size, без чтения
+    самих значений.
+
+    :param max_bytes: Максимальный суммарный размер значений (в байтах).
+    :param batch_size: Количество записей, удаляемых в одной транзакции.
+    :param pause: Пауза между частями (в секундах).
+    :return: Количество удалённых записей.
+    """
+    total = APICache.select(fn.COALESCE(fn.SUM(APICache.size), 0)).scalar()
+    evicted = 0
+    while total > max_bytes:
+        rows = list(
+            APICache
+            .select(APICache.id, APICache.end_point, APICache.request_hash,
+                    APICache.size)
+            .order_by(APICache.accessed_at, APICache.id)
+            .limit(batch_size)
+            .tuples()
+        )
+        if not rows:
+            break
+        # Удаляются только записи, нужные для соблюдения ограничения.
+        evict_rows = []
+        for row_id, end_point, request_hash, size in rows:
+            if total <= max_bytes:
+                break
+            evict_rows.append((row_id, end_point, request_hash))
+            total -= size or 0
+        evicted += delete_cache_rows(evict_rows)
+        time.sleep(pause)
+    if evicted:
+        logger.info(f'Удалено записей кэша для ограничения размера: {evicted}')
+    return evicted
+
+
+# Время последнего обращения к записям кэша, ещё не записанное в базу
+# данных: {(end_point, request_hash): время}. Записывается фоновой очисткой
+# кэша (см. flush_access_times), чтобы не выполнять запись при каждом чтении.
+_access_times: dict[tuple[str, str], datetime] = {}
+_access_times_lock = threading.Lock()
+
+
+def record_access(end_point: str, request_hashes: list[str],
+                  accessed_at: datetime) -> None:
+    """Запоминает время обращения к записям кэша (см. flush_access_times)."""
+    with _access_times_lock:
+        for request_hash in request_hashes:
+            _access_times[(end_point, request_hash)] = accessed_at
+
+
+def flush_access_times(batch_size: int = 500) -> int:
+    """
+    Записывает в базу данных время последнего обращения к записям кэша,
+    накопленное record_access.
+
+    :return: Количество обновлённых записей.
+    """
+    global _access_times
+    with _access_times_lock:
+        access_times, _access_times = _access_times, {}
+    by_time: dict[tuple[str, datetime], list[str]] = {}
+    for (end_point, request_hash), accessed_at in access_times.items():
+        # Время округляется до минуты, чтобы обновлять записи группами.
+        minute = accessed_at.replace(second=0, microsecond=0)
+        by_time.setdefault((end_point, minute), []).append(request_hash)
+    updated = 0
+    for (end_point, minute), request_hashes in by_time.items():
+        for hashes in chunked(request_hashes, batch_size):
+            with db.atomic():
+                updated += APICache.update(accessed_at=minute).where(
+                    (APICache.end_point == end_point)
+                    & (APICache.request_hash.in_(hashes))
+                ).execute()
+    return updated
+
+
+# Выполняющиеся в данный момент запросы: {(end_point, request_hash): Future}.
+_in_flight: dict[tuple[str, str], Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+def call_single_flight(flight_key: tuple[str, str], func, *args, **kwargs):
+    """
+    Выполняет func(*args, **kwargs) так, чтобы одновременные вызовы
+    с одинаковым flight_key не дублировали запрос: первый вызов выполняет
+    функцию, остальные дожидаются его результата (или исключения).
+
+    :param flight_key: Ключ запроса (end_point, request_hash).
+    :param func: Вызываемая функция.
+    :return: Результат func. Ожидавшие вызовы получают его копию, чтобы
+        изменение результата одним вызывающим не затрагивало других.
+        Если первый вызов прерван отменой своего поиска (SearchInterrupted),
+        ожидавший вызов выполняет функцию заново.
+    """
+    while True:
+        with _in_flight_lock:
+            future = _in_flight.get(flight_key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                _in_flight[flight_key] = future
+
+        if is_leader:
+            break
+        try:
+            return deepcopy(future.result())
+        except SearchInterrupted:
+            # Поиск, выполнявший запрос, прерван - это не ошибка запроса,
+            # поэтому ожидавший вызов выполняет его сам.
+            continue
+
+    try:
+        result = func(*args, **kwargs)
+    except BaseException as error:
+        with _in_flight_lock:
+            _in_flight.pop(flight_key, None)
+        future.set_exception(error)
+        raise
+    with _in_flight_lock:
+        _in_flight.pop(flight_key, None)
+    future.set_result(result)
+    return result
+
+
+# Фоновое обновление устаревших записей кэша (см. api_cache).
+_refresh_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix='cache-refresh'
+)
+_refreshing: set[tuple[str, str]] = set()
+_refreshing_lock = threading.Lock()
+
+
+def refresh_in_background(flight_key: tuple[str, str], func, *args, **kwargs):
+    """
+    Выполняет func(*args, **kwargs) в фоновом потоке, если обновление
+    с таким же flight_key ещё не выполняется. Одновременные вызовы
+    с промахом кэша ожидают это же обновление (см. call_single_flight).
+    Ошибки обновления записываются в журнал.
+
+    :param flight_key: Ключ запроса (end_point, request_hash).
+    :param func: Функция, обновляющая запись кэша.
+    :return: Future обновления или None, если обновление уже выполняется.
+    """
+    with _refreshing_lock:
+        if flight_key in _refreshing:
+            return None
+        _refreshing.add(flight_key)
+
+    def refresh():
+        try:
+            call_single_flight(flight_key, func, *args, **kwargs)
+        except Exception as error:
+            logger.warning(f'Не удалось обновить запись кэша '
+                           f'{flight_key[0]}: {error}')
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(flight_key)
+
+    # Поток выполняется вне контекста вызывающего, поэтому обновление не
+    # прерывается отменой поиска пользователя.
+    return _refresh_executor.submit(refresh)
+
+
+def api_cache(end_point: str, ttl_hours: float = 6,
+              stale_ttl_hours: float = 0,
+              unordered_params: Iterable[str] = ()):
     """
     Декоратор для кэширования результатов, возвращаемых функцией.
 
@@ -79,31 +788,49 @@ def api_cache(end_point: str, ttl_hours: float = 6):
         Может быть любым уникальным описанием, например, именем функции
         или названием API-метода.
     :param ttl_hours: Время жизни записи (в часах).
+    :param stale_ttl_hours: Сколько часов после истечения срока жизни
+        запись ещё возвращается сразу, а в фоне запрашивается новая
+        (stale-while-revalidate). 0 - устаревшая запись не используется.
+    :param unordered_params: Параметры-списки, порядок элементов которых
+        не влияет на ответ (например, коды отелей). Вызовы с разным
+        порядком элементов используют одну запись кэша.
+
+    Одновременные вызовы с одинаковыми параметрами при промахе кэша
+    выполняют один общий запрос (см. call_single_flight).
     """
+    if stale_ttl_hours:
+        _stale_ttl_hours[end_point] = stale_ttl_hours
+    unordered_params = frozenset(unordered_params)
 
     def decorator(func):
+        def fetch_and_save(key: str, *args, **kwargs):
+            response = func(*args, **kwargs)
+            save_cache_response(end_point, key, response, ttl_hours=ttl_hours)
+            return response
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Удаление устаревших записей с вероятностью ~1% на каждый вызов.
-            if random.random() < 0.01:
-                clear_expired_cache()
-
-            key_data = {
-                'func_name': func.__name__,
-                'args': args,
-                'kwargs': kwargs
-            }
-            key_string = json.dumps(key_data, sort_keys=True, default=str)
-            key = hashlib.sha256(key_string.encode()).hexdigest()
-
-            cached = get_cached_response(end_point, key)
-            if cached is not None:
+            key = make_call_hash(func, args, kwargs, unordered_params)
+
+            entry = get_cached_entry(end_point, key, stale_ttl_hours)
+            if entry is not None:
+                cached, stale = entry
+                if stale:
+                    refresh_in_background(
+                        (end_point, key), fetch_and_save, key, *args, **kwargs
+                    )
                 return cached
 
-            response = func(*args, **kwargs)
-            save_cache_response(end_point, key, response, ttl_hours=ttl_hours)
-            return response
+            return call_single_flight(
+                (end_point, key), fetch_and_save, key, *args, **kwargs
+            )
 
+        def cache_key(*args, **kwargs) -> str:
+            """Возвращает хэш запроса (ключ записи кэша) для параметров."""
+            return make_call_hash(func, args, kwargs, unordered_params)
+
+        wrapper.cache_key = cache_key
         return wrapper
 
     return decorator
+
@@ -0,0 +1,164 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils.exceptions import SearchCancelled, SearchTimeout
+
+
+class CancellationToken:
+    """
+    Признак отмены и крайний срок выполнения поиска.
+
+    Токен текущего поиска хранится в контекстной переменной (см.
+    cancellation_scope) и поэтому доступен во всех функциях поиска,
+    в том числе в потоках, выполняющих части запросов (iter_batches).
+    """
+
+    def __init__(self, timeout: float | None = None):
+        """
+        :param timeout: Время (в секундах), отведённое на поиск.
+            None - без ограничения.
+        """
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Отменяет поиск."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> float | None:
+        """Оставшееся время (в секундах) или None, если срок не задан."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        """
+        :raises SearchCancelled: Если поиск отменён.
+        :raises SearchTimeout: Если истекло отведённое на поиск время.
+        """
+        if self.cancelled:
+            raise SearchCancelled()
+        if self.expired:
+            raise SearchTimeout()
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Пауза, которая прерывается при отмене поиска.
+
+        :raises SearchCancelled: Если поиск отменён.
+        :raises SearchTimeout: Если отведённое на поиск время истекает
+            раньше окончания паузы.
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            self._cancelled.wait(remaining)
+            self.check()
+            raise SearchTimeout()
+        self._cancelled.wait(seconds)
+        self.check()
+
+
+current_token: ContextVar[CancellationToken | None] = ContextVar(
+    'current_token', default=None
+)
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken):
+    """Делает token токеном текущего поиска на время выполнения блока."""
+    reset_token = current_token.set(token)
+    try:
+        yield token
+    finally:
+        current_token.reset(reset_token)
+
+
+def check_cancelled() -> None:
+    """
+    Проверяет токен текущего поиска (если он есть), см.
+    CancellationToken.check.
+    """
+    token = current_token.get()
+    if token is not None:
+        token.check()
+
+
+def raise_if_cancelled() -> None:
+    """
+    Проверяет только отмену текущего поиска: после истечения отведённого
+    времени поиск продолжается, чтобы вернуть уже полученные результаты.
+
+    :raises SearchCancelled: Если поиск отменён.
+    """
+    token = current_token.get()
+    if token is not None and token.cancelled:
+        raise SearchCancelled()
+
+
+def deadline_passed() -> bool:
+    """Проверяет, что истекло время, отведённое на текущий поиск."""
+    token = current_token.get()
+    return token is not None and token.expired
+
+
+def cancellable_sleep(seconds: float) -> None:
+    """
+    time.sleep, прерываемый отменой текущего поиска (если он есть),
+    см. CancellationToken.sleep.
+    """
+    token = current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+class CancellationRegistry:
+    """Токены текущих поисков пользователей, по одному на пользователя."""
+
+    def __init__(self):
+        self._tokens: dict[int, CancellationToken] = {}
+        self._lock = threading.Lock()
+
+    def start(self, user_id: int,
+              timeout: float | None = None) -> CancellationToken:
+        """
+        Создаёт токен нового поиска пользователя, отменяя предыдущий поиск.
+
+        :param user_id: Идентификатор пользователя.
+        :param timeout: Время (в секундах), отведённое на поиск.
+        :return: Токен нового поиска.
+        """
+        token = CancellationToken(timeout)
+        with self._lock:
+            previous = self._tokens.get(user_id)
+            self._tokens[user_id] = token
+        if previous is not None:
+            previous.cancel()
+        return token
+
+    def cancel(self, user_id: int) -> None:
+        """Отменяет текущий поиск пользователя (если он есть)."""
+        with self._lock:
+            token = self._tokens.pop(user_id, None)
+        if token is not None:
+            token.cancel()
+
+    def finish(self, user_id: int, token: CancellationToken) -> None:
+        """Удаляет токен завершившегося поиска, если он всё ещё текущий."""
+        with self._lock:
+            if self._tokens.get(user_id) is token:
+                self._tokens.pop(user_id)
+
+
+active_searches = CancellationRegistry()
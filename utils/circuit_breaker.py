@@ -0,0 +1,122 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для обращений к внешнему сервису.
+
+    Состояния:
+    * CLOSED - запросы выполняются как обычно;
+    * OPEN - после failure_threshold подряд неудачных попыток запросы
+      не выполняются в течение recovery_timeout секунд;
+    * HALF_OPEN - по истечении recovery_timeout пропускается один пробный
+      запрос: при успехе предохранитель закрывается, при ошибке - снова
+      размыкается.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5,
+                 recovery_timeout: float = 30):
+        """
+        :param failure_threshold: Количество неудачных попыток подряд,
+            после которого предохранитель размыкается.
+        :param recovery_timeout: Время (в секундах), в течение которого
+            запросы не выполняются.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние предохранителя."""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.recovery_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def retry_after(self) -> float:
+        """Количество секунд до пробного запроса (0 - если не разомкнут)."""
+        with self._lock:
+            if self._state() != self.OPEN:
+                return 0
+            return self.recovery_timeout - (time.monotonic() - self._opened_at)
+
+    def allow_request(self) -> bool:
+        """
+        Проверяет, можно ли выполнить запрос. В состоянии HALF_OPEN
+        разрешает только один пробный запрос (повторно - если пробный
+        запрос не завершился за recovery_timeout).
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.OPEN:
+                return False
+            now = time.monotonic()
+            if (self._probe_started_at is not None
+                    and now - self._probe_started_at < self.recovery_timeout):
+                return False
+            self._probe_started_at = now
+            return True
+
+    def record_success(self) -> None:
+        """Отмечает, что сервис ответил; предохранитель замыкается."""
+        with self._lock:
+            self._failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        """Отмечает неудачную попытку, которую имеет смысл повторить."""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+
+class CircuitBreakerRegistry:
+    """Набор предохранителей, по одному на end point."""
+
+    def __init__(self, failure_threshold: int = 5,
+                 recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, end_point: str) -> CircuitBreaker:
+        """Возвращает предохранитель end point, создавая его при необходимости."""
+        with self._lock:
+            breaker = self._breakers.get(end_point)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    self.failure_threshold, self.recovery_timeout
+                )
+                self._breakers[end_point] = breaker
+            return breaker
+
+    def is_open(self, end_point: str) -> bool:
+        """Проверяет, что запросы к end point сейчас не выполняются."""
+        return self.get(end_point).state == CircuitBreaker.OPEN
+
+    def states(self) -> dict[str, str]:
+        """Возвращает состояния всех известных предохранителей."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            end_point: breaker.state
+            for end_point, breaker in breakers.items()
+        }
@@ -0,0 +1,180 @@
+import csv
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from copy import deepcopy
+from difflib import get_close_matches
+
+
+def normalize_city_name(text: str) -> str:
+    """
+    Приводит название города к виду для поиска: нижний регистр, без
+    диакритических знаков, знаки препинания и повторяющиеся пробелы
+    заменены одним пробелом. Например, ' Köln-Bonn ' -> 'koln bonn'.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[\W_]+', ' ', text).split())
+
+
+class CityIndex:
+    """
+    Локальный справочник городов с кодами IATA (элементы 'data' ответа
+    amadeus.reference_data.locations.cities).
+
+    Поиск по началу любого слова названия (как в Amadeus) или
+    альтернативного названия - двоичный поиск по упорядоченному списку
+    ключей. Если таких городов нет, то ищутся похожие названия
+    (difflib), что исправляет опечатки.
+    """
+
+    def __init__(self, fuzzy_cutoff: float = 0.8):
+        """
+        :param fuzzy_cutoff: Минимальная похожесть названий (от 0 до 1)
+            при поиске с опечатками.
+        """
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._cities: dict[tuple[str, str], dict] = {}
+        self._names: dict[str, set[tuple[str, str]]] = {}
+        self._keys: list[tuple[str, tuple[str, str]]] = []
+        self._sorted = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cities)
+
+    def add_cities(self, cities: list[dict],
+                   alt_names: dict[str, list[str]] | None = None) -> int:
+        """
+        Добавляет города в справочник (города без кода IATA пропускаются).
+        Город с тем же кодом IATA и названием заменяется.
+
+        :param cities: Города в формате Amadeus.
+        :param alt_names: Альтернативные названия по кодам IATA,
+            например, {'PAR': ['Париж']}.
+        :return: Количество добавленных городов.
+        """
+        alt_names = alt_names or {}
+        added = 0
+        with self._lock:
+            for city in cities:
+                iata_code = city.get('iataCode')
+                name = normalize_city_name(city.get('name') or '')
+                if not iata_code or not name:
+                    continue
+                city_key = (iata_code, name)
+                if city_key not in self._cities:
+                    added += 1
+                self._cities[city_key] = deepcopy(city)
+                names = {name} | {
+                    normalize_city_name(alt_name)
+                    for alt_name in alt_names.get(iata_code, [])
+                }
+                for city_name in names - {''}:
+                    self._names.setdefault(city_name, set()).add(city_key)
+                    words = city_name.split(' ')
+                    for i in range(len(words)):
+                        self._keys.append((' '.join(words[i:]), city_key))
+                self._sorted = False
+        return added
+
+    def load_csv(self, path: str) -> int:
+        """
+        Загружает города из CSV-файла с колонками iata_code, name,
+        country_code, state_code, latitude, longitude, alt_names
+        (альтернативные названия через '|').
+
+        :return: Количество добавленных городов.
+        """
+        cities = []
+        alt_names = {}
+        with open(path, encoding='utf-8', newline='') as file:
+            for row in csv.DictReader(file):
+                address = {'countryCode': row['country_code']}
+                if row.get('state_code'):
+                    address['stateCode'] = row['state_code']
+                cities.append({
+                    'type': 'location',
+                    'subType': 'city',
+                    'name': row['name'],
+                    'iataCode': row['iata_code'],
+                    'address': address,
+                    'geoCode': {
+                        'latitude': float(row['latitude']),
+                        'longitude': float(row['longitude']),
+                    },
+                })
+                if row.get('alt_names'):
+                    alt_names[row['iata_code']] = row['alt_names'].split('|')
+        return self.add_cities(cities, alt_names)
+
+    def find_exact(self, name: str, country_code: str = None,
+                   max_cities: int = 50) -> list[dict]:
+        """
+        Возвращает копии городов, название или альтернативное название
+        которых совпадает с name (без учёта регистра, диакритических
+        знаков и знаков препинания, см. normalize_city_name).
+
+        :param name: Название города.
+        :param country_code: Код страны согласно ISO 3166 Alpha-2.
+        :param max_cities: Максимальное количество городов.
+        """
+        with self._lock:
+            found = sorted(self._names.get(normalize_city_name(name), ()))
+            return self._select(found, country_code, max_cities)
+
+    def search(self, keyword: str, country_code: str = None,
+               max_cities: int = 50) -> list[dict]:
+        """
+        Возвращает копии городов, название которых содержит слово,
+        начинающееся с keyword, а если таких нет - города с похожими
+        названиями.
+
+        :param keyword: Название города (или его начало) в любом регистре.
+        :param country_code: Код страны согласно ISO 3166 Alpha-2.
+        :param max_cities: Максимальное количество городов.
+        :return: Список городов, начиная с наиболее подходящих.
+        """
+        prefix = normalize_city_name(keyword)
+        if not prefix:
+            return []
+        with self._lock:
+            if not self._sorted:
+                self._keys = sorted(set(self._keys))
+                self._sorted = True
+            found = self._find_prefix(prefix)
+            if not found:
+                for name in get_close_matches(
+                        prefix, self._names, n=max_cities,
+                        cutoff=self.fuzzy_cutoff
+                ):
+                    found.extend(sorted(self._names[name]))
+            return self._select(found, country_code, max_cities)
+
+    def _select(self, city_keys: list[tuple[str, str]], country_code: str,
+                max_cities: int) -> list[dict]:
+        cities = [
+            self._cities[city_key] for city_key in dict.fromkeys(city_keys)
+            if country_code is None
+            or self._cities[city_key].get('address', {})
+            .get('countryCode') == country_code
+        ]
+        return deepcopy(cities[:max_cities])
+
+    def _find_prefix(self, prefix: str) -> list[tuple[str, str]]:
+        """
+        Возвращает ключи городов, у которых с prefix начинается название
+        (первыми) или другое слово названия.
+        """
+        matches = []
+        i = bisect_left(self._keys, (prefix,))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+            matches.append(self._keys[i])
+            i += 1
+        # Первыми - города, название которых начинается с prefix, среди
+        # них - более короткие (более точно совпадающие) названия.
+        matches.sort(key=lambda item: (
+            item[1] not in self._names.get(item[0], ()), len(item[0])
+        ))
+        return [city_key for _, city_key in matches]
@@ -11,6 +11,19 @@ class OffersNotFound(HotelSearchError):
 
 
 class ExternalServiceUnavailable(HotelSearchError):
-    def __init__(self, service: str):
+    def __init__(self, service: str, retry_after: float | None = None):
         self.service = service
+        self.retry_after = retry_after
         super().__init__(f'Service unavailable: {service}')
+
+
+class SearchInterrupted(HotelSearchError):
+    """Поиск прерван до завершения (см. utils.cancellation)."""
+
+
+class SearchCancelled(SearchInterrupted):
+    """Поиск отменён: пользователь начал новый поиск или перезапустил бота."""
+
+
+class SearchTimeout(SearchInterrupted):
+    """Истекло время, отведённое на поиск."""
@@ -0,0 +1,107 @@
+import math
+import threading
+from collections import deque
+
+
+class HedgePolicy:
+    """
+    Политика повторной (hedged) отправки медленных запросов.
+
+    Запоминает время выполнения последних window запросов и считает
+    медленным запрос, который выполняется дольше percentile-го процентиля
+    этого времени. Количество повторных запросов ограничено бюджетом:
+    не более budget_percent процентов от общего количества запросов.
+    """
+
+    def __init__(
+            self,
+            percentile: float = 95,
+            budget_percent: float = 5,
+            min_samples: int = 20,
+            window: int = 200
+    ):
+        """
+        :param percentile: Процентиль времени выполнения, после которого
+            запрос считается медленным.
+        :param budget_percent: Максимальная доля повторных запросов
+            (в процентах от общего количества запросов). 0 - повторные
+            запросы не отправляются.
+        :param min_samples: Минимальное количество измерений, после которого
+            определяется порог.
+        :param window: Количество последних измерений, по которым
+            определяется порог.
+        """
+        self.percentile = percentile
+        self.budget_percent = budget_percent
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_percent > 0
+
+    def record_call(self) -> None:
+        """Учитывает отправленный запрос (основной, не повторный)."""
+        with self._lock:
+            self._calls += 1
+
+    def record_latency(self, seconds: float) -> None:
+        """
+        Запоминает время выполнения успешного запроса к внешнему сервису.
+        Время ожидания в очередях (ограничитель частоты, пул потоков)
+        и неудачные попытки учитывать не нужно: они завышают порог.
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def threshold(self) -> float | None:
+        """
+        Возвращает время (в секундах), после которого запрос считается
+        медленным, или None, если измерений пока недостаточно.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        rank = math.ceil(self.percentile / 100 * len(latencies)) - 1
+        return latencies[min(max(rank, 0), len(latencies) - 1)]
+
+    def try_acquire(self) -> bool:
+        """
+        Проверяет бюджет и, если он не исчерпан, учитывает повторный запрос.
+
+        :return: True - повторный запрос можно отправить.
+        """
+        with self._lock:
+            if not self.enabled:
+                return False
+            if (self._hedges + 1) * 100 > self.budget_percent * self._calls:
+                return False
+            self._hedges += 1
+            return True
+
+    def record_hedge_win(self) -> None:
+        """Отмечает, что повторный запрос ответил раньше основного."""
+        with self._lock:
+            self._hedge_wins += 1
+
+    def stats(self) -> dict[str, float | int | None]:
+        """
+        Возвращает счётчики:
+        * calls - основных запросов;
+        * hedges - повторных запросов;
+        * hedge_wins - повторных запросов, ответивших первыми;
+        * threshold - текущий порог (в секундах).
+        """
+        threshold = self.threshold()
+        with self._lock:
+            return {
+                'calls': self._calls,
+                'hedges': self._hedges,
+                'hedge_wins': self._hedge_wins,
+                'threshold': threshold,
+            }
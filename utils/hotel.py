@@ -44,13 +44,21 @@ def sorting_hotels(hotel_ids: list, hotels: dict, command: str) -> None:
             key=lambda x: float(hotels[x]['offer']['price']['total'])
         )
     elif command == 'guest_rating':
+        # Отели без рейтинга (отзывы не найдены или не успели загрузиться)
+        # ставятся в конец списка в исходном порядке, а не считаются
+        # отелями с рейтингом 0.
         hotel_ids.sort(
-            key=lambda x: hotels[x]['sentiments']['overallRating'] \
-                if hotels[x].get('sentiments') else 0,
+            key=lambda x: (get_rating(hotels[x]) is not None,
+                           get_rating(hotels[x]) or 0),
             reverse=True
         )
 
 
+def get_rating(hotel: dict) -> float | None:
+    """Возвращает общий рейтинг отеля по отзывам или None, если его нет."""
+    return (hotel.get('sentiments') or {}).get('overallRating')
+
+
 def sorting_order(command_sorting: str) -> str | None:
     if command_sorting == 'bestdeal':
         return 'в порядке удаления от центра города'
@@ -0,0 +1,86 @@
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Hashable
+
+
+class HotelDistanceIndex:
+    """
+    Отели города, упорядоченные по расстоянию от центра ('distance.value').
+    Отбор отелей в пределах радиуса - двоичный поиск по списку расстояний.
+    """
+
+    def __init__(self, hotels: list[dict]):
+        """
+        :param hotels: Отели (элементы 'data' ответа
+            amadeus.reference_data.locations.hotels.by_city).
+        """
+        self._hotels = sorted(hotels, key=self._distance)
+        self._distances = [self._distance(hotel) for hotel in self._hotels]
+
+    @staticmethod
+    def _distance(hotel: dict) -> float:
+        return float(hotel.get('distance', {}).get('value', 0))
+
+    def __len__(self) -> int:
+        return len(self._hotels)
+
+    def within(self, radius: float) -> list[dict]:
+        """
+        Возвращает копии отелей, расположенных не дальше radius от центра,
+        в порядке удаления от центра.
+
+        :param radius: Радиус (в единицах 'distance.unit' отелей).
+        :return: Список отелей.
+        """
+        return deepcopy(self._hotels[:bisect_right(self._distances, radius)])
+
+
+class HotelIndexRegistry:
+    """
+    Индексы HotelDistanceIndex по городам. Хранит не более max_size
+    индексов (давно не использованные удаляются первыми).
+
+    Собственного срока жизни у индексов нет: индекс сохраняется вместе
+    с версией ответа, по которому он построен (сроком жизни записи кэша,
+    см. utils.cache_response.get_cache_expires_at), и возвращается, только
+    пока версия не изменилась.
+    """
+
+    def __init__(self, max_size: int = 50):
+        """
+        :param max_size: Максимальное количество индексов.
+        """
+        self.max_size = max_size
+        self._indexes: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version: Hashable) -> HotelDistanceIndex | None:
+        """
+        Возвращает индекс города или None, если его нет или он построен
+        по другой версии ответа.
+        """
+        with self._lock:
+            item = self._indexes.get(key)
+            if item is None or item[1] != version:
+                return None
+            self._indexes.move_to_end(key)
+            return item[0]
+
+    def put(self, key, hotels: list[dict],
+            version: Hashable) -> HotelDistanceIndex:
+        """
+        Строит индекс города по списку отелей и сохраняет его.
+
+        :param key: Ключ индекса.
+        :param hotels: Отели города.
+        :param version: Версия ответа, из которого взяты отели.
+        """
+        index = HotelDistanceIndex(hotels)
+        with self._lock:
+            self._indexes[key] = (index, version)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_size:
+                self._indexes.popitem(last=False)
+        return index
@@ -0,0 +1,105 @@
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable
+
+
+class MemoryCache:
+    """
+    Кэш десериализованных ответов API в памяти процесса перед кэшем
+    в базе данных (см. utils.cache_response).
+
+    Значения хранятся в виде pickle: вызывающие изменяют полученные
+    данные, поэтому каждый получает свою копию, а pickle.loads примерно
+    вдвое быстрее json.loads и быстрее copy.deepcopy. Суммарный размер
+    записей не превышает max_bytes: давно не использованные записи
+    удаляются первыми.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        :param max_bytes: Максимальный суммарный размер записей.
+            0 - кэш в памяти отключён.
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> tuple[Any, datetime | None] | None:
+        """
+        Возвращает копию значения и момент истечения срока его жизни
+        или None, если записи нет.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            data, expires_at, _ = entry
+        return pickle.loads(data), expires_at
+
+    def put(self, key: Hashable, value: Any,
+            expires_at: datetime | None) -> None:
+        """
+        Сохраняет копию значения. Запись больше max_bytes не сохраняется.
+
+        :param key: Ключ записи, например, (end_point, request_hash).
+        :param value: Значение.
+        :param expires_at: Момент истечения срока жизни записи.
+        """
+        if not self.max_bytes:
+            return
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(data)
+        if size > self.max_bytes:
+            self.discard(key)
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (data, expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        """Удаляет запись (если она есть)."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, float | int]:
+        """
+        Возвращает счётчики:
+        * entries, bytes - количество и суммарный размер записей;
+        * hits, misses - попадания и промахи;
+        * hit_ratio - доля попаданий;
+        * evictions - записи, удалённые из-за ограничения размера.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+            }
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Hashable
+
+from utils.cancellation import CancellationToken, current_token
+
+# Сессия (обычно идентификатор пользователя), от имени которой выполняются
+# запросы в текущем контексте. Используется для честного распределения
+# токенов между пользователями.
+current_session: ContextVar[Hashable | None] = ContextVar(
+    'current_session', default=None
+)
+
+
+@contextmanager
+def rate_limit_session(session: Hashable) -> None:
+    """
+    Привязывает запросы, выполняемые внутри блока with, к сессии session.
+
+    :param session: Идентификатор сессии, например, user_id.
+    :return: None
+    """
+    token = current_session.set(session)
+    try:
+        yield
+    finally:
+        current_session.reset(token)
+
+
+# Период (в секундах) проверки отмены поиска при ожидании токена.
+CANCEL_POLL_INTERVAL = 0.2
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket.
+
+    Токены пополняются со скоростью rate в секунду, но их накапливается
+    не более burst. Ожидающие токен потоки обслуживаются по очереди:
+    сессии чередуются по кругу, а внутри сессии - в порядке обращения.
+    Поэтому один пользователь с большим поиском не может занять все токены.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: Скорость пополнения (токенов в секунду).
+        :param burst: Максимальное количество накопленных токенов.
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate должен быть > 0, а burst >= 1')
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+        self._queues: OrderedDict[Hashable, deque] = OrderedDict()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, session: Hashable | None = None) -> None:
+        """
+        Блокирует поток до получения токена. Ожидание прерывается отменой
+        текущего поиска или истечением отведённого на него времени
+        (utils.cancellation).
+
+        :param session: Сессия, от имени которой запрашивается токен.
+        :return: None
+        :raises SearchCancelled: Если текущий поиск отменён.
+        :raises SearchTimeout: Если истекло время, отведённое на поиск.
+        """
+        token = current_token.get()
+        ticket = object()
+        with self._condition:
+            self._queues.setdefault(session, deque()).append(ticket)
+            try:
+                while True:
+                    if token is not None:
+                        token.check()
+                    head_session = next(iter(self._queues))
+                    if self._queues[head_session][0] is not ticket:
+                        self._wait(None, token)
+                        continue
+
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        # Сессия уходит в конец круга, если у неё ещё есть
+                        # ожидающие запросы.
+                        queue = self._queues.pop(head_session)
+                        queue.popleft()
+                        if queue:
+                            self._queues[head_session] = queue
+                        self._condition.notify_all()
+                        return
+                    self._wait((1 - self._tokens) / self.rate, token)
+            except BaseException:
+                # Запрос больше не ждёт токен: очередь переходит к следующему.
+                queue = self._queues[session]
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[session]
+                self._condition.notify_all()
+                raise
+
+    def _wait(self, timeout: float | None,
+              token: CancellationToken | None) -> None:
+        if token is not None:
+            # Ожидание периодически прерывается для проверки отмены.
+            timeout = CANCEL_POLL_INTERVAL if timeout is None \
+                else min(timeout, CANCEL_POLL_INTERVAL)
+        self._condition.wait(timeout)
+
+
+class RateLimiter:
+    """
+    Общий для процесса ограничитель частоты запросов к внешнему API.
+    Каждый запрос получает токен общей корзины и, если для end point
+    или сессии заданы отдельные корзины, - сначала токены этих корзин.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: int = 1,
+            end_point_limits: dict[str, tuple[float, int]] | None = None
+    ):
+        """
+        :param rate: Общая скорость (запросов в секунду).
+        :param burst: Общий допустимый всплеск запросов.
+        :param end_point_limits: Словарь {end_point: (rate, burst)}
+            с отдельными ограничениями для end point.
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.end_point_buckets = {
+            end_point: TokenBucket(*limits)
+            for end_point, limits in (end_point_limits or {}).items()
+        }
+        self.session_buckets: dict[Hashable, TokenBucket] = {}
+
+    def set_session_limit(self, session: Hashable, rate: float,
+                          burst: int = 1) -> None:
+        """
+        Задаёт отдельное ограничение для сессии, например, для фоновых
+        запросов, которые не должны занимать больше части общей квоты.
+
+        :param session: Сессия (см. rate_limit_session).
+        :param rate: Скорость (запросов в секунду).
+        :param burst: Допустимый всплеск запросов.
+        """
+        self.session_buckets[session] = TokenBucket(rate, burst)
+
+    def acquire(self, end_point: str | None = None) -> None:
+        """
+        Блокирует поток до получения разрешения на запрос к end_point.
+        Сессия берётся из контекста (см. rate_limit_session). Ожидание
+        прерывается отменой текущего поиска (см. TokenBucket.acquire).
+
+        :param end_point: Метка вызываемого метода API.
+        :return: None
+        """
+        session = current_session.get()
+        session_bucket = self.session_buckets.get(session)
+        if session_bucket is not None:
+            session_bucket.acquire(session)
+        end_point_bucket = self.end_point_buckets.get(end_point)
+        if end_point_bucket is not None:
+            end_point_bucket.acquire(session)
+        self.bucket.acquire(session)
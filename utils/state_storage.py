@@ -0,0 +1,108 @@
+import copy
+import threading
+from collections import defaultdict
+
+from telebot.storage import StateMemoryStorage
+from telebot.storage.base_storage import StateDataContext
+
+
+class LockedStateDataContext(StateDataContext):
+    """
+    Контекст bot.retrieve_data, выполняемый под блокировкой пользователя.
+
+    StateDataContext копирует данные пользователя при создании и целиком
+    перезаписывает их при выходе из блока with. Без блокировки два потока
+    (поиск в потоковом режиме, фоновая загрузка фото, нажатие кнопки),
+    одновременно изменяющие данные одного пользователя, затирают изменения
+    друг друга. Здесь данные читаются только после захвата блокировки
+    и сохраняются до её освобождения.
+    """
+
+    def __init__(self, obj: 'LockedStateMemoryStorage', chat_id: int,
+                 user_id: int, business_connection_id=None,
+                 message_thread_id=None, bot_id=None):
+        self.obj = obj
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.bot_id = bot_id
+        self.business_connection_id = business_connection_id
+        self.message_thread_id = message_thread_id
+        self.data = None
+        self._lock = obj.lock(chat_id, user_id)
+
+    def __enter__(self) -> dict:
+        self._lock.acquire()
+        try:
+            self.data = copy.deepcopy(self.obj.get_data(
+                chat_id=self.chat_id,
+                user_id=self.user_id,
+                business_connection_id=self.business_connection_id,
+                message_thread_id=self.message_thread_id,
+                bot_id=self.bot_id,
+            ))
+        except BaseException:
+            self._lock.release()
+            raise
+        return self.data
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return super().__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._lock.release()
+
+
+class LockedStateMemoryStorage(StateMemoryStorage):
+    """
+    Хранилище состояний в памяти, в котором все изменения данных
+    и состояния одного пользователя в одном чате выполняются
+    под общей блокировкой (threading.RLock), см. LockedStateDataContext.
+    Блокировка повторно входимая: вложенные bot.retrieve_data, set_state
+    и delete_state в том же потоке не приводят к взаимоблокировке.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._locks: defaultdict[tuple[int, int], threading.RLock] = (
+            defaultdict(threading.RLock)
+        )
+        self._locks_lock = threading.Lock()
+
+    def lock(self, chat_id: int, user_id: int) -> threading.RLock:
+        """Возвращает блокировку данных пользователя user_id в чате chat_id."""
+        with self._locks_lock:
+            return self._locks[(chat_id, user_id)]
+
+    def get_interactive_data(self, chat_id: int, user_id: int,
+                             business_connection_id=None,
+                             message_thread_id=None,
+                             bot_id=None) -> LockedStateDataContext:
+        return LockedStateDataContext(
+            self,
+            chat_id=chat_id,
+            user_id=user_id,
+            business_connection_id=business_connection_id,
+            message_thread_id=message_thread_id,
+            bot_id=bot_id,
+        )
+
+    def set_state(self, chat_id: int, user_id: int, *args, **kwargs) -> bool:
+        with self.lock(chat_id, user_id):
+            return super().set_state(chat_id, user_id, *args, **kwargs)
+
+    def delete_state(self, chat_id: int, user_id: int, *args,
+                     **kwargs) -> bool:
+        with self.lock(chat_id, user_id):
+            return super().delete_state(chat_id, user_id, *args, **kwargs)
+
+    def set_data(self, chat_id: int, user_id: int, *args, **kwargs) -> bool:
+        with self.lock(chat_id, user_id):
+            return super().set_data(chat_id, user_id, *args, **kwargs)
+
+    def reset_data(self, chat_id: int, user_id: int, *args, **kwargs) -> bool:
+        with self.lock(chat_id, user_id):
+            return super().reset_data(chat_id, user_id, *args, **kwargs)
+
+    def save(self, chat_id: int, user_id: int, *args, **kwargs) -> bool:
+        with self.lock(chat_id, user_id):
+            return super().save(chat_id, user_id, *args, **kwargs)